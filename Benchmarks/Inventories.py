@@ -0,0 +1,70 @@
+"""memory/throughput benchmark of the two inventory representations at 100k players:
+the dict[Item, int] Inventory against the array backed CompactInventory.
+
+run from the repository root with: python -m Benchmarks.Inventories"""
+from __future__ import annotations
+import Utils.Constants # resolves the Constants <-> GameLogic import cycle the same way bot.py does
+import random, timeit, tracemalloc
+from GameLogic.Items import Item, Inventory, CompactInventory
+
+PLAYERS = 100_000
+DISTINCT_ITEMS = 15 # distinct items held by a typical player
+OPERATIONS = 200_000
+REPEAT = 3
+
+def Documents() -> list[dict]:
+    """the stored inventory documents every player gets loaded from"""
+    rng = random.Random(42)
+    return [{str(item.id) : rng.randint(1, 20) for item in rng.sample(Item.ALL, DISTINCT_ITEMS)} for _ in range(PLAYERS)]
+
+def Build(kind : type, documents : list[dict]) -> tuple[list, int]:
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    inventories = [kind.FromDict(document) for document in documents]
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return inventories, size
+
+def Mutations(inventories : list, picks : list) -> None:
+    """AddItem/RemoveItem like rewards, trades and sales do"""
+    for idx, item in picks:
+        inventory = inventories[idx]
+        inventory.AddItem(item, 2)
+        inventory.RemoveItem(item, 1)
+
+def Totals(inventories : list) -> int:
+    return sum(inventory.GetTotalItems() for inventory in inventories[:OPERATIONS])
+
+def Steals(inventories : list) -> int:
+    """GetRandomItems, the arctic parasite steal"""
+    return sum(len(inventories[idx].GetRandomItems(count=3)) for idx in range(0, PLAYERS, PLAYERS // 20_000))
+
+def Serialize(inventories : list) -> int:
+    return sum(len(inventory.ToDict()) for inventory in inventories[:OPERATIONS // 10])
+
+def Measure(name : str, func) -> float:
+    seconds = min(timeit.repeat(func, number=1, repeat=REPEAT))
+    print(f"    {name:<10} {seconds * 1000:9.1f}ms")
+    return seconds
+
+def main():
+    documents = Documents()
+    rng = random.Random(7)
+    picks = [(rng.randrange(PLAYERS), rng.choice(Item.ALL)) for _ in range(OPERATIONS)]
+    results = {}
+    for label, kind in [("dict", Inventory), ("compact", CompactInventory)]:
+        inventories, size = Build(kind, documents)
+        print(f"[{label}] {size / 1024 / 1024:.1f}MB for {PLAYERS} inventories ({size / PLAYERS:.0f} bytes each)")
+        results[label] = [size,
+                          Measure("mutations", lambda: Mutations(inventories, picks)),
+                          Measure("totals", lambda: Totals(inventories)),
+                          Measure("steals", lambda: Steals(inventories)),
+                          Measure("serialize", lambda: Serialize(inventories))]
+        del inventories
+    print(f"[compact bytes] {sum(len(CompactInventory.FromDict(document).ToBytes()) for document in documents[:1000]) / 1000:.0f} bytes per inventory")
+    print("[dict / compact]")
+    for name, dict_result, compact_result in zip(["memory", "mutations", "totals", "steals", "serialize"], results["dict"], results["compact"]):
+        print(f"    {name:<10} x{dict_result / compact_result:.2f}")
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,53 @@
+"""micro-benchmark for random item draws, the path every plant, bee and lootbox reward goes through.
+it compares the old GetRandomItem (LoadItems check + list(Item.ITEMS) + GetItem per draw, copied below)
+against the frozen registry.
+
+run from the repository root with: python -m Benchmarks.ItemDraws"""
+from __future__ import annotations
+import Utils.Constants # resolves the Constants <-> GameLogic import cycle the same way bot.py does
+import random, timeit
+from GameLogic.Items import Item
+
+DRAWS = 100_000
+REPEAT = 5
+
+################################ OLD IMPLEMENTATION ################################
+def LegacyGetItem(id) -> Item:
+    Item.LoadItems()
+    try: id = int(id)
+    except: pass
+    if isinstance(id, str):
+        return Item.NAME_TO_ITEM[id.lower()]
+    return Item.ITEMS[id]
+
+def LegacyGetRandomItem() -> Item:
+    Item.LoadItems()
+    id = random.choice( list(Item.ITEMS) )
+    return LegacyGetItem(id=id)
+
+def LegacyGetRandomItemFrom(category : str) -> Item:
+    Item.LoadItems()
+    if not category in Item.CATEGORIES: raise KeyError(category)
+    return random.choice( Item.CATEGORIES[category] )
+####################################################################################
+
+def Measure(name : str, func) -> float:
+    seconds = min(timeit.repeat(func, number=1, repeat=REPEAT))
+    print(f"    {name:<10} {DRAWS / seconds:14,.0f} draws/s")
+    return seconds
+
+def main():
+    results = {}
+    for label, single, category, batch in [
+        ("old", LegacyGetRandomItem, LegacyGetRandomItemFrom, lambda: [LegacyGetRandomItem() for _ in range(DRAWS)]),
+        ("frozen", Item.GetRandomItem, Item.GetRandomItemFrom, lambda: Item.GetRandomItems(count=DRAWS))]:
+        print(f"[{label}]")
+        results[label] = [Measure("single", lambda: [single() for _ in range(DRAWS)]),
+                          Measure("category", lambda: [category("food") for _ in range(DRAWS)]),
+                          Measure("batch", batch)]
+    print("[speedup]")
+    for name, old, frozen in zip(["single", "category", "batch"], results["old"], results["frozen"]):
+        print(f"    {name:<10} x{old / frozen:.1f}")
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,86 @@
+"""micro-benchmark for the hot paths that touch player handles: the `user == trade.seller` scans
+of Trading and the `sale.seller.id` scan of Shop.GetAllSalesFor.
+it compares the old __getattribute__ proxy (copied below) against the LazyEntity handle.
+
+run from the repository root with: python -m Benchmarks.PlayerHandles"""
+from __future__ import annotations
+import Utils.Constants # resolves the Constants <-> GameLogic import cycle the same way bot.py does
+import timeit
+from types import SimpleNamespace
+from GameLogic.Player import Player
+from Utils.Members import MemberDirectory
+
+PLAYERS = 1000
+SALES = 10000
+REPEAT = 5
+
+############### the proxy PlayerReference used before LazyEntity ###############
+class LegacyPlayerReference(object):
+    def __init__(self, player : Player) -> None:
+        self.player : Player = player
+        self.id : str = player.id
+        self.is_mutated : bool = False
+
+    def __getattribute__(self, name):
+        if name in ["player", "id", "is_mutated", "__attributeAccessed__", "__FetchPlayer__"]: return object.__getattribute__(self, name)
+        self.__attributeAccessed__()
+        return object.__getattribute__( self.player ,  name)
+
+    def __attributeAccessed__(self):
+        if self.player == None:
+            raise RuntimeError("the benchmark never unloads players")
+################################################################################
+
+def Build():
+    MemberDirectory.Fill(SimpleNamespace(users=[SimpleNamespace(id=id, name=f"user{id}") for id in range(PLAYERS)]))
+    handles = []
+    for id in range(PLAYERS):
+        handle = Player.GetPlayer(id)
+        handle.Adopt(Player(id=id))
+        handles.append(handle)
+    legacy = [LegacyPlayerReference(handle) for handle in handles]
+    return handles, legacy
+
+def TradeScan(users : list, trades : list) -> int:
+    """mirrors Trade.IsTrading: compares a user against both sides of every trade"""
+    found = 0
+    for user in users[:50]:
+        for trade in trades:
+            if user == trade.UserOne or user == trade.UserTwo: found += 1
+    return found
+
+def SalesScan(user, sales : list) -> int:
+    """mirrors Shop.GetAllSalesFor: reads sale.seller.id for every sale"""
+    result = 0
+    for sale in sales:
+        if sale.seller.id == user.id: result += 1
+    return result
+
+def Inventories(users : list) -> int:
+    """a plain field read on every player, like $inventory or RewardUI do"""
+    total = 0
+    for user in users:
+        total += user.balance + len(user.inventory.items)
+    return total
+
+def Measure(name : str, func) -> float:
+    seconds = min(timeit.repeat(func, number=1, repeat=REPEAT))
+    print(f"    {name:<10} {seconds * 1000:8.2f}ms")
+    return seconds
+
+def main():
+    handles, legacy = Build()
+    results = {}
+    for label, users in [("proxy", legacy), ("handle", handles)]:
+        print(f"[{label}]")
+        trades = [SimpleNamespace(UserOne=users[idx], UserTwo=users[-idx - 2]) for idx in range(PLAYERS // 2)]
+        sales = [SimpleNamespace(seller=users[idx % PLAYERS]) for idx in range(SALES)]
+        results[label] = [Measure("trades", lambda: TradeScan(users, trades)),
+                          Measure("sales", lambda: SalesScan(users[0], sales)),
+                          Measure("fields", lambda: Inventories(users))]
+    print("[speedup]")
+    for name, proxy, handle in zip(["trades", "sales", "fields"], results["proxy"], results["handle"]):
+        print(f"    {name:<10} x{proxy / handle:.1f}")
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,40 @@
+"""micro-benchmark for opening a page of a big auction, what $shop and $selling do.
+it compares walking the insertion ordered dict up to the page (islice, what the shop did before)
+against PagedIndex, on an auction where a third of the listings were sold.
+
+run from the repository root with: python -m Benchmarks.ShopPages"""
+from __future__ import annotations
+import random, timeit
+from itertools import islice
+from Utils.Pages import PagedIndex
+
+LISTINGS = 200_000
+PAGE_SIZE = 10
+LOOKUPS = 2_000
+REPEAT = 5
+
+def Build():
+    auction, index = {}, PagedIndex(PAGE_SIZE)
+    for id in range(LISTINGS):
+        auction[id] = index[id] = f"sale {id}"
+    for id in random.sample(range(LISTINGS), LISTINGS // 3):
+        auction.pop(id)
+        index.pop(id)
+    return auction, index
+
+def Measure(name : str, func) -> float:
+    seconds = min(timeit.repeat(func, number=1, repeat=REPEAT))
+    print(f"    {name:<10} {LOOKUPS / seconds:14,.0f} pages/s")
+    return seconds
+
+def main():
+    auction, index = Build()
+    pages = [random.randrange(len(auction) // PAGE_SIZE) for _ in range(LOOKUPS)]
+    assert all(list(islice(auction.values(), page * PAGE_SIZE, (page + 1) * PAGE_SIZE)) == index.Page(page) for page in pages[:50])
+    print(f"[{len(auction):,} listings, random pages]")
+    old = Measure("islice", lambda: [list(islice(auction.values(), page * PAGE_SIZE, (page + 1) * PAGE_SIZE)) for page in pages])
+    new = Measure("indexed", lambda: [index.Page(page) for page in pages])
+    print(f"[speedup] x{old / new:.1f}")
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
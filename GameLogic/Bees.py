@@ -3,17 +3,23 @@ from __future__ import annotations
 ###################### IMPORTS ######################
 from GameLogic.Player import Player
 from GameLogic.Items import Item
-from Utils.Constants import BEE_DURATION, RewardUI, pretty_time_delta
-from Utils.Database import BeeDatabase as DATABASE
+from GameLogic.LootTables import LootTable
+from Utils.Constants import BEE_DURATION, CACHE_IDLE_TTL, STORAGE_CACHE_SIZE, RewardUI, pretty_time_delta
+from Utils.Database import BeeDatabase as DATABASE, AsyncBeeDatabase as ASYNC_DATABASE, FlushReport
+from GameLogic.Scheduler import GROWTH_SCHEDULER
+from Utils.Handle import LazyEntity
+from Utils.Repository import Repository
 import random, time
 #####################################################
 
-class BeeStorage:
-    BEESTORAGE_REFERENCES : dict[Player, BeeStorageReference] = {}
-    __slots__ = ["storage", "id"]
+class BeeStorage(LazyEntity):
+    REPOSITORY : Repository = None # set right below the class
+    __slots__ = ["storage", "saved"]
     def __init__(self, id : str, storage : dict[str, Bee] = None) -> None:
         self.storage : dict[str, Bee] = {} if storage == None else storage
         self.id = str(id)
+        self.is_loaded = True
+        self.saved : dict = None # the stored document, None until it was written once
 
     def ToDict(self) -> dict:
         storage = {}
@@ -22,6 +28,7 @@ class BeeStorage:
         result = {}
         result['storage'] = storage
         result['id'] = self.id
+        result['finishing_times'] = sorted(storage[slot]['finishing_time'] for slot in storage) # indexed, lets the scheduler rebuild with a range query
         return result
 
     @staticmethod
@@ -30,41 +37,63 @@ class BeeStorage:
         for slot in data['storage']:
             storage[str(slot)] = Bee.FromDict(data['storage'][slot], id = data['id'])
         result = BeeStorage(id=data['id'], storage=storage)
-        return result
+        return result.MarkSaved()
 
     @staticmethod
     def GrowBeeForUser(user : Player, bee : Bee) -> None:
         bee_storage = BeeStorage.GetBeeStorage(user.id)
         bee_storage.storage[str(len(bee_storage.storage))] = bee
+        GROWTH_SCHEDULER.Schedule(finishing_time=bee.finishing_time, owner_id=user.id, kind="bees", name=bee.name)
 
     async def CheckForCompletion(self, ctx):
+        """only looks at the slots once the scheduler saw one of them finish"""
+        if len(GROWTH_SCHEDULER.Drain(self.id, "bees")) == 0: return
+        await Player.LoadPlayer(self.id) # rewards mutate the owner's inventory
         current_time = time.time()
         for slot in self.storage.copy():
             bee = self.storage[slot]
-            if bee.finishing_time < current_time:
+            if bee.finishing_time <= current_time:
                 await self.storage.pop(slot).__call__(ctx) #Removes the grown bee and calls its corresponding event
                 #print(bee, " is done!")
 
+    def MarkSaved(self) -> BeeStorage:
+        self.saved = self.ToDict()
+        return self
+
+    def HasChanges(self) -> bool:
+        return self.ToDict() != self.saved
+
+    def GetChanges(self) -> dict:
+        """the whole storage is rewritten, but only when something in it changed"""
+        document = self.ToDict()
+        return {"$set": document} if document != self.saved else None
+
     @staticmethod
-    def Save() -> None:
-        for id in BeeStorage.BEESTORAGE_REFERENCES:
-            BeeStorageRef = BeeStorage.BEESTORAGE_REFERENCES[id]
-            if BeeStorageRef.ReferencedItem != None: #BeeStorageRef.is_mutated:
-                DATABASE.Save(key=BeeStorageRef.ReferencedItem.id, value=BeeStorageRef.ReferencedItem.ToDict())
-                BeeStorageRef.ReferencedItem = None
+    async def Save() -> FlushReport:
+        return await BeeStorage.REPOSITORY.Save()
 
     @staticmethod
     def GetBeeStorage(id : str) -> BeeStorage:
-        id = str(id)
-        if id in BeeStorage.BEESTORAGE_REFERENCES: return BeeStorage.BEESTORAGE_REFERENCES[id]
-        return BeeStorageReference(id = id)
+        return BeeStorage.REPOSITORY.Get(id)
+
+    @staticmethod
+    async def LoadBeeStorage(id : str) -> BeeStorage:
+        """same as GetBeeStorage, but the storage is fetched without blocking the event loop"""
+        return await BeeStorage.REPOSITORY.Load(id)
 
     @staticmethod
-    def DeleteBeeStorage(id : str) -> None:
-        id = str(id)
-        BeeStorage.GetBeeStorage(id)
-        BeeStorage.BEESTORAGE_REFERENCES.pop(id).ReferencedItem = None
-        DATABASE.Delete(id)
+    async def DeleteBeeStorage(id : str) -> None:
+        await BeeStorage.REPOSITORY.Delete(id)
+
+    ################################ LOADING ################################
+    @staticmethod
+    def __Create__(id : str, data : dict) -> BeeStorage:
+        if data != None:
+            return BeeStorage.FromDict( data )
+        return BeeStorage(id=id)
+
+BeeStorage.REPOSITORY = Repository(database=DATABASE, async_database=ASYNC_DATABASE, entity=BeeStorage, create=BeeStorage.__Create__,
+                                   max_entries=STORAGE_CACHE_SIZE, idle_ttl=CACHE_IDLE_TTL)
 
 class Bee:
     def __init__(self, time: int, on_finish, user : Player, name : str = "Bee", type = "normal") -> None:
@@ -79,7 +108,7 @@ class Bee:
 
     def ToDict(self) -> dict:
         result = {}
-        result['finishing_time'] = int(self.finishing_time - time.time())
+        result['finishing_time'] = int(self.finishing_time)
         result['name'] = self.name
         result['type'] = self.type
         return result
@@ -97,8 +126,7 @@ def NormalBee(user : Player, time_left : int = None, dont_grow = False) -> Bee:
     if time_left == None: time_left = BEE_DURATION.normal_bee
     async def Reward(ctx):
 
-        items_to_give = [Item.GetItem("honey") for _ in range(random.randint(0,2))]
-        for _ in range(random.randint(1,2)): items_to_give.append(Item.GetRandomItem())
+        items_to_give = LootTable.Get("bee").DrawMany(count=random.randint(1,4))
         user.inventory.AddItem(Item.GetItem("bee"))
         await RewardUI(ctx = ctx,
                        user=user,
@@ -110,38 +138,4 @@ def NormalBee(user : Player, time_left : int = None, dont_grow = False) -> Bee:
         BeeStorage.GrowBeeForUser(user = user,
                                 bee  = bee,
                                 )
-    return bee
-
-
-
-class BeeStorageReference(object):
-    def __init__(self, id : str) -> None:
-        self.ReferencedItem : BeeStorage = None
-        self.id : str = id
-        self.is_mutated : bool = False
-        BeeStorage.BEESTORAGE_REFERENCES[id] = self
-
-    def __getattribute__(self, name):
-        if name in ["ReferencedItem", "id", "is_mutated", "__attributeAccessed__", "__FetchReferencedItem__"]: return object.__getattribute__(self, name)
-        self.__attributeAccessed__()
-        return object.__getattribute__( self.ReferencedItem ,  name)
-
-    def __setattr__(self, name: str, value) -> None:
-        if name in ["ReferencedItem", "id", "is_mutated"]: 
-            super().__setattr__(name, value)
-        else :
-            self.__attributeAccessed__()
-            self.ReferencedItem.__setattr__(name, value)
-            self.is_mutated = True
-
-    def __attributeAccessed__(self):
-        if self.ReferencedItem == None:
-            self.ReferencedItem = self.__FetchReferencedItem__(self.id)
-            self.is_mutated = False
-
-    @staticmethod
-    def __FetchReferencedItem__(id : str) -> BeeStorage:
-        data =  DATABASE.Get(key = str(id))
-        if data != None:
-            return BeeStorage.FromDict( data )
-        return BeeStorage(id=id)
\ No newline at end of file
+    return bee
\ No newline at end of file
@@ -2,7 +2,11 @@ from __future__ import annotations
 from typing import Union
 from Utils.Constants import PAGE_ITEM_LIMIT
 from Utils.ErrorHandling import InventoryError
-import random
+from Utils.Fuzzy import FuzzyIndex
+from Utils.Pages import PageCache, PageCount, ClampPage
+from array import array
+from itertools import accumulate, chain, compress, islice
+import bisect, random
 
 class Item:
     __slots__ = ("id", "icon", "name", "rarity")
@@ -11,7 +15,14 @@ class Item:
     RARITY : dict[str, list[Item]] = {"common" : []}
     CATEGORIES : dict[str, list[Item]] = {}
     ID_COUNTER = 0
+    ####### frozen by Item.LoadItems once every item is registered, draws only index these #######
+    ALL : tuple[Item, ...] = ()
+    CATEGORIES_OF : dict[Item, tuple[str, ...]] = {} # reverse of CATEGORIES
+    BY_ID : tuple[Item, ...] = () # indexed by item id, None where no item has that id
+    ID_KEYS : tuple[str, ...] = () # str(id) for every id, the keys of a stored inventory
+    NAME_INDEX : FuzzyIndex = None
     def __init__(self, name : str, icon : str, id : int = None, block=True, rarity : str = "common", category : str = None) -> None:
+        Item.__Unfrozen__("register an item")
         if id == None:
             id = Item.ID_COUNTER
             Item.ID_COUNTER += 1
@@ -25,17 +36,21 @@ class Item:
             category = category.lower()
             if not category in Item.CATEGORIES: Item.CATEGORIES[category] = []
             Item.CATEGORIES[category].append(self)
-        Item.RARITY[rarity].append(self)
+        Item.RARITY.setdefault(rarity, []).append(self)
 
     def SetName(self, name : str) -> Item:
         self.name = name
         return self
 
     def SetRarity(self, rarity : str) -> Item:
+        Item.__Unfrozen__("change the rarity of an item")
+        Item.RARITY[self.rarity].remove(self)
         self.rarity = rarity
+        Item.RARITY.setdefault(rarity, []).append(self)
         return self
 
     def AddToCategory(self, category : str) -> Item:
+        Item.__Unfrozen__("add an item to a category")
         category = category.lower()
         if not category in Item.CATEGORIES: Item.CATEGORIES[category] = []
         Item.CATEGORIES[category].append(self)
@@ -52,59 +67,76 @@ class Item:
 
     @staticmethod
     def GetItem(id : Union[int, str]) -> Item:
-        Item.LoadItems()
         try: id = int(id)
         except: pass
         if isinstance(id, str):
             id = id.lower()
-            if id in Item.NAME_TO_ITEM: return Item.NAME_TO_ITEM[id]
+            item = Item.NAME_INDEX.Resolve(id) # exact name or unambiguous prefix
+            if item is not None: return item
+            suggestions = Item.NAME_INDEX.Suggest(id)
+            if len(suggestions) > 0:
+                raise InventoryError(f"cannot find item with name: {id}, did you mean " + " or ".join(f"`{Item.NAME_TO_ITEM[name].name}`" for name in suggestions) + " ?")
             raise InventoryError(f"cannot find item with name: {id}")
         if id in Item.ITEMS: return Item.ITEMS[id]
         raise InventoryError(f"cannot find item with id: {id}")
 
     @staticmethod
     def GetRandomItem() -> Item:
-        Item.LoadItems()
-        id = random.choice( list(Item.ITEMS) )
-        return Item.GetItem(id=id)
+        return Item.ALL[ int(random.random() * len(Item.ALL)) ]
 
     @staticmethod
     def GetRandomItemFrom(category : str) -> Item:
         """grabs a random item from the specified category in the static variables"""
-        Item.LoadItems()
-        if not category in Item.CATEGORIES: raise InventoryError(f"cannot find category: {category}")
-        item = random.choice( Item.CATEGORIES[category] )
-        return item
+        items = Item.CATEGORIES.get(category)
+        if items == None: raise InventoryError(f"cannot find category: {category}")
+        return items[ int(random.random() * len(items)) ]
 
     @staticmethod
     def GetRandomItems(count : int) -> list:
-        """returns a list of random items"""
-        items = []
-        for _ in range(count):
-            items.append( Item.GetRandomItem() )
-        return items
+        """returns a list of random items, drawn in a single pass"""
+        return random.choices( Item.ALL, k=count )
 
     @staticmethod
     def GetRandomItemsFrom(category : str, count : int) -> list[Item]:
         """returns a list of random items from the specified category"""
-        items = []
-        for _ in range(count):
-            items.append( Item.GetRandomItemFrom(category) )
-        return items
+        if not category in Item.CATEGORIES: raise InventoryError(f"cannot find category: {category}")
+        return random.choices( Item.CATEGORIES[category], k=count )
 
     ITEMS_LOADED = False
+    FROZEN = False
+    @staticmethod
+    def __Unfrozen__(action : str) -> None:
+        # the frozen tuples, CATEGORIES_OF and the loot tables compiled from them would silently go stale
+        if Item.FROZEN: raise RuntimeError(f"cannot {action} once the registry is frozen, do it in LoadAllItems")
+
     @staticmethod
     def LoadItems(force : bool = False):
         if Item.ITEMS_LOADED and not force: return
 
         LoadAllItems() #this is where all items get registered!
+        Item.Freeze()
 
         Item.ITEMS_LOADED = True
 
+    @staticmethod
+    def Freeze():
+        """turns the registry into tuples, after this no item/category can be added and draws are a single index"""
+        Item.FROZEN = True
+        Item.ALL = tuple(Item.ITEMS.values())
+        Item.BY_ID = tuple(Item.ITEMS.get(id) for id in range(max(Item.ITEMS) + 1))
+        Item.ID_KEYS = tuple(str(id) for id in range(len(Item.BY_ID)))
+        Item.CATEGORIES = {category : tuple(items) for category, items in Item.CATEGORIES.items()}
+        Item.CATEGORIES_OF = {item : tuple(category for category, items in Item.CATEGORIES.items() if item in items) for item in Item.ALL}
+        Item.RARITY = {rarity : tuple(items) for rarity, items in Item.RARITY.items()}
+        Item.NAME_INDEX = FuzzyIndex(Item.NAME_TO_ITEM)
+
 class Inventory:
-    __slots__ = ("items")
+    __slots__ = ("items", "changed", "version", "render")
     def __init__(self) -> None:
         self.items : dict[Item, int] = {}
+        self.changed : set[Item] = set() # items whose amount changed since the last save
+        self.version = 0 # bumped on every mutation, rendered pages are only valid for one version
+        self.render : PageCache = None # created the first time a page is shown
         
     def ToDict(self) -> dict:
         result = {}
@@ -117,26 +149,42 @@ class Inventory:
         result = Inventory()
         for item_id in data:
             result.AddItem(Item.GetItem(id = int(item_id)), data[item_id])
+        result.changed.clear()
         return result
 
     def __repr__(self) -> str:
         result = "\u200b"
-        for item in self.items:
-            result += f"{item} `x{self.items[item]}`\n\n"
+        for item, amount in self.items.items():
+            result += f"{item} `x{amount}`\n\n"
         return result
 
     def ToPages(self) -> list[str]:
         pages = []
         result = "\u200b"
-        for (idx, item) in enumerate(self.items):
+        for (idx, (item, amount)) in enumerate(self.items.items()):
             if idx % PAGE_ITEM_LIMIT == 0 and idx != 0: 
                 pages.append(result)
                 result = "\u200b"
-            result += f"{item} `x{self.items[item]}`\n\n"
+            result += f"{item} `x{amount}`\n\n"
         pages.append(result)
         return pages
 
+    def GetPage(self, page : int) -> tuple[str, int, int]:
+        """renders only the requested page (1-based, clamped), returns (text, page index, page count)"""
+        pages = PageCount(len(self.items), PAGE_ITEM_LIMIT)
+        page = ClampPage(page, pages)
+        if self.render == None: self.render = PageCache()
+        return self.render.Get(self.version, page, lambda: self.__RenderPage__(page)), page, pages
+
+    def __RenderPage__(self, page : int) -> str:
+        result = "\u200b"
+        for item, amount in islice(self.items.items(), page * PAGE_ITEM_LIMIT, (page + 1) * PAGE_ITEM_LIMIT):
+            result += f"{item} `x{amount}`\n\n"
+        return result
+
     def AddItem(self, item : Item , amount : int = 1) -> Inventory:
+        self.changed.add(item)
+        self.version += 1
         self.items[item] = max(0, self.items.get(item,0) + amount )
         #print(f"added item {item} x{self.items[item]}")
         if self.items[item] == 0:
@@ -149,6 +197,8 @@ class Inventory:
         return self
 
     def RemoveItem(self, item : Item, amount : int = 1) -> Inventory:
+        self.changed.add(item)
+        self.version += 1
         self.items[item] = max(0, self.items.get(item,0) - amount )
         if self.items[item] == 0:
             self.items.pop(item)
@@ -161,6 +211,8 @@ class Inventory:
 
     def Clear(self) -> dict[Item, int]:
         old = self.items
+        self.changed.update(old)
+        self.version += 1
         self.items = {}
         return old
 
@@ -172,11 +224,11 @@ class Inventory:
         if count > self.GetTotalItems():
             return self.items.copy()
         items = {}
+        held = list(self.items)
         for _ in range(count):
-            item = random.choice( list(self.items) )
-            if item in items:
-                while items[item] >= self.items[item]:
-                    item = random.choice( list(self.items) )
+            item = random.choice( held )
+            while items.get(item, 0) >= self.items[item]: # already took every unit of it
+                item = random.choice( held )
             items[item] = items.get(item, 0) + 1
         return items
 
@@ -206,12 +258,121 @@ class Inventory:
         result += "\n\n"
         return result
 
+class CompactInventory(Inventory):
+    """same api as Inventory, backed by a dense array of counts indexed by Item.id, a running total and the number of
+    different items held. .items is a snapshot in id order, changing it does not change the inventory.
+    counts are 2 bytes each until one of them needs more. GetRandomItems bisects the prefix sums of the counts
+    (built in C and kept until the next mutation), O(log n) a pick"""
+    __slots__ = ("counts", "total", "held", "cumulative")
+    def __init__(self) -> None:
+        self.counts = array("H", bytes(2 * len(Item.BY_ID)))
+        self.total = 0
+        self.held = 0
+        self.cumulative : list[int] = None
+        self.changed : set[Item] = set()
+        self.version = 0
+        self.render : PageCache = None
+
+    @property
+    def items(self) -> dict[Item, int]:
+        return dict(zip(compress(Item.BY_ID, self.counts), filter(None, self.counts)))
+
+    def ToDict(self) -> dict:
+        return dict(zip(compress(Item.ID_KEYS, self.counts), filter(None, self.counts)))
+
+    @staticmethod
+    def FromDict(data : dict) -> CompactInventory:
+        result = CompactInventory()
+        for item_id in data:
+            result.__Store__(Item.GetItem(id = int(item_id)).id, data[item_id])
+        result.__Count__()
+        return result
+
+    def ToBytes(self) -> bytes:
+        """the (id, count) pairs of every item held, packed as unsigned ints"""
+        return array("I", chain.from_iterable(zip(compress(range(len(self.counts)), self.counts), filter(None, self.counts)))).tobytes()
+
+    @staticmethod
+    def FromBytes(data : bytes) -> CompactInventory:
+        result = CompactInventory()
+        pairs = array("I", data)
+        for id, count in zip(pairs[0::2], pairs[1::2]):
+            result.__Store__(id, count)
+        result.__Count__()
+        return result
+
+    def __Store__(self, id : int, amount : int) -> None:
+        if amount > 0xFFFF and self.counts.typecode == "H": self.counts = array("I", self.counts)
+        self.counts[id] = amount
+
+    def __Count__(self) -> None:
+        self.total = sum(self.counts)
+        self.held = len(self.counts) - self.counts.count(0)
+
+    def GetPage(self, page : int) -> tuple[str, int, int]:
+        pages = PageCount(self.held, PAGE_ITEM_LIMIT)
+        page = ClampPage(page, pages)
+        if self.render == None: self.render = PageCache()
+        return self.render.Get(self.version, page, lambda: self.__RenderPage__(page)), page, pages
+
+    def __Change__(self, item : Item, amount : int) -> CompactInventory:
+        self.changed.add(item)
+        self.version += 1
+        self.cumulative = None
+        id = item.id
+        old = self.counts[id]
+        new = old + amount
+        if new <= 0:
+            new = 0
+            self.held -= old > 0
+        else:
+            self.held += old == 0
+        if new > 0xFFFF: self.__Store__(id, new)
+        else: self.counts[id] = new
+        self.total += new - old
+        return self
+
+    def AddItem(self, item : Item , amount : int = 1) -> CompactInventory:
+        return self.__Change__(item, amount)
+
+    def RemoveItem(self, item : Item, amount : int = 1) -> CompactInventory:
+        return self.__Change__(item, -amount)
+
+    def Clear(self) -> dict[Item, int]:
+        old = self.items
+        self.changed.update(old)
+        self.version += 1
+        self.counts = array("H", bytes(2 * len(Item.BY_ID)))
+        self.total = self.held = 0
+        self.cumulative = None
+        return old
+
+    def GetItemCount(self, item : Item) -> int:
+        return self.counts[item.id]
+
+    def GetTotalItems(self) -> int:
+        return self.total
+
+    def GetRandomItems(self, count : int) -> dict[Item, int]:
+        """returns a dictionary of random items from the user's inventory, every single unit held is equally likely.
+        if the user has less items than count, all of them will be returned"""
+        if count > self.total:
+            return self.items
+        if self.cumulative == None: self.cumulative = list(accumulate(self.counts))
+        units = set()
+        while len(units) < count: units.add(int(random.random() * self.total)) # distinct units, a repeat is drawn again
+        items = {}
+        for unit in units:
+            item = Item.BY_ID[bisect.bisect_right(self.cumulative, unit)]
+            items[item] = items.get(item, 0) + 1
+        return items
+
 #this is where all items get registered!
 # Add/edit these items to change what items exist in the game
 def LoadAllItems():
     Item(name="Ticket to Hell", icon="🎟️")
     Item(name="Sagittarius", icon="♐")
-    Item(name="Infinity", icon="♾️")
+    Item(name="Infinity", icon="♾️", rarity="rare")
     Item(name="Departure", icon="🛫")
     Item(name="Fire", icon="🔥")
     Item(name="Extinguisher", icon="🧯")
@@ -221,8 +382,8 @@ def LoadAllItems():
     Item(name="Equivalent Exchange", icon="💱")
     Item(name="Surrender", icon="🏳️")
     Item(name="Syringe", icon="💉")
-    Item(name="The World", icon="🌎")
-    Item(name="The Universe", icon="🌌")
+    Item(name="The World", icon="🌎", rarity="rare")
+    Item(name="The Universe", icon="🌌", rarity="legendary")
     Item(name="water droplet", icon="💧").AddToCategory("plants")
     Item(name="X Seed", icon="🌱").AddToCategory("plants")
     Item(name="Comet", icon="☄️")
@@ -263,7 +424,7 @@ def LoadAllItems():
     Item(name="Honey", icon="🍯").AddToCategory("bees").AddToCategory("food")
     Item(name="Teddy bear", icon="🧸")
     Item(name="Lootbox", icon="📦").AddToCategory("lootbox")
-    Item(name="Zonu", icon="<:zonu:864377761337180170>", block=False)
+    Item(name="Zonu", icon="<:zonu:864377761337180170>", block=False, rarity="legendary")
     
     Item(name="Mask", icon="👺")
     Item(name="Poop", icon="💩")
@@ -281,7 +442,7 @@ def LoadAllItems():
     Item(name="Bone", icon="🦴")
     Item(name="Cap", icon="🧢")
     Item(name="Top Hat", icon="🎩")
-    Item(name="Crown", icon="👑")
+    Item(name="Crown", icon="👑", rarity="rare")
     Item(name="Ring", icon="💍")
     Item(name="Glasses", icon="👓")
     Item(name="Backpack", icon="🎒")
@@ -297,7 +458,7 @@ def LoadAllItems():
     Item(name="Cactus", icon="🌵")
     Item(name="Christmas Tree", icon="🎄")
     Item(name="Clover", icon="☘️").AddToCategory("plants").AddToCategory("usable")
-    Item(name="Four Leaf Clover", icon="🍀").AddToCategory("plants").AddToCategory("usable")
+    Item(name="Four Leaf Clover", icon="🍀", rarity="rare").AddToCategory("plants").AddToCategory("usable")
     Item(name="Tulip", icon="🌷").AddToCategory("plants")
     Item(name="Rose", icon="🌹").AddToCategory("plants")
     Item(name="Sunflower", icon="🌻").AddToCategory("plants")
@@ -329,8 +490,8 @@ def LoadAllItems():
     Item(name="Crayon", icon="🖍️")
 
     Item(name="Scroll", icon="<:scroll:864727743206785045>", block=False).AddToCategory("material")
-    Item(name="Soul Stone", icon="<:SoulStone:864725973379186688>", block=False).AddToCategory("material")
-    Item(name="Purple Crystal", icon="<:PurpleCrystal:864725697833992222>", block=False).AddToCategory("material")
+    Item(name="Soul Stone", icon="<:SoulStone:864725973379186688>", block=False, rarity="rare").AddToCategory("material")
+    Item(name="Purple Crystal", icon="<:PurpleCrystal:864725697833992222>", block=False, rarity="rare").AddToCategory("material")
     Item(name="Health Potion", icon="<:healthpotion:864727727357427753>", block=False).AddToCategory("material")
     Item(name="Ember Insect", icon="<:emberedInsect:864725884212609054>", block=False).AddToCategory("material")
 
@@ -350,7 +511,7 @@ def LoadAllItems():
     Item(name="Wood Plank", icon="<:WoodPlank:865439400691630120>", block=False).AddToCategory("plants").AddToCategory("wooden")
 
 
-    Item(name="Devil's Feathers", icon="<:ArcticDevilsfeathers:865452032965345340>", block=False).AddToCategory("arctic").AddToCategory("devil")
+    Item(name="Devil's Feathers", icon="<:ArcticDevilsfeathers:865452032965345340>", block=False, rarity="rare").AddToCategory("arctic").AddToCategory("devil")
     Item(name="Axe", icon="<:Axe:865452032894697502>", block=False).AddToCategory("Barbarian")
     Item(name="arrows", icon="<:arrows:865452032513409075>", block=False).AddToCategory("Barbarian")
     Item(name="Fish", icon="<:Fish_:865452032378535947>", block=False).AddToCategory("Barbarian")
@@ -358,4 +519,6 @@ def LoadAllItems():
     Item(name="Dagger", icon="<:Dagger:865452032541196298>", block=False).AddToCategory("Barbarian")
     Item(name="Bow", icon="<:Bow:865452032756154398>", block=False).AddToCategory("Barbarian")
     
-    Item(name="blood droplet", icon="🩸").AddToCategory("material")
\ No newline at end of file
+    Item(name="blood droplet", icon="🩸").AddToCategory("material")
+
+Item.LoadItems() # registered once, when the module is imported
\ No newline at end of file
@@ -0,0 +1,98 @@
+from __future__ import annotations
+from GameLogic.Items import Item
+from Utils.ErrorHandling import InventoryError
+import itertools, random
+
+#################### LOOT TABLES ####################
+# what every reward source can drop, as (kind, key, weight) entries:
+#   ("item", name, w)      -> that item
+#   ("category", name, w)  -> the weight is split evenly between the items of the category
+#   ("rarity", name, w)    -> same, for every item of that rarity
+#   ("all", None, w)       -> same, for every item
+# an item reachable through several entries adds their weights up.
+LOOT_TABLES = {
+    "lootbox"      : [("rarity", "common", 85), ("rarity", "rare", 12), ("rarity", "legendary", 3)],
+    "x plant"      : [("rarity", "common", 88), ("rarity", "rare", 10), ("rarity", "legendary", 2)],
+    "wooden plant" : [("category", "wooden", 40), ("rarity", "common", 55), ("rarity", "rare", 5)],
+    "arctic plant" : [("category", "arctic", 30), ("rarity", "common", 60), ("rarity", "rare", 8), ("rarity", "legendary", 2)],
+    "bee"          : [("item", "honey", 40), ("rarity", "common", 57), ("rarity", "rare", 3)],
+    "daily"        : [("item", "lootbox", 40), ("item", "water droplet", 30), ("item", "honey", 20), ("rarity", "rare", 9), ("rarity", "legendary", 1)],
+}
+#####################################################
+BATCH_DRAWS_FROM = 10 # measured crossover between looping over AliasTable.Draw and a single random.choices call
+
+class AliasTable:
+    """walker's alias method (vose's variant): O(n) to build, O(1) per draw whatever the amount of outcomes"""
+    __slots__ = ("outcomes", "probability", "alias")
+    def __init__(self, outcomes : list, weights : list[float]) -> None:
+        count = len(outcomes)
+        total = sum(weights)
+        if count == 0 or total <= 0: raise ValueError("an alias table needs at least one outcome with a positive weight")
+        scaled = [weight * count / total for weight in weights]
+        probability = [1.0] * count
+        alias = list(range(count))
+        small = [idx for idx, value in enumerate(scaled) if value < 1.0]
+        large = [idx for idx, value in enumerate(scaled) if value >= 1.0]
+        while len(small) > 0 and len(large) > 0:
+            less, more = small.pop(), large.pop()
+            probability[less] = scaled[less]
+            alias[less] = more
+            scaled[more] -= 1.0 - scaled[less]
+            (small if scaled[more] < 1.0 else large).append(more)
+        # whatever is left only differs from 1 by floating point error
+        self.outcomes = tuple(outcomes)
+        self.probability = tuple(probability)
+        self.alias = tuple(alias)
+
+    def Draw(self):
+        idx = int(random.random() * len(self.outcomes))
+        return self.outcomes[idx] if random.random() < self.probability[idx] else self.outcomes[self.alias[idx]]
+
+class LootTable:
+    TABLES : dict[str, LootTable] = {}
+    __slots__ = ("source", "chances", "table", "outcomes", "cumulative")
+    def __init__(self, source : str, entries : list[tuple[str, str, float]]) -> None:
+        self.source = source
+        weights : dict[Item, float] = {}
+        for kind, key, weight in entries:
+            items = LootTable.__Resolve__(kind, key)
+            for item in items:
+                weights[item] = weights.get(item, 0) + weight / len(items)
+        total = sum(weights.values())
+        self.chances : dict[Item, float] = {item : weight / total for item, weight in weights.items()} # exact drop rate of every item
+        self.table = AliasTable(list(weights), list(weights.values()))
+        ####### for batches: one random.choices call, the per draw loop runs in C #######
+        self.outcomes : tuple[Item, ...] = tuple(weights)
+        self.cumulative : list[float] = list(itertools.accumulate(weights.values()))
+
+    @staticmethod
+    def __Resolve__(kind : str, key : str) -> tuple[Item, ...]:
+        if kind == "item": return (Item.GetItem(id=key),)
+        if kind == "category": items = Item.CATEGORIES.get(key.lower(), ())
+        elif kind == "rarity": items = Item.RARITY.get(key, ())
+        elif kind == "all": items = Item.ALL
+        else: raise TypeError(f"unknown loot table entry kind: {kind}")
+        if len(items) == 0: raise InventoryError(f"loot table entry ({kind}, {key}) does not match any item")
+        return items
+
+    def Draw(self) -> Item:
+        return self.table.Draw()
+
+    def DrawMany(self, count : int) -> list[Item]:
+        """small batches loop over the alias table, bigger ones are one random.choices call: a bisect per draw,
+        but the loop runs in C, which wins from about BATCH_DRAWS_FROM draws on (bulk $use, $LootStats)"""
+        if count < BATCH_DRAWS_FROM:
+            draw = self.table.Draw
+            return [draw() for _ in range(count)]
+        return random.choices(self.outcomes, cum_weights=self.cumulative, k=count)
+
+    @staticmethod
+    def Get(source : str) -> LootTable:
+        if not source in LootTable.TABLES: raise InventoryError(f"cannot find loot table: {source}")
+        return LootTable.TABLES[source]
+
+    @staticmethod
+    def CompileAll(tables : dict[str, list]) -> None:
+        LootTable.TABLES = {source : LootTable(source, entries) for source, entries in tables.items()}
+
+LootTable.CompileAll(LOOT_TABLES) # once, right after the item registry got frozen
\ No newline at end of file
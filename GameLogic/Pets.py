@@ -3,17 +3,22 @@ from __future__ import annotations
 ###################### IMPORTS ######################
 from GameLogic.Player import Player
 from GameLogic.Items import Item
-from Utils.Constants import PET_GROWTH_DURATION, RewardUI, pretty_time_delta
-from Utils.Database import BeeDatabase as DATABASE
+from Utils.Constants import CACHE_IDLE_TTL, PET_GROWTH_DURATION, STORAGE_CACHE_SIZE, RewardUI, pretty_time_delta
+from Utils.Database import PetDatabase as DATABASE, AsyncPetDatabase as ASYNC_DATABASE, FlushReport
+from GameLogic.Scheduler import GROWTH_SCHEDULER
+from Utils.Handle import LazyEntity
+from Utils.Repository import Repository
 import random, time
 #####################################################
 
-class PetStorage:
-    PETSTORAGE_REFERENCES : dict[Player, PetStorageReference] = {}
-    __slots__ = ["storage", "id"]
+class PetStorage(LazyEntity):
+    REPOSITORY : Repository = None # set right below the class
+    __slots__ = ["storage", "saved"]
     def __init__(self, id : str, storage : dict[str, Pet] = None) -> None:
         self.storage : dict[str, Pet] = {} if storage == None else storage
         self.id = str(id)
+        self.is_loaded = True
+        self.saved : dict = None # the stored document, None until it was written once
 
     def ToDict(self) -> dict:
         storage = {}
@@ -22,6 +27,7 @@ class PetStorage:
         result = {}
         result['storage'] = storage
         result['id'] = self.id
+        result['finishing_times'] = sorted(storage[slot]['finishing_time'] for slot in storage) # indexed, lets the scheduler rebuild with a range query
         return result
 
     @staticmethod
@@ -30,40 +36,62 @@ class PetStorage:
         for slot in data['storage']:
             storage[str(slot)] = Pet.FromDict(data['storage'][slot], id = data['id'])
         result = PetStorage(id=data['id'], storage=storage)
-        return result
+        return result.MarkSaved()
 
     @staticmethod
     def GrowPetForUser(user : Player, pet : Pet) -> None:
         pet_storage = PetStorage.GetPetStorage(user.id)
         pet_storage.storage[str(len(pet_storage.storage))] = pet
+        GROWTH_SCHEDULER.Schedule(finishing_time=pet.finishing_time, owner_id=user.id, kind="pets", name=pet.name)
 
     async def CheckForCompletion(self, ctx):
+        """only looks at the slots once the scheduler saw one of them finish"""
+        if len(GROWTH_SCHEDULER.Drain(self.id, "pets")) == 0: return
+        await Player.LoadPlayer(self.id) # rewards mutate the owner's inventory
         current_time = time.time()
         for slot in self.storage:
             pet = self.storage[slot]
-            if pet.grown == False and pet.finishing_time < current_time:
+            if pet.grown == False and pet.finishing_time <= current_time:
                 await self.storage.get(slot).__call__(ctx)
 
+    def MarkSaved(self) -> PetStorage:
+        self.saved = self.ToDict()
+        return self
+
+    def HasChanges(self) -> bool:
+        return self.ToDict() != self.saved
+
+    def GetChanges(self) -> dict:
+        """the whole storage is rewritten, but only when something in it changed"""
+        document = self.ToDict()
+        return {"$set": document} if document != self.saved else None
+
     @staticmethod
-    def Save() -> None:
-        for id in PetStorage.PETSTORAGE_REFERENCES:
-            PetStorageRef = PetStorage.PETSTORAGE_REFERENCES[id]
-            if PetStorageRef.ReferencedItem != None: #PetStorageRef.is_mutated:
-                DATABASE.Save(key=PetStorageRef.ReferencedItem.id, value=PetStorageRef.ReferencedItem.ToDict())
-                PetStorageRef.ReferencedItem = None
+    async def Save() -> FlushReport:
+        return await PetStorage.REPOSITORY.Save()
 
     @staticmethod
     def GetPetStorage(id : str) -> PetStorage:
-        id = str(id)
-        if id in PetStorage.PETSTORAGE_REFERENCES: return PetStorage.PETSTORAGE_REFERENCES[id]
-        return PetStorageReference(id = id)
+        return PetStorage.REPOSITORY.Get(id)
+
+    @staticmethod
+    async def LoadPetStorage(id : str) -> PetStorage:
+        """same as GetPetStorage, but the storage is fetched without blocking the event loop"""
+        return await PetStorage.REPOSITORY.Load(id)
 
     @staticmethod
-    def DeletePetStorage(id : str) -> None:
-        id = str(id)
-        PetStorage.GetPetStorage(id)
-        PetStorage.PETSTORAGE_REFERENCES.pop(id).ReferencedItem = None
-        DATABASE.Delete(id)
+    async def DeletePetStorage(id : str) -> None:
+        await PetStorage.REPOSITORY.Delete(id)
+
+    ################################ LOADING ################################
+    @staticmethod
+    def __Create__(id : str, data : dict) -> PetStorage:
+        if data != None:
+            return PetStorage.FromDict( data )
+        return PetStorage(id=id)
+
+PetStorage.REPOSITORY = Repository(database=DATABASE, async_database=ASYNC_DATABASE, entity=PetStorage, create=PetStorage.__Create__,
+                                   max_entries=STORAGE_CACHE_SIZE, idle_ttl=CACHE_IDLE_TTL)
 
 class Pet:
     def __init__(self, time: int, on_finish, user : Player, name : str = "Unnamed", type = "egg") -> None:
@@ -93,12 +121,13 @@ class Pet:
         result['experience_cap'] = self.experience_cap
         result['type'] = self.type
 
-        result['time_left'] = int(self.finishing_time - time.time())
+        result['finishing_time'] = int(self.finishing_time)
         return result
 
     @staticmethod    
     def FromDict(data : dict, id : str) -> Pet:
-        pet = GrowEgg(user= Player.GetPlayer(id = id), time_left=data['time_left'], dont_grow=True)
+        time_left = data['finishing_time'] - time.time() if 'finishing_time' in data else data['time_left']
+        pet = GrowEgg(user= Player.GetPlayer(id = id), time_left=time_left, dont_grow=True)
         pet.name           = data['name']
         pet.level          = data['level']
         pet.experience     = data['experience']
@@ -117,38 +146,4 @@ def GrowEgg(user : Player, time_left : int = None, dont_grow = False) -> Pet:
         PetStorage.GrowPetForUser(user = user,
                                   pet  = pet,
                                 )
-    return pet
-
-
-
-class PetStorageReference(object):
-    def __init__(self, id : str) -> None:
-        self.ReferencedItem : PetStorage = None
-        self.id : str = id
-        self.is_mutated : bool = False
-        PetStorage.PETSTORAGE_REFERENCES[id] = self
-
-    def __getattribute__(self, name):
-        if name in ["ReferencedItem", "id", "is_mutated", "__attributeAccessed__", "__FetchReferencedItem__"]: return object.__getattribute__(self, name)
-        self.__attributeAccessed__()
-        return object.__getattribute__( self.ReferencedItem ,  name)
-
-    def __setattr__(self, name: str, value) -> None:
-        if name in ["ReferencedItem", "id", "is_mutated"]: 
-            super().__setattr__(name, value)
-        else :
-            self.__attributeAccessed__()
-            self.ReferencedItem.__setattr__(name, value)
-            self.is_mutated = True
-
-    def __attributeAccessed__(self):
-        if self.ReferencedItem == None:
-            self.ReferencedItem = self.__FetchReferencedItem__(self.id)
-            self.is_mutated = False
-
-    @staticmethod
-    def __FetchReferencedItem__(id : str) -> PetStorage:
-        data =  DATABASE.Get(key = str(id))
-        if data != None:
-            return PetStorage.FromDict( data )
-        return PetStorage(id=id)
\ No newline at end of file
+    return pet
\ No newline at end of file
@@ -1,31 +1,33 @@
 from __future__ import annotations
-from Utils.Database import PlayerDatabase as DATABASE
-from GameLogic.Items import Item, Inventory
-from Utils.Constants import STARTING_AMOUNT_OF_LOOTBOXES
-
-class Player:
-    PLAYER_REFERENCES : dict[str, PlayerReference] = {}
+from Utils.Database import PlayerDatabase as DATABASE, AsyncPlayerDatabase as ASYNC_DATABASE, FlushReport
+from GameLogic.Items import Item, Inventory, CompactInventory
+from Utils.Handle import LazyEntity
+from Utils.Members import MemberDirectory
+from Utils.Repository import Repository
+from Utils.Constants import CACHE_IDLE_TTL, COMPACT_INVENTORIES, PLAYER_CACHE_SIZE, STARTING_AMOUNT_OF_LOOTBOXES
+import copy
+
+class Player(LazyEntity):
+    REPOSITORY : Repository = None # set right below the class
+    INVENTORY : type[Inventory] = CompactInventory if COMPACT_INVENTORIES else Inventory
     BOT = None
 
-    def __init__(self, id : str, balance: int = 20, inventory: Inventory = None, extra : dict = None) -> None:
+    def __init__(self, id : str, balance: int = 20, inventory: Inventory = None, extra : dict = None, name : str = None) -> None:
         self.id : str = str(id)
+        self.is_loaded : bool = True
         self.balance : int = balance
-        ####### not what i would like , but i need this to retrieve the user's name #######
-        from discord.utils import get
-        self.name = get(Player.BOT.get_all_members(), id=int(id)).name
-        ###################################################################################
-        self.inventory : Inventory = Inventory() if inventory == None else inventory
+        # the stored name is only used when the user is not in the gateway cache (left every guild, bot restarting...)
+        self.name : str = MemberDirectory.GetName(id, default=self.id if name == None else name)
+        self.inventory : Inventory = Player.INVENTORY() if inventory == None else inventory
         self.extra = {} if extra == None else extra
+        ####### what the stored document looks like, used to only write what changed #######
+        self.is_new : bool = True
+        self.saved_balance : int = None
+        self.saved_name : str = None
+        self.saved_extra : dict = {}
 
-    def __hash__(self) -> int:
-        return int(self.id)
-
-    def __eq__(self, other : Player) -> bool:
-        if isinstance(other, Player):
-            return self.id == other.id
-        elif isinstance(other, PlayerReference):
-            return self.id == other.player.id
-        return self.id == other
+    # no __eq__/__hash__: GetPlayer hands out a single handle per live id, so identity already is player equality
+    # and comparisons in the trade/shop scans stay at C speed. code that can outlive a handle (deleted and recreated players) compares .id
 
     def __repr__(self) -> str:
         return self.name
@@ -39,20 +41,27 @@ class Player:
 
     @staticmethod
     def GetPlayer(id : str) -> Player:
-        id = str(id)
-        if id in Player.PLAYER_REFERENCES: return Player.PLAYER_REFERENCES[id]
-        return PlayerReference(id = id)
+        """returns the handle for this player, it is only loaded once one of its fields is used"""
+        return Player.REPOSITORY.Get(id)
+
+    @staticmethod
+    async def LoadPlayer(id : str) -> Player:
+        """same as GetPlayer, but the player is fetched without blocking the event loop"""
+        return await Player.REPOSITORY.Load(id)
+
+    @staticmethod
+    async def LoadPlayers(ids : list[str]) -> list[Player]:
+        """loads every player that is not loaded yet with a single query"""
+        return await Player.REPOSITORY.Prefetch(ids)
 
     @staticmethod
-    def DeletePlayer(id : str) -> None:
-        id = str(id)
-        Player.GetPlayer(id)
-        Player.PLAYER_REFERENCES.pop(id).player = None
-        DATABASE.Delete(id)
+    async def DeletePlayer(id : str) -> None:
+        await Player.REPOSITORY.Delete(id)
 
     def ToDict(self) -> dict:
         result = {}
         result["id"] = self.id
+        result["name"] = self.name
         result["balance"] = self.balance
         result["inventory"] = self.inventory.ToDict()
         result["extra"] = self.extra
@@ -62,61 +71,65 @@ class Player:
     def FromDict(data : dict) -> Player:
         result = Player(id = data.get('id'),
                         balance = data.get('balance', 20),
-                        inventory= Inventory.FromDict( data.get('inventory', {}) ),
-                        extra = data.get('extra', None)
+                        inventory= Player.INVENTORY.FromDict( data.get('inventory', {}) ),
+                        extra = data.get('extra', None),
+                        name = data.get('name', None)
                         )
+        result.MarkSaved()
+        result.saved_name = data.get('name', None)
         return result
 
+    def MarkSaved(self) -> Player:
+        """marks the current state as the one stored in the database"""
+        self.is_new = False
+        self.saved_balance = self.balance
+        self.saved_name = self.name
+        self.saved_extra = copy.deepcopy(self.extra)
+        self.inventory.changed.clear()
+        return self
+
+    def HasChanges(self) -> bool:
+        return self.is_new or self.balance != self.saved_balance or self.name != self.saved_name or self.extra != self.saved_extra or len(self.inventory.changed) > 0
+
+    def GetChanges(self) -> dict:
+        """returns the $set/$unset update that brings the stored document up to date, or None if nothing changed"""
+        if self.is_new: return {"$set": self.ToDict()}
+        set_fields, unset_fields = {}, {}
+        if self.balance != self.saved_balance:
+            set_fields["balance"] = self.balance
+        if self.name != self.saved_name:
+            set_fields["name"] = self.name
+        for key in self.extra:
+            if key not in self.saved_extra or self.saved_extra[key] != self.extra[key]:
+                set_fields[f"extra.{key}"] = self.extra[key]
+        for key in self.saved_extra:
+            if key not in self.extra:
+                unset_fields[f"extra.{key}"] = ""
+        for item in self.inventory.changed:
+            amount = self.inventory.GetItemCount(item)
+            if amount > 0: set_fields[f"inventory.{item.id}"] = amount
+            else: unset_fields[f"inventory.{item.id}"] = ""
+        update = {}
+        if len(set_fields) > 0: update["$set"] = set_fields
+        if len(unset_fields) > 0: update["$unset"] = unset_fields
+        return update if len(update) > 0 else None
+
     @staticmethod
-    def Save() -> None:
-        for id in Player.PLAYER_REFERENCES:
-            PlayerRef = Player.PLAYER_REFERENCES[id]
-            if PlayerRef.player != None: #PlayerRef.is_mutated:
-                DATABASE.Save(key=PlayerRef.player.id, value=PlayerRef.player.ToDict())
-                PlayerRef.player = None
+    async def Save() -> FlushReport:
+        return await Player.REPOSITORY.Save()
 
     @staticmethod
     def Clear() -> None:
-        for id in Player.PLAYER_REFERENCES:
-            PlayerRef = Player.PLAYER_REFERENCES[id]
-            PlayerRef.player = None
-
-class PlayerReference(object):
-    def __init__(self, id : str) -> None:
-        self.player : Player = None
-        self.id : str = id
-        self.is_mutated : bool = False
-        Player.PLAYER_REFERENCES[id] = self
-
-    def __repr__(self) -> str:
-        self.__attributeAccessed__()
-        if self.player != None:
-            return self.player.__repr__()
-        return f"<EMPTY REFERENCE TO: {self.id}>"
-
-    def __getattribute__(self, name):
-        if name in ["player", "id", "is_mutated", "__attributeAccessed__", "__FetchPlayer__"]: return object.__getattribute__(self, name)
-        self.__attributeAccessed__()
-        return object.__getattribute__( self.player ,  name)
-
-    def __setattr__(self, name: str, value) -> None:
-        if name in ["player", "id", "is_mutated"]: 
-            super().__setattr__(name, value)
-        else :
-            self.__attributeAccessed__()
-            self.player.__setattr__(name, value)
-            self.is_mutated = True
-
-    def __attributeAccessed__(self):
-        if self.player == None:
-            self.player = self.__FetchPlayer__(self.id)
-            self.is_mutated = False
+        Player.REPOSITORY.Clear()
 
+    ################################ LOADING ################################
     @staticmethod
-    def __FetchPlayer__(id : str) -> Player:
-        data =  DATABASE.Get(key = str(id))
+    def __Create__(id : str, data : dict) -> Player:
         if data != None:
             return Player.FromDict( data )
         new_player = Player(id=id)
         new_player.inventory.AddItem(item=Item.GetItem("lootbox"), amount=STARTING_AMOUNT_OF_LOOTBOXES)
-        return new_player
\ No newline at end of file
+        return new_player
+
+Player.REPOSITORY = Repository(database=DATABASE, async_database=ASYNC_DATABASE, entity=Player, create=Player.__Create__,
+                               max_entries=PLAYER_CACHE_SIZE, idle_ttl=CACHE_IDLE_TTL)
\ No newline at end of file
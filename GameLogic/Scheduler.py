@@ -0,0 +1,101 @@
+from __future__ import annotations
+from Utils.Database import AsyncAbstractDatabase
+from pymongo import UpdateOne
+import asyncio, heapq, itertools, time
+
+class GrowthScheduler:
+    """one min-heap holding every pending plant/bee/pet timer, keyed on finishing_time.
+    inserting is O(log n) and the runner only ever looks at the earliest timer,
+    so it sleeps until exactly that moment instead of anyone scanning storages.
+    finished timers are kept per owner until $checkplants/$checkbees drains them, so those only open storages that have something ready"""
+    def __init__(self) -> None:
+        self.heap : list[tuple[float, int, str, str, str]] = [] # (finishing_time, sequence, owner id, kind, name)
+        self.sequence = itertools.count() # keeps timers due at the same second in insertion order
+        self.wakeup : asyncio.Event = None
+        self.runner : asyncio.Task = None
+        self.due : dict[tuple[str, str], list[str]] = {} # (owner id, kind) -> names of the finished timers nobody collected yet
+        self.fired = 0
+
+    def Schedule(self, finishing_time : float, owner_id : str, kind : str, name : str) -> None:
+        timer = (finishing_time, next(self.sequence), str(owner_id), kind, name)
+        heapq.heappush(self.heap, timer)
+        if self.heap[0] is timer and self.wakeup != None:
+            self.wakeup.set() # the runner is sleeping towards a later timer
+
+    def Drain(self, owner_id : str, kind : str) -> list[str]:
+        """hands out (and forgets) the names of this owner's finished timers of that kind"""
+        return self.due.pop((str(owner_id), kind), [])
+
+    def Cancel(self, owner_id : str) -> int:
+        """drops every timer of this owner, O(n) so it is only meant for deleting players"""
+        owner_id = str(owner_id)
+        before = len(self.heap)
+        self.heap = [timer for timer in self.heap if timer[2] != owner_id]
+        heapq.heapify(self.heap)
+        for key in [key for key in self.due if key[0] == owner_id]:
+            self.due.pop(key)
+        return before - len(self.heap)
+
+    async def Rebuild(self, sources : dict[str, AsyncAbstractDatabase]) -> int:
+        """reloads every timer, one indexed query per collection (kind -> database).
+        the ones that finished while the bot was offline go straight to due, without notifying anyone.
+        once the runner started, timers scheduled since then only live in memory, so a reconnect does not rebuild again"""
+        if self.runner != None and not self.runner.done(): return len(self.heap)
+        self.heap = []
+        self.due = {}
+        now = time.time()
+        for kind, database in sources.items():
+            await database.CreateIndex("finishing_times")
+            await GrowthScheduler.Backfill(database)
+            documents = await database.Find({"finishing_times" : {"$gt" : 0}}, projection={"_id" : 0, "id" : 1, "storage" : 1})
+            for document in documents:
+                for timer in document["storage"].values():
+                    if "finishing_time" not in timer: continue # legacy pets, stored with a relative time_left
+                    if timer["finishing_time"] > now:
+                        self.heap.append((timer["finishing_time"], next(self.sequence), document["id"], kind, timer["name"]))
+                    else:
+                        self.due.setdefault((document["id"], kind), []).append(timer["name"])
+        heapq.heapify(self.heap)
+        if self.wakeup != None: self.wakeup.set()
+        return len(self.heap)
+
+    @staticmethod
+    async def Backfill(database : AsyncAbstractDatabase) -> int:
+        """storages saved before finishing_times existed are invisible to the indexed query, it is written for them once"""
+        documents = await database.Find({"finishing_times" : {"$exists" : False}}, projection={"_id" : 0, "id" : 1, "storage" : 1})
+        operations = [UpdateOne({"id" : document["id"]}, {"$set" : {"finishing_times" : sorted(timer["finishing_time"] for timer in document.get("storage", {}).values() if "finishing_time" in timer)}})
+                      for document in documents]
+        if len(operations) > 0: await database.BulkWrite(operations)
+        return len(operations)
+
+    def Start(self, on_due) -> None:
+        """on_due(owner_id, kind, name) is awaited once for every timer as soon as it finishes"""
+        if self.runner != None and not self.runner.done(): return
+        self.wakeup = asyncio.Event()
+        self.runner = asyncio.get_running_loop().create_task(self.__Run__(on_due))
+
+    async def __Run__(self, on_due) -> None:
+        while True:
+            self.wakeup.clear()
+            now = time.time()
+            due = []
+            while len(self.heap) > 0 and self.heap[0][0] <= now:
+                due.append(heapq.heappop(self.heap))
+            if len(due) > 0:
+                self.fired += len(due)
+                for _, _, owner_id, kind, name in due:
+                    self.due.setdefault((owner_id, kind), []).append(name)
+                results = await asyncio.gather(*[on_due(owner_id, kind, name) for _, _, owner_id, kind, name in due], return_exceptions=True)
+                for result in results:
+                    if isinstance(result, Exception): print(f"growth timer failed: {result!r}")
+                continue
+            timeout = None if len(self.heap) == 0 else self.heap[0][0] - now
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def __repr__(self) -> str:
+        return f"{len(self.heap)} pending, {self.fired} fired, {sum(len(names) for names in self.due.values())} waiting to be collected"
+
+GROWTH_SCHEDULER = GrowthScheduler()
\ No newline at end of file
@@ -34,13 +34,26 @@ class PendingTrade:
         self.id = id
         PendingTrade.PENDING_TRADES[id] = self
 
-    def Cancel(self) -> PendingTrade:
-        self.seller.inventory.AddItems(items=self.seller_items)
+    def Cancel(self, skip : str = None) -> PendingTrade:
+        """skip is the id of a player being deleted, their items are not given back"""
+        if self.seller.id != skip:
+            self.seller.inventory.AddItems(items=self.seller_items)
         PendingTrade.PENDING_TRADES.pop(self.id)
         return self
 
+    async def LoadParticipants(self) -> PendingTrade:
+        await Player.LoadPlayer(self.seller.id)
+        return self
+
+    def Participants(self) -> list[str]:
+        return [self.seller.id]
+
+    def IsOpen(self) -> bool:
+        """false once it was accepted or cancelled"""
+        return PendingTrade.PENDING_TRADES.get(self.id) is self
+
     def CanTrade(self, Trader : Player) -> bool:
-        return len(self.possible_traders) == 0 or Trader in self.possible_traders
+        return len(self.possible_traders) == 0 or any(Trader.id == trader.id for trader in self.possible_traders)
 
     def ConvertToTrade(self, Trader : Player, items : dict[Item, int]) -> Trade:
         PendingTrade.PENDING_TRADES.pop(self.id)
@@ -58,26 +71,40 @@ class PendingTrade:
 
     @staticmethod
     def GetTradesWith(user: Player) -> list[PendingTrade]:
+        id = user.id
         result = []
         for trade_id in PendingTrade.PENDING_TRADES:
             trade : PendingTrade = PendingTrade.PENDING_TRADES[trade_id]
-            if user == trade.seller or user in trade.possible_traders:
+            if id == trade.seller.id or any(id == trader.id for trader in trade.possible_traders):
                 result.append(trade)
         return result
 
+    @staticmethod
+    def CancelTradesBy(id : str) -> list[PendingTrade]:
+        """drops the offers of a player being deleted"""
+        id = str(id)
+        result = []
+        for trade_id in PendingTrade.PENDING_TRADES.copy():
+            trade : PendingTrade = PendingTrade.PENDING_TRADES[trade_id]
+            if trade.seller.id == id:
+                result.append(trade.Cancel(skip=id))
+        return result
+
     @staticmethod
     def GetTradeBy(user: Player) -> PendingTrade:
+        id = user.id
         for trade_id in PendingTrade.PENDING_TRADES:
             trade : PendingTrade = PendingTrade.PENDING_TRADES[trade_id]
-            if user == trade.seller:
+            if id == trade.seller.id:
                 return trade
         raise TradeError(f"Cannot find any pending trade by {user}!")
 
     @staticmethod
     def IsTrading(user: Player) -> bool:
+        id = user.id # by id, the trade can hold the handle of a player that was deleted and came back since
         for trade_id in PendingTrade.PENDING_TRADES:
             trade : PendingTrade = PendingTrade.PENDING_TRADES[trade_id]
-            if user == trade.seller:
+            if id == trade.seller.id:
                 return True
         return False
 
@@ -92,12 +119,24 @@ class Trade:
         self.id = id
         Trade.TRADES[id] = self
     
-    def Cancel(self) -> Trade:
-        self.UserOne.inventory.AddItems(self.UserOneItems)
-        self.UserTwo.inventory.AddItems(self.UserTwoItems)
+    def Cancel(self, skip : str = None) -> Trade:
+        """skip is the id of a player being deleted, their items are not given back"""
+        if self.UserOne.id != skip: self.UserOne.inventory.AddItems(self.UserOneItems)
+        if self.UserTwo.id != skip: self.UserTwo.inventory.AddItems(self.UserTwoItems)
         Trade.TRADES.pop(self.id)
         return self
 
+    async def LoadParticipants(self) -> Trade:
+        await Player.LoadPlayers([self.UserOne.id, self.UserTwo.id])
+        return self
+
+    def Participants(self) -> list[str]:
+        return [self.UserOne.id, self.UserTwo.id]
+
+    def IsOpen(self) -> bool:
+        """false once it was confirmed or cancelled"""
+        return Trade.TRADES.get(self.id) is self
+
     def confirm(self) -> None:
         self.UserOne.inventory.AddItems(self.UserTwoItems)
         self.UserTwo.inventory.AddItems(self.UserOneItems)
@@ -111,35 +150,36 @@ class Trade:
 
     @staticmethod
     def GetTradesWith(user: Player) -> list[Trade]:
+        id = user.id
         result = []
         for trade_id in Trade.TRADES:
             trade : Trade = Trade.TRADES[trade_id]
-            if user == trade.UserOne or user == trade.UserTwo:
+            if id == trade.UserOne.id or id == trade.UserTwo.id:
                 result.append(trade)
         return result
 
     @staticmethod
-    def CancelTradesWith(id : str) -> list[Trade]:
-        user = Player.GetPlayer(id)
-        result = []
-        for trade_id in Trade.TRADES.copy():
-            trade : Trade = Trade.TRADES[trade_id]
-            if user == trade.UserOne or user == trade.UserTwo:
-                trade.Cancel()
-        return result
+    async def CancelTradesWith(id : str) -> list[Trade]:
+        """cancels the trades of a player being deleted, only the other side gets their items back"""
+        id = str(id)
+        trades = [trade for trade in Trade.TRADES.values() if id in trade.Participants()]
+        await Player.LoadPlayers([user for trade in trades for user in trade.Participants() if user != id])
+        return [trade.Cancel(skip=id) for trade in trades if trade.IsOpen()]
 
     @staticmethod
     def GetTradeBy(user: Player) -> Trade:
+        id = user.id
         for trade_id in Trade.TRADES:
             trade : Trade = Trade.TRADES[trade_id]
-            if user == trade.UserOne or user == trade.UserTwo:
+            if id == trade.UserOne.id or id == trade.UserTwo.id:
                 return trade
         raise TradeError(f"Cannot find any trade involving {user}!")
 
     @staticmethod
     def IsTrading(user: Player) -> bool:
+        id = user.id # by id, see PendingTrade.IsTrading
         for trade_id in Trade.TRADES:
             trade : Trade = Trade.TRADES[trade_id]
-            if user == trade.UserOne or user == trade.UserTwo:
+            if id == trade.UserOne.id or id == trade.UserTwo.id:
                 return True
         return False
\ No newline at end of file
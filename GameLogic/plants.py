@@ -1,18 +1,24 @@
 from __future__ import annotations
 ###################### IMPORTS ######################
-from Utils.Database import PlantDatabase as DATABASE
+from Utils.Database import PlantDatabase as DATABASE, AsyncPlantDatabase as ASYNC_DATABASE, FlushReport
 from GameLogic.Items import Item
+from GameLogic.LootTables import LootTable
 from GameLogic.Player import Player
-from Utils.Constants import RewardUI, SEED_DURATION, pretty_time_delta
+from Utils.Constants import CACHE_IDLE_TTL, STORAGE_CACHE_SIZE, RewardUI, SEED_DURATION, pretty_time_delta
+from GameLogic.Scheduler import GROWTH_SCHEDULER
+from Utils.Handle import LazyEntity
+from Utils.Repository import Repository
 import random, time
 #####################################################
 
-class PlantStorage:
-    PLANTSTORAGE_REFERENCES : dict[str, PlantStorageReference] = {}
-    __slots__ = ["storage", "id"]
+class PlantStorage(LazyEntity):
+    REPOSITORY : Repository = None # set right below the class
+    __slots__ = ["storage", "saved"]
     def __init__(self, id : str, storage : dict[str, Plant] = None) -> None:
         self.storage: dict[str, Plant] = {} if storage == None else storage
         self.id = str(id)
+        self.is_loaded = True
+        self.saved : dict = None # the stored document, None until it was written once
 
     def ToDict(self) -> dict:
         storage = {}
@@ -21,6 +27,7 @@ class PlantStorage:
         result = {}
         result['storage'] = storage
         result['id'] = self.id
+        result['finishing_times'] = sorted(storage[slot]['finishing_time'] for slot in storage) # indexed, lets the scheduler rebuild with a range query
         return result
 
     @staticmethod
@@ -29,41 +36,63 @@ class PlantStorage:
         for slot in data['storage']:
             storage[slot] = Plant.FromDict(data['storage'][slot], data['id'])
         result = PlantStorage(id = data['id'], storage=storage)
-        return result
+        return result.MarkSaved()
 
     @staticmethod
     def PlantForUser(user : Player, plant : Plant) -> None:
         plant_storage = PlantStorage.GetPlantStorage(user.id)
         plant_storage.storage[str(len(plant_storage.storage))] = plant
+        GROWTH_SCHEDULER.Schedule(finishing_time=plant.finishing_time, owner_id=user.id, kind="plants", name=plant.name)
 
     async def CheckForCompletion(self, ctx):
+        """only looks at the slots once the scheduler saw one of them finish"""
+        if len(GROWTH_SCHEDULER.Drain(self.id, "plants")) == 0: return
+        await Player.LoadPlayer(self.id) # rewards mutate the owner's inventory
         current_time = time.time()
         for slot in self.storage.copy():
             plant = self.storage[slot]
-            if plant.finishing_time < current_time:
+            if plant.finishing_time <= current_time:
                 await self.storage.pop(slot).__call__(ctx) #Removes the grown plant and calls its corresponding event
                 #print(plant, " is done!")
 
+    def MarkSaved(self) -> PlantStorage:
+        self.saved = self.ToDict()
+        return self
+
+    def HasChanges(self) -> bool:
+        return self.ToDict() != self.saved
+
+    def GetChanges(self) -> dict:
+        """the whole storage is rewritten, but only when something in it changed"""
+        document = self.ToDict()
+        return {"$set": document} if document != self.saved else None
+
     @staticmethod
-    def Save() -> None:
-        for id in PlantStorage.PLANTSTORAGE_REFERENCES:
-            PlantStorageRef = PlantStorage.PLANTSTORAGE_REFERENCES[id]
-            if PlantStorageRef.ReferencedItem != None: #PlantStorageRef.is_mutated:
-                DATABASE.Save(key=PlantStorageRef.ReferencedItem.id, value=PlantStorageRef.ReferencedItem.ToDict())
-                PlantStorageRef.ReferencedItem = None
+    async def Save() -> FlushReport:
+        return await PlantStorage.REPOSITORY.Save()
 
     @staticmethod
     def GetPlantStorage(id : str) -> PlantStorage:
-        id = str(id)
-        if id in PlantStorage.PLANTSTORAGE_REFERENCES: return PlantStorage.PLANTSTORAGE_REFERENCES[id]
-        return PlantStorageReference(id = id)
+        return PlantStorage.REPOSITORY.Get(id)
 
     @staticmethod
-    def DeletePlantStorage(id : str) -> None:
-        id = str(id)
-        PlantStorage.GetPlantStorage(id)
-        PlantStorage.PLANTSTORAGE_REFERENCES.pop(id).ReferencedItem = None
-        DATABASE.Delete(id)
+    async def LoadPlantStorage(id : str) -> PlantStorage:
+        """same as GetPlantStorage, but the storage is fetched without blocking the event loop"""
+        return await PlantStorage.REPOSITORY.Load(id)
+
+    @staticmethod
+    async def DeletePlantStorage(id : str) -> None:
+        await PlantStorage.REPOSITORY.Delete(id)
+
+    ################################ LOADING ################################
+    @staticmethod
+    def __Create__(id : str, data : dict) -> PlantStorage:
+        if data != None:
+            return PlantStorage.FromDict( data )
+        return PlantStorage(id=id)
+
+PlantStorage.REPOSITORY = Repository(database=DATABASE, async_database=ASYNC_DATABASE, entity=PlantStorage, create=PlantStorage.__Create__,
+                                     max_entries=STORAGE_CACHE_SIZE, idle_ttl=CACHE_IDLE_TTL)
 
 class Plant:
     def __init__(self, time: int, on_finish, user : Player, name : str = "Plant", type="normal") -> None:
@@ -95,37 +124,6 @@ class Plant:
 
         raise TypeError(f"attempted to load unknown plant time!! (type={plant_type})")
 
-class PlantStorageReference(object):
-    def __init__(self, id : str) -> None:
-        self.ReferencedItem : PlantStorage = None
-        self.id : str = id
-        self.is_mutated : bool = False
-        PlantStorage.PLANTSTORAGE_REFERENCES[id] = self
-
-    def __getattribute__(self, name):
-        if name in ["ReferencedItem", "id", "is_mutated", "__attributeAccessed__", "__FetchReferencedItem__"]: return object.__getattribute__(self, name)
-        self.__attributeAccessed__()
-        return object.__getattribute__( self.ReferencedItem ,  name)
-
-    def __setattr__(self, name: str, value) -> None:
-        if name in ["ReferencedItem", "id", "is_mutated"]: 
-            super().__setattr__(name, value)
-        else :
-            self.__attributeAccessed__()
-            self.ReferencedItem.__setattr__(name, value)
-            self.is_mutated = True
-
-    def __attributeAccessed__(self):
-        if self.ReferencedItem == None:
-            self.ReferencedItem = self.__FetchReferencedItem__(self.id)
-            self.is_mutated = False
-
-    @staticmethod
-    def __FetchReferencedItem__(id : str) -> PlantStorage:
-        data =  DATABASE.Get(key = str(id))
-        if data != None:
-            return PlantStorage.FromDict( data )
-        return PlantStorage(id=id)
 
 
 
@@ -136,7 +134,7 @@ class PlantStorageReference(object):
 def XSeedPlant(user : Player, time_left : int = None, dont_plant = False) -> Plant:
     if time_left == None: time_left = SEED_DURATION.x_seed
     async def Reward(ctx):
-        items_to_give = [Item.GetRandomItem() for _ in range(random.randint(2,8))]
+        items_to_give = LootTable.Get("x plant").DrawMany(count=random.randint(2,8))
         await RewardUI(ctx=ctx,
                 user=user,
                 items_to_give=items_to_give,
@@ -152,7 +150,7 @@ def XSeedPlant(user : Player, time_left : int = None, dont_plant = False) -> Pla
 def WoodenPlant(user : Player, time_left : int = None, dont_plant = False) -> Plant:
     if time_left == None: time_left = SEED_DURATION.wooden_seed
     async def Reward(ctx):
-        items_to_give = Item.GetRandomItemsFrom(category="wooden", count=random.randint(1,2)) + Item.GetRandomItems(count=random.randint(1,3))
+        items_to_give = LootTable.Get("wooden plant").DrawMany(count=random.randint(2,5))
 
         await RewardUI(ctx=ctx,
                 user=user,
@@ -169,7 +167,7 @@ def WoodenPlant(user : Player, time_left : int = None, dont_plant = False) -> Pl
 def ArcticParasitePlant(user : Player, time_left : int = None, dont_plant = False) -> Plant:
     if time_left == None: time_left = SEED_DURATION.arctic_parasite
     async def Reward(ctx):
-        items_to_give = Item.GetRandomItemsFrom(category="arctic", count=random.randint(0,2)) + Item.GetRandomItems(count=random.randint(2,5))
+        items_to_give = LootTable.Get("arctic plant").DrawMany(count=random.randint(2,7))
 
         await RewardUI(ctx=ctx,
                 user=user,
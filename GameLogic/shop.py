@@ -3,9 +3,46 @@ from __future__ import annotations
 from Utils.ErrorHandling import ShopError
 from GameLogic.Player import  Player
 from GameLogic.Items import Item
-from Utils.Constants import CURRENCY_SYMBOL, PAGE_ITEM_LIMIT
-from Utils.Database import ShopDatabase as DATABASE
-import random, string
+from Utils.Constants import COMPACTION_BATCH, CURRENCY_SYMBOL, PAGE_ITEM_LIMIT, SALE_ID_BLOCK, SHOP_LOCK_ATTEMPTS
+from Utils.Database import AsyncShopDatabase as DATABASE
+from Utils.Locks import PLAYER_LOCKS
+from Utils.Pages import PageCache, PagedIndex, ClampPage
+from pymongo import DeleteOne, InsertOne, UpdateOne
+import bisect, heapq, string, time
+
+class SaleIds:
+    """hands out sale and bid ids in O(1), without ever colliding: a counter stored in the shop collection goes through
+       n -> (a*n + b) mod 36^length, a bijection of the base 36 strings of that length, so consecutive ids do not look alike.
+       ids are 3 characters long until every 3 character one was used, then 4..."""
+    DIGITS = string.digits + string.ascii_uppercase
+    MULTIPLIER = 1_000_003 # coprime with 36, which is what makes the map a bijection
+    INCREMENT = 0x9E3779B9
+    KEY = "sale_ids" # id of the counter document
+    __slots__ = ["next", "reserved_until"]
+    def __init__(self) -> None:
+        self.next = 0
+        self.reserved_until = 0 # ids below this are reserved for this process, more are taken SALE_ID_BLOCK at a time
+
+    async def Next(self) -> str:
+        if self.next >= self.reserved_until:
+            reserved_until = await DATABASE.Increment(SaleIds.KEY, "next", SALE_ID_BLOCK)
+            self.next, self.reserved_until = reserved_until - SALE_ID_BLOCK, reserved_until
+        counter = self.next
+        self.next += 1
+        return SaleIds.Encode(counter)
+
+    @staticmethod
+    def Encode(counter : int) -> str:
+        length, first = 3, 0
+        while counter >= first + 36 ** length:
+            first += 36 ** length
+            length += 1
+        value = (SaleIds.MULTIPLIER * (counter - first) + SaleIds.INCREMENT) % (36 ** length)
+        digits = []
+        for _ in range(length):
+            value, digit = divmod(value, 36)
+            digits.append(SaleIds.DIGITS[digit])
+        return "".join(reversed(digits))
 
 class Sale:
     __slots__ = ["item", "amount", "price", "seller", "shop", "id"]
@@ -23,6 +60,8 @@ class Sale:
         result['amount'] = self.amount
         result['price'] = self.price
         result['seller'] = self.seller.id
+        result['type'] = "sale"
+        result['sale_id'] = self.id
         return result
 
     @staticmethod
@@ -31,48 +70,153 @@ class Sale:
                         amount = data['amount'],
                         price  = data['price'],
                         seller = Player.GetPlayer(id=data['seller']))
+        result.id = data.get('sale_id', None) # None for sales listed before ids were stored
         return result
 
     def __repr__(self) -> str:
         return f"[**{self.id}**] - {self.item} `x{self.amount}` : `{CURRENCY_SYMBOL}{self.price}`"
 
-    def Buy(self, client : Player) -> None:
+    def StoredAs(self) -> dict:
+        """the fields that find this sale's document when it has no sale_id yet, use {'sale_id': id} otherwise"""
+        return {'seller': self.seller.id, 'item': self.item.id, 'amount': self.amount, 'price': self.price}
+
+    async def Buy(self, client : Player) -> None:
         if client.balance < self.price:
             raise ShopError(f"You cannot buy {self.item} as you do not have enough money!")
+        seller = await Player.LoadPlayer(self.seller.id)
         client.inventory.AddItem(self.item, self.amount)
         client.balance -= self.price
-        self.seller.balance += self.price
-        self.RemoveFromAuction()
+        seller.balance += self.price
+        await self.RemoveFromAuction()
 
-    def Cancel(self, remove = True) -> None:
-        self.seller.inventory.AddItem(self.item, self.amount)
-        if remove: self.RemoveFromAuction()
+    async def Cancel(self, remove = True, refund = True) -> bool:
+        """the sale leaves the auction before anything is awaited, so nobody can buy it while the items are given back.
+           returns False (and gives nothing back) when it was bought or cancelled first.
+           refund is False when the seller is being deleted, loading them would only bring them back"""
+        if remove:
+            if self.shop == None: raise ValueError("attempted to remove sale from non-existent auction!")
+            if not self.shop.HasSale(self.id): return False
+            self.shop.__DropSale__(self.id)
+        if refund:
+            seller = await Player.LoadPlayer(self.seller.id)
+            seller.inventory.AddItem(self.item, self.amount)
+        if remove: await DATABASE.DeleteWhere({'sale_id': self.id})
+        return True
 
-    def RemoveFromAuction(self) -> None:
+    async def RemoveFromAuction(self) -> None:
         if self.shop == None: raise ValueError("attempted to remove sale from non-existent auction!")
-        self.shop.RemoveSale(self.id)
+        await self.shop.RemoveSale(self.id)
+
+class BuyOrder:
+    """a standing bid, the buyer's balance for the whole amount is held by the shop until it fills or is cancelled"""
+    __slots__ = ["id", "item", "amount", "price", "buyer", "placed_at"]
+    def __init__(self, item : Item, amount : int, price : int, buyer : Player, placed_at : float = None) -> None:
+        self.item = item
+        self.amount = amount
+        self.price = price # at most this much per unit
+        self.buyer = buyer
+        self.placed_at = time.time() if placed_at == None else placed_at
+        self.id : str = None
+
+    def ToDict(self) -> dict:
+        result = {}
+        result['type'] = "bid"
+        result['order_id'] = self.id
+        result['id'] = self.buyer.id
+        result['item'] = self.item.id
+        result['amount'] = self.amount
+        result['price'] = self.price
+        result['placed_at'] = self.placed_at
+        return result
+
+    @staticmethod
+    def FromDict(data : dict) -> BuyOrder:
+        result = BuyOrder(item      = Item.GetItem(id=data['item']),
+                          amount    = data['amount'],
+                          price     = data['price'],
+                          buyer     = Player.GetPlayer(id=data['id']),
+                          placed_at = data['placed_at'])
+        result.id = data['order_id']
+        return result
+
+    def __repr__(self) -> str:
+        return f"[**{self.id}**] - {self.item} `x{self.amount}` **at most** `{CURRENCY_SYMBOL}{self.price}` each"
+
+class OrderBook:
+    """the standing bids for one item. best bid first: highest price, then the oldest one"""
+    __slots__ = ["heap", "orders"]
+    def __init__(self) -> None:
+        self.heap : list[tuple[int, float, str]] = [] # (-price, placed_at, order id)
+        self.orders : dict[str, BuyOrder] = {}
+
+    def __len__(self) -> int:
+        return len(self.orders)
+
+    def Add(self, order : BuyOrder) -> None:
+        self.orders[order.id] = order
+        heapq.heappush(self.heap, (-order.price, order.placed_at, order.id))
+
+    def Remove(self, order_id : str) -> BuyOrder:
+        """its heap entry is dropped lazily, once it reaches the top or when most entries are removed ones"""
+        order = self.orders.pop(order_id)
+        if len(self.heap) > 2 * len(self.orders) + 16: # mostly removed bids, rebuild it
+            self.heap[:] = [entry for entry in self.heap if entry[2] in self.orders]
+            heapq.heapify(self.heap)
+        return order
+
+    def Best(self, accept = None) -> BuyOrder:
+        """the best bid accept(order) is True for (nobody fills their own bid, a sale only fills bids of players it locked)"""
+        while len(self.heap) > 0 and self.heap[0][2] not in self.orders:
+            heapq.heappop(self.heap)
+        for order in self.InOrder():
+            if accept == None or accept(order): return order
+        return None
+
+    def InOrder(self):
+        """yields the bids best first without changing the heap, O(log n) per bid looked at"""
+        for entry in Shop.__InOrder__(self.heap):
+            order = self.orders.get(entry[2])
+            if order != None: yield order
 
 class Shop:
-    __slots__ = ["auction"]
+    __slots__ = ["auction", "version", "render", "by_seller", "by_item", "by_category", "by_price", "cheapest", "books", "orders", "ids"]
     def __init__(self) -> None:
-        self.auction : dict[int, Sale] = {}
-
-    #SALE_ID: int = 0
-    def AddSale(self, sale : Sale, first_time = True) -> Sale:
-        #################ID LOGIC#################
-        amount = 3
-        while amount ** 36 < len(self.auction):
-            amount += 1
-        id = ''.join(random.SystemRandom().choice(string.ascii_uppercase + string.digits) for _ in range(3))
-        while id in self.auction:
-            id = ''.join(random.SystemRandom().choice(string.ascii_uppercase + string.digits) for _ in range(3))
-        ##########################################
-        sale.id = id
+        self.auction : PagedIndex = PagedIndex(PAGE_ITEM_LIMIT) # sale id -> Sale, in listing order
+        self.version = 0 # bumped whenever a sale is added or removed
+        self.render = PageCache() # shared by every viewer of $shop and $selling
+        ####### secondary indexes, kept in listing order like the auction itself #######
+        self.by_seller : dict[str, PagedIndex] = {}
+        self.by_item : dict[int, PagedIndex] = {}
+        self.by_category : dict[str, PagedIndex] = {}
+        self.by_price : list[tuple[int, str]] = [] # sorted (price, sale id)
+        self.cheapest : dict[int, list[tuple[float, int, str]]] = {} # item id -> heap of (price per unit, listed at version, sale id), stale entries are skipped
+        ####### standing bids #######
+        self.books : dict[int, OrderBook] = {} # item id -> its bids
+        self.orders : dict[str, BuyOrder] = {}
+        self.ids = SaleIds()
+
+    async def __NewId__(self) -> str:
+        """sales and bids share their ids so $cancelbid and $cancelsale can never be mixed up"""
+        id = await self.ids.Next()
+        while id in self.auction or id in self.orders: # only bids placed before ids were counted can be in the way
+            id = await self.ids.Next()
+        return id
+
+    async def AddSale(self, sale : Sale, first_time = True) -> Sale:
+        """new sales are first sold to the standing bids, whatever is left (if anything) is listed.
+           a sale that was completely filled comes back with amount 0 and no id"""
+        if first_time:
+            await self.__Locked__(sale.seller.id, plan=lambda: self.__Bidders__(sale), act=lambda held: self.__MatchBids__(sale, held))
+            if sale.amount == 0: return sale
+        if sale.id == None or sale.id in self.auction or sale.id in self.orders:
+            sale.id = await self.__NewId__()
         sale.shop = self
-        self.auction[id] = sale
+        self.auction[sale.id] = sale
+        self.__Index__(sale)
+        self.version += 1
         
         if first_time:
-            DATABASE.Insert(sale.seller.id, sale.ToDict())
+            await DATABASE.Insert(sale.seller.id, sale.ToDict())
         return sale
 
     def GetSale(self, id : str) -> Sale:
@@ -84,41 +228,322 @@ class Shop:
         return list(self.auction.values())
 
     def GetAllSalesFor(self, user : Player) -> list[Sale]:
-        result : list[Sale] = [] 
-        for sale_id in self.auction:
-            sale = self.auction[sale_id]
-            if sale.seller.id == user.id:
-                result.append(sale)
-        return result
+        return list(self.by_seller.get(str(user.id), {}).values())
+
+    def GetSalesOf(self, item : Item) -> list[Sale]:
+        return list(self.by_item.get(item.id, {}).values())
+
+    def GetSalesIn(self, category : str) -> list[Sale]:
+        return list(self.by_category.get(category.lower(), {}).values())
+
+    def GetSalesByPrice(self) -> list[Sale]:
+        """cheapest first"""
+        return [self.auction[sale_id] for _, sale_id in self.by_price]
+
+    ################################ INDEXES ################################
+    def __Index__(self, sale : Sale) -> None:
+        for index, key in [(self.by_seller, str(sale.seller.id)), (self.by_item, sale.item.id)] + [(self.by_category, category) for category in Item.CATEGORIES_OF.get(sale.item, ())]:
+            sales = index.get(key)
+            if sales == None: sales = index[key] = PagedIndex(PAGE_ITEM_LIMIT)
+            sales[sale.id] = sale
+        bisect.insort(self.by_price, (sale.price, sale.id))
+        self.__PushCheapest__(sale)
 
-    def DeleteSalesFor(self, id : str) -> None:
+    def __PushCheapest__(self, sale : Sale) -> None:
+        heap = self.cheapest.setdefault(sale.item.id, [])
+        heapq.heappush(heap, (sale.price / sale.amount, self.version, sale.id))
+        if len(heap) > 2 * len(self.by_item.get(sale.item.id, {})) + 16: # mostly stale entries, rebuild it
+            heap[:] = [entry for entry in heap if self.__IsCheapest__(entry)]
+            heapq.heapify(heap)
+
+    def __IsCheapest__(self, entry : tuple[float, int, str]) -> bool:
+        """entries go stale when their sale is sold, cancelled or split"""
+        sale = self.auction.get(entry[2])
+        return sale != None and sale.price / sale.amount == entry[0]
+
+    def __Unindex__(self, sale : Sale) -> None:
+        for index, key in [(self.by_seller, str(sale.seller.id)), (self.by_item, sale.item.id)] + [(self.by_category, category) for category in Item.CATEGORIES_OF.get(sale.item, ())]:
+            sales = index.get(key)
+            if sales == None: continue
+            sales.pop(sale.id, None)
+            if len(sales) == 0: index.pop(key)
+        position = bisect.bisect_left(self.by_price, (sale.price, sale.id))
+        if position < len(self.by_price) and self.by_price[position] == (sale.price, sale.id):
+            self.by_price.pop(position)
+        if sale.item.id not in self.by_item: self.cheapest.pop(sale.item.id, None)
+
+    async def DeleteSalesFor(self, id : str) -> None:
+        """drops everything this player has in the shop without giving any of it back, used when deleting them"""
         id = str(id)
         for sale in self.GetAllSalesFor(Player.GetPlayer(id=id)):
-            sale.Cancel()
-        DATABASE.DeleteAll(id)
+            await sale.Cancel(refund=False)
+        for order in self.GetOrdersFor(Player.GetPlayer(id=id)):
+            self.__DropOrder__(order)
+        await DATABASE.DeleteAll(id)
+
+    ################################ LOCKING ################################
+    async def __Locked__(self, actor_id : str, plan, act):
+        """plan() returns the ids of the other players act would pay or give items to, they are locked along with the actor
+           in one sorted Hold before anything is touched. plan is checked again once they are held, if it changed while waiting
+           everything is released and locked again, the last attempt goes ahead and act(held) leaves out whoever is not held"""
+        for attempt in range(SHOP_LOCK_ATTEMPTS):
+            held = {str(actor_id)} | plan()
+            async with PLAYER_LOCKS.Hold(*held):
+                if plan() <= held or attempt == SHOP_LOCK_ATTEMPTS - 1:
+                    return await act(held)
+
+    ################################ SWEEP BUYING ################################
+    async def SweepBuy(self, buyer : Player, item : Item, amount : int, max_price : int = None) -> list[tuple[Sale, int, int]]:
+        """buys up to amount of item from the cheapest sales (per unit) first, splitting the last lot if needed.
+           stops early on max_price (per unit) or when the buyer runs out of money.
+           returns the fills as (sale, amount bought, price paid), everything is written in one bulk write"""
+        return await self.__Locked__(buyer.id, plan=lambda: self.__Sellers__(buyer.id, item, amount, max_price),
+                                     act=lambda held: self.__Sweep__(buyer, item, amount, max_price, held))
+
+    async def __Sweep__(self, buyer : Player, item : Item, amount : int, max_price : int, held : set[str]) -> list[tuple[Sale, int, int]]:
+        buyer = await Player.LoadPlayer(buyer.id)
+        heap = self.cheapest.get(item.id, [])
+        fills, operations, skipped = [], [], []
+        ####### walk the heap without awaiting, so no other command sees a half bought auction #######
+        while amount > 0 and len(heap) > 0:
+            entry = heapq.heappop(heap)
+            if not self.__IsCheapest__(entry): continue
+            sale = self.auction[entry[2]]
+            if str(sale.seller.id) == buyer.id:
+                skipped.append(entry)
+                continue
+            if max_price != None and sale.price > max_price * sale.amount:
+                skipped.append(entry)
+                break
+            if str(sale.seller.id) not in held: # listed while the locks were taken, it is never skipped for a pricier one
+                skipped.append(entry)
+                break
+            bought = min(amount, sale.amount)
+            price = -(-sale.price * bought // sale.amount) # a split lot is paid per unit, rounded up
+            if buyer.balance < price:
+                skipped.append(entry)
+                break
+            stored_as = {'sale_id': sale.id}
+            if bought == sale.amount:
+                self.__DropSale__(sale.id)
+                operations.append(DeleteOne(stored_as))
+            else:
+                self.__Reprice__(sale, amount=sale.amount - bought, price=sale.price - price)
+                operations.append(UpdateOne(stored_as, {'$set': {'amount': sale.amount, 'price': sale.price}}))
+            buyer.balance -= price
+            buyer.inventory.AddItem(item, bought)
+            amount -= bought
+            fills.append((sale, bought, price))
+            operations.append(InsertOne(Shop.__Fill__(None, sale, bought, price, buyer.id)))
+        for entry in skipped:
+            heapq.heappush(heap, entry)
+        if len(fills) == 0: return fills
+
+        ####### pay the sellers, then persist the whole sweep at once #######
+        payouts : dict[str, int] = {}
+        for sale, _, price in fills:
+            payouts[str(sale.seller.id)] = payouts.get(str(sale.seller.id), 0) + price
+        for seller in await Player.LoadPlayers(list(payouts)):
+            seller.balance += payouts[seller.id]
+        await DATABASE.BulkWrite(operations)
+        return fills
+
+    def __Sellers__(self, buyer_id : str, item : Item, amount : int, max_price : int) -> set[str]:
+        """the sellers a sweep would buy from right now, read off the heap without popping it"""
+        sellers, seen = set(), set()
+        for entry in Shop.__InOrder__(self.cheapest.get(item.id, [])):
+            if amount <= 0: break
+            if not self.__IsCheapest__(entry) or entry[2] in seen: continue
+            seen.add(entry[2])
+            sale = self.auction[entry[2]]
+            if str(sale.seller.id) == buyer_id: continue
+            if max_price != None and sale.price > max_price * sale.amount: break
+            sellers.add(str(sale.seller.id))
+            amount -= sale.amount
+        return sellers
+
+    @staticmethod
+    def __InOrder__(heap : list) -> list:
+        """yields the entries of a heap smallest first without changing it, O(log n) per entry looked at"""
+        frontier = [(heap[0], 0)] if len(heap) > 0 else []
+        while len(frontier) > 0:
+            entry, index = heapq.heappop(frontier)
+            yield entry
+            for child in (2 * index + 1, 2 * index + 2):
+                if child < len(heap): heapq.heappush(frontier, (heap[child], child))
+
+    def __Reprice__(self, sale : Sale, amount : int, price : int) -> None:
+        """shrinks a listed sale in place, it keeps its id and its spot in the listing order"""
+        position = bisect.bisect_left(self.by_price, (sale.price, sale.id))
+        if position < len(self.by_price) and self.by_price[position] == (sale.price, sale.id):
+            self.by_price.pop(position)
+        sale.amount, sale.price = amount, price
+        bisect.insort(self.by_price, (sale.price, sale.id))
+        self.version += 1
+        self.__PushCheapest__(sale)
+
+    ################################ BIDS ################################
+    def GetOrder(self, id : str) -> BuyOrder:
+        if id in self.orders:
+            return self.orders[id]
+        raise ShopError(f"cannot find bid with id: {id}")
+
+    def GetOrdersFor(self, user : Player) -> list[BuyOrder]:
+        return [order for order in self.orders.values() if str(order.buyer.id) == str(user.id)]
+
+    def GetBestBid(self, item : Item) -> BuyOrder:
+        book = self.books.get(item.id)
+        return None if book == None else book.Best()
+
+    async def PlaceBid(self, order : BuyOrder) -> list[Sale]:
+        """escrows the buyer's balance, buys whatever is already listed at or under the bid (cheapest per unit first)
+           and keeps the rest as a standing bid. returns the sales that were bought"""
+        return await self.__Locked__(order.buyer.id, plan=lambda: {str(sale.seller.id) for sale in self.__Listed__(order)},
+                                     act=lambda held: self.__Bid__(order, held))
+
+    def __Listed__(self, order : BuyOrder) -> list[Sale]:
+        """the listed sales a bid buys right away"""
+        return [sale for sale in self.GetSalesOf(order.item)
+                if sale.amount <= order.amount and sale.price <= order.price * sale.amount and str(sale.seller.id) != str(order.buyer.id)]
+
+    async def __Bid__(self, order : BuyOrder, held : set[str]) -> list[Sale]:
+        buyer = await Player.LoadPlayer(order.buyer.id)
+        if order.amount <= 0 or order.price <= 0:
+            raise ShopError("bids need a positive amount and price!")
+        if buyer.balance < order.amount * order.price:
+            raise ShopError(f"You need `{CURRENCY_SYMBOL}{order.amount * order.price}` to bid on {order.item} `x{order.amount}`!")
+        buyer.balance -= order.amount * order.price
+        order.id = await self.__NewId__()
+
+        listed = [sale for sale in self.__Listed__(order) if str(sale.seller.id) in held]
+        listed.sort(key=lambda sale: sale.price / sale.amount)
+        bought = []
+        await Player.LoadPlayers([sale.seller.id for sale in listed])
+        for sale in listed:
+            if not self.HasSale(sale.id) or sale.amount > order.amount: continue # bought by someone else meanwhile
+            order.amount -= sale.amount
+            buyer.balance += order.price * sale.amount - sale.price # the escrow was taken at the bid price, the sale is paid at its own
+            buyer.inventory.AddItem(sale.item, sale.amount)
+            sale.seller.balance += sale.price
+            await sale.RemoveFromAuction()
+            bought.append(sale)
+        if len(bought) > 0:
+            await DATABASE.InsertMany([Shop.__Fill__(order.id, sale, sale.amount, sale.price, buyer.id) for sale in bought])
+
+        if order.amount > 0:
+            self.orders[order.id] = order
+            self.books.setdefault(order.item.id, OrderBook()).Add(order)
+            await DATABASE.Insert(buyer.id, order.ToDict())
+        return bought
+
+    async def CancelBid(self, order : BuyOrder) -> None:
+        """gives back what is still held for the bid"""
+        buyer = await Player.LoadPlayer(order.buyer.id)
+        if self.orders.get(order.id) is not order: raise ShopError("That bid was already filled or cancelled!")
+        buyer.balance += order.amount * order.price
+        self.__DropOrder__(order)
+        await DATABASE.DeleteWhere({'type': "bid", 'order_id': order.id})
+
+    def __DropOrder__(self, order : BuyOrder) -> None:
+        self.orders.pop(order.id, None)
+        book = self.books.get(order.item.id)
+        if book == None: return
+        book.Remove(order.id)
+        if len(book) == 0: self.books.pop(order.item.id)
+
+    def __Bidders__(self, sale : Sale) -> set[str]:
+        """the buyers of the bids a new sale would fill right now"""
+        book = self.books.get(sale.item.id)
+        if book == None: return set()
+        bidders, amount = set(), sale.amount
+        for bid in book.InOrder():
+            if amount <= 0 or bid.price * sale.amount < sale.price: break
+            if str(bid.buyer.id) == str(sale.seller.id): continue
+            bidders.add(str(bid.buyer.id))
+            amount -= bid.amount
+        return bidders
+
+    async def __MatchBids__(self, sale : Sale, held : set[str]) -> None:
+        """sells the new sale to the best bids (of the players in held) while they pay at least its price per unit.
+           every fill is paid at the bid's price, sale.amount/price are lowered to what is left"""
+        book = self.books.get(sale.item.id)
+        if book == None: return
+        seller_id = str(sale.seller.id)
+        fills = []
+        while sale.amount > 0:
+            bid = book.Best(accept=lambda bid: str(bid.buyer.id) != seller_id and str(bid.buyer.id) in held)
+            if bid == None or bid.price * sale.amount < sale.price: break
+            amount = min(bid.amount, sale.amount)
+            bid.amount -= amount
+            if bid.amount == 0: self.__DropOrder__(bid)
+            fills.append((bid, amount))
+            remaining = sale.amount - amount
+            sale.price = -(-sale.price * remaining // sale.amount) # the rest keeps the asked price per unit, rounded up
+            sale.amount = remaining
+        if len(fills) == 0: return
+
+        ####### settle everything in memory first, then write it in a few queries #######
+        await Player.LoadPlayers([seller_id] + [bid.buyer.id for bid, _ in fills])
+        for bid, amount in fills:
+            bid.buyer.inventory.AddItem(sale.item, amount)
+            sale.seller.balance += bid.price * amount
+        await DATABASE.InsertMany([Shop.__Fill__(bid.id, sale, amount, bid.price * amount, bid.buyer.id) for bid, amount in fills])
+        for bid in {bid.id : bid for bid, _ in fills}.values():
+            if bid.id in self.orders: await DATABASE.UpdateWhere({'type': "bid", 'order_id': bid.id}, {'$set': {'amount': bid.amount}})
+            else: await DATABASE.DeleteWhere({'type': "bid", 'order_id': bid.id})
+
+    @staticmethod
+    def __Fill__(order_id : str, sale : Sale, amount : int, price : int, buyer_id : str) -> dict:
+        return {'type': "fill", 'order_id': order_id, 'item': sale.item.id, 'amount': amount, 'price': price,
+                'buyer': str(buyer_id), 'seller': str(sale.seller.id), 'time': time.time()}
 
     def HasSale(self, id : str) -> bool:
         return (id in self.auction)
 
-    def ToPages(self) -> list[str]:
-        return Shop.__ToPages__(items= self.auction)
+    def GetPage(self, page : int) -> tuple[str, int, int]:
+        """renders only the requested page (1-based, clamped), returns (text, page index, page count)"""
+        return self.__Page__("all", self.auction, page)
+
+    def GetPageFor(self, user : Player, page : int) -> tuple[str, int, int]:
+        """same as GetPage, for the sales of one user"""
+        return self.__Page__(("seller", str(user.id)), self.by_seller.get(str(user.id)), page)
+
+    def GetPageOf(self, item : Item, page : int) -> tuple[str, int, int]:
+        return self.__Page__(("item", item.id), self.by_item.get(item.id), page)
+
+    def GetPageIn(self, category : str, page : int) -> tuple[str, int, int]:
+        category = category.lower()
+        return self.__Page__(("category", category), self.by_category.get(category), page)
+
+    def GetPageByPrice(self, page : int) -> tuple[str, int, int]:
+        pages = self.auction.pages
+        page = ClampPage(page, pages)
+        render = lambda: Shop.__RenderPage__(self.auction[sale_id] for _, sale_id in self.by_price[page * PAGE_ITEM_LIMIT : (page + 1) * PAGE_ITEM_LIMIT])
+        return self.render.Get(self.version, ("price", page), render), page, pages
+
+    def __Page__(self, view, sales : PagedIndex, page : int) -> tuple[str, int, int]:
+        """only the sales on the page are looked at, the page count is maintained by the index"""
+        pages = 1 if sales == None else sales.pages
+        page = ClampPage(page, pages)
+        render = lambda: Shop.__RenderPage__([] if sales == None else sales.Page(page))
+        return self.render.Get(self.version, (view, page), render), page, pages
 
     @staticmethod
-    def __ToPages__(items : dict[int, Sale]) -> list[str]:
-        pages = []
+    def __RenderPage__(sales) -> str:
         result = "\u200b"
-        for (idx,sale_id) in enumerate(items):
-            if idx % PAGE_ITEM_LIMIT == 0 and idx != 0:
-                pages.append(result)
-                result = "\u200b"
-            sale = items[sale_id]
+        for sale in sales:
             result += f"{sale}\n"
-        pages.append(result)
-        return pages
+        return result
 
-    def RemoveSale(self, id : int) -> Shop:
+    def __DropSale__(self, id : str) -> Sale:
         sale = self.auction.pop(id)
-        DATABASE.Delete({'seller': sale.seller.id, 'item': sale.item.id, 'amount': sale.item.id, 'price': sale.price})
+        self.__Unindex__(sale)
+        self.version += 1
+        return sale
+
+    async def RemoveSale(self, id : int) -> Shop:
+        sale = self.__DropSale__(id)
+        await DATABASE.DeleteWhere({'sale_id': sale.id})
         return self
 
     def __repr__(self) -> str:
@@ -128,7 +553,34 @@ class Shop:
             result += f"{sale}\n"
         return result
 
-    def LoadAll(self):
-        sales = DATABASE.GetAll()
-        for sale in sales:
-            self.AddSale(sale = Sale.FromDict(sale), first_time=False)
\ No newline at end of file
+    async def LoadAll(self):
+        await DATABASE.CreateIndex("sale_id", unique=True, sparse=True) # bids and fills have no sale_id
+        await DATABASE.CreateIndex("order_id", sparse=True)
+        documents = await DATABASE.Find({'type': {'$ne': "fill"}, 'id': {'$ne': SaleIds.KEY}}) # fills are only history
+        await Player.LoadPlayers([document['id'] for document in documents]) # every seller/buyer in one query instead of one per document
+        renamed = []
+        for document in documents:
+            if document.get('type') == "bid":
+                order = BuyOrder.FromDict(document)
+                self.orders[order.id] = order
+                self.books.setdefault(order.item.id, OrderBook()).Add(order)
+            else:
+                sale = Sale.FromDict(document)
+                if sale.id in self.auction: continue # listed before the shop was loaded, this is its own document
+                stored_id = sale.id
+                await self.AddSale(sale = sale, first_time=False)
+                if sale.id == stored_id: continue
+                stored_as = {**sale.StoredAs(), 'sale_id': {'$exists': False}} if stored_id == None else {'sale_id': stored_id}
+                renamed.append(UpdateOne(stored_as, {'$set': {'sale_id': sale.id}}))
+        await DATABASE.BulkWrite(renamed) # sales from before ids were stored keep the id they got now
+
+    async def Compact(self, batch_size : int = COMPACTION_BATCH) -> int:
+        """removes the stored sales and bids that are not listed anymore (left behind when deletes could not find them),
+           batch_size documents per delete. returns how many were removed"""
+        documents = await DATABASE.Find({'type': {'$ne': "fill"}, 'id': {'$ne': SaleIds.KEY}}, {'_id': 1, 'type': 1, 'sale_id': 1, 'order_id': 1})
+        stale = [document['_id'] for document in documents
+                 if (document.get('order_id') not in self.orders if document.get('type') == "bid" else document.get('sale_id') not in self.auction)]
+        removed = 0
+        for start in range(0, len(stale), batch_size):
+            removed += await DATABASE.DeleteMany({'_id': {'$in': stale[start:start + batch_size]}})
+        return removed
\ No newline at end of file
@@ -0,0 +1,94 @@
+from __future__ import annotations
+import asyncio, time
+
+class TokenBucket:
+    def __init__(self, capacity : float, refill_per_second : float) -> None:
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def Available(self) -> float:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.refill_per_second)
+        self.updated = now
+        return self.tokens
+
+    def Take(self) -> bool:
+        if self.Available() < 1: return False
+        self.tokens -= 1
+        return True
+
+    async def Wait(self) -> None:
+        """takes a token, sleeping until one is available"""
+        while not self.Take():
+            await asyncio.sleep((1 - self.tokens) / self.refill_per_second)
+
+class AnimationEngine:
+    """plays reveal animations (a list of embed descriptions) on a message without tripping discord's edit rate limit.
+    a message gets at most edits_per_message edits no matter how many frames there are, every channel shares a token bucket,
+    and a frame is skipped when the bucket is empty. the last frame is always shown.
+    a full bucket is no different from a new one, so once the table doubled the full ones nobody is playing on are dropped"""
+    PRUNE_FROM = 256 # buckets kept before the first prune
+    def __init__(self, edits_per_message : int, frame_delay : float, channel_edits : float, channel_refill_per_second : float) -> None:
+        self.edits_per_message = edits_per_message
+        self.frame_delay = frame_delay
+        self.channel_edits = channel_edits
+        self.channel_refill_per_second = channel_refill_per_second
+        self.buckets : dict[int, TokenBucket] = {}
+        self.playing : dict[int, int] = {} # channel id -> animations running in it, their bucket cannot be dropped
+        self.prune_at = AnimationEngine.PRUNE_FROM
+        self.edits_sent = 0
+        self.frames_skipped = 0
+
+    def Bucket(self, channel_id : int) -> TokenBucket:
+        bucket = self.buckets.get(channel_id)
+        if bucket == None:
+            if len(self.buckets) >= self.prune_at: self.Prune()
+            bucket = self.buckets[channel_id] = TokenBucket(self.channel_edits, self.channel_refill_per_second)
+        return bucket
+
+    def Prune(self) -> int:
+        """drops the buckets that refilled completely, amortized O(1) per bucket created"""
+        idle = [channel_id for channel_id, bucket in self.buckets.items() if channel_id not in self.playing and bucket.Available() >= bucket.capacity]
+        for channel_id in idle: self.buckets.pop(channel_id)
+        self.prune_at = max(AnimationEngine.PRUNE_FROM, 2 * len(self.buckets))
+        return len(idle)
+
+    def Plan(self, frame_count : int, budget : int) -> list[int]:
+        """spreads the budget evenly over the frames, always ending on the last one"""
+        if frame_count == 0: return []
+        budget = max(1, min(budget, frame_count))
+        return sorted({ (frame_count * (step + 1)) // budget - 1 for step in range(budget) })
+
+    async def Play(self, msg, embed, frames : list[str]) -> None:
+        channel_id = msg.channel.id
+        bucket = self.Bucket(channel_id)
+        self.playing[channel_id] = self.playing.get(channel_id, 0) + 1
+        try:
+            await self.__Play__(msg, embed, frames, bucket)
+        finally:
+            if self.playing[channel_id] <= 1: self.playing.pop(channel_id)
+            else: self.playing[channel_id] -= 1
+
+    async def __Play__(self, msg, embed, frames : list[str], bucket : TokenBucket) -> None:
+        budget = self.edits_per_message if bucket.Available() >= self.edits_per_message else 1 # hot channel: just show the result
+        shown = self.Plan(len(frames), budget)
+        self.frames_skipped += len(frames) - len(shown)
+        for frame in shown[:-1]:
+            await asyncio.sleep(self.frame_delay)
+            if not bucket.Take():
+                self.frames_skipped += 1
+                continue
+            embed.description = frames[frame]
+            await msg.edit(embed=embed)
+            self.edits_sent += 1
+        if len(shown) > 0:
+            await asyncio.sleep(self.frame_delay)
+            await bucket.Wait()
+            embed.description = frames[shown[-1]]
+            await msg.edit(embed=embed)
+            self.edits_sent += 1
+
+    def __repr__(self) -> str:
+        return f"{self.edits_sent} edits sent, {self.frames_skipped} frames skipped, {len(self.buckets)} channels"
\ No newline at end of file
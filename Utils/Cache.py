@@ -0,0 +1,69 @@
+from __future__ import annotations
+from collections import OrderedDict
+import time
+
+class LRUCache:
+    """bounded map with least-recently-used and idle-time eviction.
+    nothing is dropped on its own, entries only leave through Evict (called right after a successful flush)"""
+    __slots__ = ["entries", "max_entries", "idle_ttl", "on_evict", "hits", "misses", "evictions"]
+    def __init__(self, max_entries : int, idle_ttl : float, on_evict = None) -> None:
+        self.entries : OrderedDict[str, list] = OrderedDict() # key -> [value, last access], oldest access first
+        self.max_entries = max_entries
+        self.idle_ttl = idle_ttl
+        self.on_evict = on_evict
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def Get(self, key : str):
+        entry = self.entries.get(key)
+        if entry == None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        entry[1] = time.monotonic()
+        self.entries.move_to_end(key)
+        return entry[0]
+
+    def Put(self, key : str, value) -> None:
+        self.entries[key] = [value, time.monotonic()]
+        self.entries.move_to_end(key)
+
+    def Pop(self, key : str):
+        entry = self.entries.pop(key, None)
+        return None if entry == None else entry[0]
+
+    def Clear(self) -> list:
+        values = self.values()
+        self.entries.clear()
+        return values
+
+    def values(self) -> list:
+        return [entry[0] for entry in self.entries.values()]
+
+    def Evict(self, can_evict = None, accessed_before : float = None) -> int:
+        """drops idle entries and, while over capacity, the least recently used ones.
+        entries accessed after `accessed_before` or refused by `can_evict` are kept"""
+        now = time.monotonic()
+        overflow = len(self.entries) - self.max_entries
+        evicted = 0
+        for key in list(self.entries):
+            value, last_access = self.entries[key]
+            if overflow <= 0 and now - last_access <= self.idle_ttl: break # everything after this was used more recently
+            if accessed_before != None and last_access >= accessed_before: break
+            if can_evict != None and not can_evict(value): continue
+            del self.entries[key]
+            if self.on_evict != None: self.on_evict(value)
+            overflow -= 1
+            evicted += 1
+        self.evictions += evicted
+        return evicted
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __contains__(self, key : str) -> bool:
+        return key in self.entries
+
+    def __repr__(self) -> str:
+        return f"{len(self.entries)}/{self.max_entries} entries, {self.hits} hits, {self.misses} misses, {self.evictions} evictions"
\ No newline at end of file
@@ -4,10 +4,28 @@ PAGE_ITEM_LIMIT = 10
 ITEMS_PER_TRADE_LIMIT = 10
 STARTING_AMOUNT_OF_LOOTBOXES = 5
 BOT_MAX_ITEMS_SELLING = 10
+BULK_OPEN_THRESHOLD = 5   # from this many lootboxes/purses on, $use opens them all at once and sends one summary
+COMPACT_INVENTORIES = False # players use the array backed CompactInventory instead of the dict one, see Benchmarks/Inventories.py
 
 #SAVING CONFIG
 PLAYER_DATA_FILEPATH = './Data/PlayerData.json'
 
+#CACHE CONFIG
+PLAYER_CACHE_SIZE = 5000     # max loaded players kept in memory between saves
+STORAGE_CACHE_SIZE = 5000    # same, for each of the plant/bee/pet storages
+CACHE_IDLE_TTL = 60 * 30     # seconds without any access before an entry can be evicted
+
+#REWARD ANIMATIONS
+ANIMATION_FRAME_DELAY = 1.5          # seconds between two edits of a reward message
+ANIMATION_EDITS_PER_MESSAGE = 4      # a reward message is edited at most this many times, whatever the amount of items
+ANIMATION_CHANNEL_EDITS = 5          # edits a channel can burst (discord allows about 5 per 5 seconds)
+ANIMATION_CHANNEL_REFILL = 1.0       # edits per second the channel budget recovers
+
+#SHOP STORAGE
+SALE_ID_BLOCK = 50                   # sale/bid ids reserved from the stored counter at once, at most this many are skipped on a restart
+COMPACTION_BATCH = 500               # stale shop documents removed per delete by Shop.Compact
+SHOP_LOCK_ATTEMPTS = 3               # times a sweep/bid/new sale re-plans which players it has to lock before settling for the ones it holds
+
 #SHOP
 import time
 from GameLogic.Items import Item
@@ -15,12 +33,20 @@ import asyncio
 from GameLogic.Player import Player
 import discord
 from GameLogic.shop import Shop
+from Utils.Animation import AnimationEngine
 GLOBAL_SHOP = Shop()
+ANIMATIONS = AnimationEngine(edits_per_message=ANIMATION_EDITS_PER_MESSAGE, frame_delay=ANIMATION_FRAME_DELAY,
+                             channel_edits=ANIMATION_CHANNEL_EDITS, channel_refill_per_second=ANIMATION_CHANNEL_REFILL)
 
 # NEXT SHOP REFRESH
 class SHOP_CONSTANTS:
     next_refresh_at : int = 0
 
+# RUNTIME COUNTERS (shown by $CacheStats)
+class BOT_METRICS:
+    rest_calls_avoided : int = 0  # on_message used to await bot.fetch_user for every message
+    messages_skipped : int = 0    # messages dropped before any work because they are not commands
+
 #SEED GROWTH DURATION
 MINUTE = 60 # will be changed when debugging so plants can grow quickly
 class SEED_DURATION:
@@ -129,16 +155,18 @@ async def RewardUI( ctx, user : Player, title : str , items_to_give : list[Item]
         description= "\n\n".join(hidden_content),
         color=discord.Color.dark_teal(),
         )
+        player = await Player.LoadPlayer(user.id)
+        for item in items_to_give: # the items are given right away, the animation is only cosmetic
+            player.inventory.AddItem(item)
         msg = await ctx.reply(embed=embed)
+        frames = []
         for i in range(len(items_to_give)):
             hidden_content[i] = f"**->** {items_to_give[i]}"
-            embed.description = "\n\n".join(hidden_content)
-            Player.GetPlayer(user.id).inventory.AddItem(items_to_give[i])
-            await asyncio.sleep(1.5)
-            await msg.edit(embed=embed)
+            frames.append("\n\n".join(hidden_content))
+        await ANIMATIONS.Play(msg=msg, embed=embed, frames=frames)
 
 async def RefreshShop():
     SHOP_CONSTANTS.next_refresh_at = time.time() + (60 * 30)
     bot_user = Player.GetPlayer(Player.BOT.user.id)
     for sale in GLOBAL_SHOP.GetAllSalesFor(user = bot_user):
-        sale.Cancel()
\ No newline at end of file
+        await sale.Cancel()
\ No newline at end of file
@@ -1,5 +1,7 @@
 from __future__ import annotations, print_function
-import os, pymongo
+import os, pymongo, asyncio, functools, time, copy
+from concurrent.futures import ThreadPoolExecutor
+from pymongo import ReturnDocument, UpdateOne
 from pymongo.collection import Collection
 from dotenv import load_dotenv
 load_dotenv()
@@ -7,6 +9,11 @@ load_dotenv()
 client =pymongo.MongoClient(os.environ["MONGO_KEY"]) 
 MongoDatabase = client.get_database(name = "Arrodes")
 
+# every blocking pymongo call made from a coroutine is offloaded to this pool so the gateway loop never waits on mongo
+DATABASE_EXECUTOR = ThreadPoolExecutor(max_workers=int(os.environ.get("MONGO_WORKERS", 8)), thread_name_prefix="mongo")
+# max number of upserts sent in a single bulk_write by the FlushEngine
+FLUSH_CHUNK_SIZE = int(os.environ.get("FLUSH_CHUNK_SIZE", 1000))
+
 class AbstractDatabase:
     def __init__(self, collection : Collection) -> None:
         self.collection = collection
@@ -37,6 +44,202 @@ class AbstractDatabase:
     def GetAll(self) -> list[dict]:
         return self.collection.find({})
 
+    def GetMany(self, keys : list[str]) -> list[dict]:
+        """fetches every document whose id is in keys with a single query"""
+        return list(self.collection.find({"id" : {"$in" : [str(key) for key in keys]}}))
+
+    def Find(self, query : dict, projection : dict = None) -> list[dict]:
+        return list(self.collection.find(query, projection))
+
+    def InsertMany(self, values : list[dict]) -> None:
+        if len(values) > 0: self.collection.insert_many(values, ordered=False)
+
+    def UpdateWhere(self, query : dict, update : dict) -> None:
+        self.collection.update_one(query, update)
+
+    def DeleteWhere(self, query : dict) -> None:
+        self.collection.delete_one(query)
+
+    def DeleteMany(self, query : dict) -> int:
+        return self.collection.delete_many(query).deleted_count
+
+    def Increment(self, key : str, field : str, amount : int = 1) -> int:
+        """atomically adds amount to a counter document (created at 0) and returns the new value"""
+        document = self.collection.find_one_and_update({'id':str(key)}, {"$inc": {field: amount}}, upsert=True, return_document=ReturnDocument.AFTER)
+        return document[field]
+
+    def BulkWrite(self, operations : list) -> None:
+        """sends already built pymongo operations (InsertOne, UpdateOne, DeleteOne...) in a single unordered round trip"""
+        if len(operations) > 0: self.collection.bulk_write(operations, ordered=False)
+
+    def CreateIndex(self, field : str, unique : bool = False, sparse : bool = False) -> str:
+        """no-op when the index already exists. sparse leaves out the documents without the field (needed for unique ones)"""
+        return self.collection.create_index(field, unique=unique, sparse=sparse)
+
+    def BulkUpsert(self, updates : dict[str, dict]):
+        """applies every update document (keyed by id) as a single unordered bulk_write of upserts"""
+        operations = [UpdateOne({'id':str(key)}, updates[key], upsert=True) for key in updates]
+        return self.collection.bulk_write(operations, ordered=False)
+
+class AsyncAbstractDatabase:
+    """awaitable counterpart of AbstractDatabase. 
+    any pymongo compatible collection works (a mongomock collection can be passed in for testing)"""
+    def __init__(self, collection : Collection, executor : ThreadPoolExecutor = DATABASE_EXECUTOR) -> None:
+        self.database = AbstractDatabase(collection)
+        self.collection = collection
+        self.executor = executor
+
+    async def __run__(self, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, functools.partial(func, *args, **kwargs))
+
+    async def Get(self, key : str) -> dict:
+        return await self.__run__(self.database.Get, key=key)
+
+    async def Update(self, key : str, value : dict, upsert=False) -> None:
+        await self.__run__(self.database.Update, key=key, value=value, upsert=upsert)
+
+    async def Insert(self, key : str, value : dict) -> None:
+        await self.__run__(self.database.Insert, key=key, value=value)
+
+    async def Delete(self, key : str) -> None:
+        await self.__run__(self.database.Delete, key=key)
+
+    async def DeleteAll(self, key : str) -> None:
+        await self.__run__(self.database.DeleteAll, key=key)
+
+    async def Save(self, key : str,  value : dict) -> None:
+        await self.__run__(self.database.Save, key=key, value=value)
+
+    async def GetAll(self) -> list[dict]:
+        # the cursor is drained inside the worker, iterating it on the loop would block again
+        return await self.__run__(lambda: list(self.database.GetAll()))
+
+    async def GetMany(self, keys : list[str]) -> list[dict]:
+        return await self.__run__(self.database.GetMany, keys=keys)
+
+    async def Find(self, query : dict, projection : dict = None) -> list[dict]:
+        return await self.__run__(self.database.Find, query=query, projection=projection)
+
+    async def InsertMany(self, values : list[dict]) -> None:
+        await self.__run__(self.database.InsertMany, values=values)
+
+    async def UpdateWhere(self, query : dict, update : dict) -> None:
+        await self.__run__(self.database.UpdateWhere, query=query, update=update)
+
+    async def DeleteWhere(self, query : dict) -> None:
+        await self.__run__(self.database.DeleteWhere, query=query)
+
+    async def Increment(self, key : str, field : str, amount : int = 1) -> int:
+        return await self.__run__(self.database.Increment, key=key, field=field, amount=amount)
+
+    async def DeleteMany(self, query : dict) -> int:
+        return await self.__run__(self.database.DeleteMany, query=query)
+
+    async def BulkWrite(self, operations : list) -> None:
+        await self.__run__(self.database.BulkWrite, operations=operations)
+
+    async def CreateIndex(self, field : str, unique : bool = False, sparse : bool = False) -> str:
+        return await self.__run__(self.database.CreateIndex, field=field, unique=unique, sparse=sparse)
+
+    async def BulkUpsert(self, updates : dict[str, dict]):
+        return await self.__run__(self.database.BulkUpsert, updates=updates)
+
+class FlushReport:
+    __slots__ = ["collection", "documents", "chunks", "upserted", "modified", "failed", "seconds"]
+    def __init__(self, collection : str) -> None:
+        self.collection = collection
+        self.documents = 0
+        self.chunks = 0
+        self.upserted = 0
+        self.modified = 0
+        self.failed = 0
+        self.seconds = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.failed == 0
+
+    def __repr__(self) -> str:
+        return (f"[{self.collection}] flushed {self.documents} documents in {self.chunks} chunks "
+                f"({self.upserted} inserted, {self.modified} modified, {self.failed} failed) in {self.seconds * 1000:.1f}ms")
+
+class FlushEngine:
+    """collects pending update documents and writes them as chunked, unordered bulk upserts"""
+    def __init__(self, database : AsyncAbstractDatabase, chunk_size : int = FLUSH_CHUNK_SIZE) -> None:
+        self.database = database
+        self.chunk_size = chunk_size
+        self.pending : dict[str, dict] = {}
+        self.in_flight : dict[str, asyncio.Future] = {} # key -> the flush currently writing it
+        self.last_report : FlushReport = None
+
+    def Queue(self, key : str, update : dict) -> None:
+        key = str(key)
+        self.pending[key] = FlushEngine.Merge(self.pending[key], update) if key in self.pending else update
+
+    @staticmethod
+    def Merge(older : dict, newer : dict) -> dict:
+        """combines two update documents for the same id, the fields of the newer one win"""
+        set_fields = copy.deepcopy(older.get("$set", {}))
+        unset_fields = dict(older.get("$unset", {}))
+        for field, value in newer.get("$set", {}).items():
+            parent, _, child = field.partition(".")
+            if child and isinstance(set_fields.get(parent), dict): # the whole parent is already being written
+                set_fields[parent][child] = value
+                continue
+            set_fields[field] = value
+            unset_fields.pop(field, None)
+        for field in newer.get("$unset", {}):
+            parent, _, child = field.partition(".")
+            if child and isinstance(set_fields.get(parent), dict):
+                set_fields[parent].pop(child, None)
+                continue
+            unset_fields[field] = ""
+            set_fields.pop(field, None)
+        merged = {}
+        if len(set_fields) > 0: merged["$set"] = set_fields
+        if len(unset_fields) > 0: merged["$unset"] = unset_fields
+        return merged
+
+    async def Flush(self) -> FlushReport:
+        report = FlushReport(self.database.collection.name)
+        pending, self.pending = self.pending, {}
+        keys = list(pending)
+        start = time.perf_counter()
+        flight = asyncio.get_running_loop().create_future()
+        for key in keys: self.in_flight[key] = flight
+        try:
+            await self.__WriteChunks__(pending, keys, report)
+        finally:
+            for key in keys:
+                if self.in_flight.get(key) is flight: self.in_flight.pop(key)
+            flight.set_result(None)
+        report.seconds = time.perf_counter() - start
+        self.last_report = report
+        return report
+
+    async def __WriteChunks__(self, pending : dict[str, dict], keys : list[str], report : FlushReport) -> None:
+        for idx in range(0, len(keys), self.chunk_size):
+            chunk = {key : pending[key] for key in keys[idx : idx + self.chunk_size]}
+            report.chunks += 1
+            try:
+                result = await self.database.BulkUpsert(chunk)
+                report.upserted += result.upserted_count
+                report.modified += result.modified_count
+                report.documents += len(chunk)
+            except Exception as e:
+                print(f"[{report.collection}] bulk flush failed: {e}")
+                report.failed += len(chunk)
+                for key in chunk: # retried on the next flush, underneath anything queued meanwhile
+                    self.pending[key] = FlushEngine.Merge(chunk[key], self.pending[key]) if key in self.pending else chunk[key]
+
+    async def WaitFor(self, key : str) -> None:
+        """returns once no flush in progress is writing this key"""
+        flight = self.in_flight.get(str(key))
+        while flight is not None:
+            await flight
+            flight = self.in_flight.get(str(key))
+
 class PlayerCollection(AbstractDatabase):
     def __init__(self) -> None:
         super().__init__(MongoDatabase["Players"])
@@ -53,8 +256,30 @@ class PetCollection(AbstractDatabase):
     def __init__(self) -> None:
         super().__init__(MongoDatabase["Pets"])
 
+class AsyncPlayerCollection(AsyncAbstractDatabase):
+    def __init__(self) -> None:
+        super().__init__(MongoDatabase["Players"])
+class AsyncShopCollection(AsyncAbstractDatabase):
+    def __init__(self) -> None:
+        super().__init__(MongoDatabase["Shop"])
+class AsyncPlantCollection(AsyncAbstractDatabase):
+    def __init__(self) -> None:
+        super().__init__(MongoDatabase["Plants"])
+class AsyncBeeCollection(AsyncAbstractDatabase):
+    def __init__(self) -> None:
+        super().__init__(MongoDatabase["Bees"])
+class AsyncPetCollection(AsyncAbstractDatabase):
+    def __init__(self) -> None:
+        super().__init__(MongoDatabase["Pets"])
+
 PlayerDatabase = PlayerCollection()
 ShopDatabase = ShopCollection()
 PlantDatabase = PlantCollection()
 BeeDatabase = BeeCollection()
-PetDatabase = PetCollection()
\ No newline at end of file
+PetDatabase = PetCollection()
+
+AsyncPlayerDatabase = AsyncPlayerCollection()
+AsyncShopDatabase = AsyncShopCollection()
+AsyncPlantDatabase = AsyncPlantCollection()
+AsyncBeeDatabase = AsyncBeeCollection()
+AsyncPetDatabase = AsyncPetCollection()
\ No newline at end of file
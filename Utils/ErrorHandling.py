@@ -2,6 +2,7 @@ import discord, asyncio
 from discord.ext.commands import Context
 from discord.ext.commands import Bot
 from discord.ext.commands.errors import CommandError
+from Utils.Fuzzy import FuzzyIndex
 
 #ERRORS#
 class ShopError(CommandError): pass
@@ -10,6 +11,38 @@ class InventoryError(CommandError): pass
 HANDLED_ERRORS = (ShopError, TradeError, InventoryError)
 ########
 
+class CommandSuggestions:
+    """fuzzy index over every command name and alias, used for the "did you mean" of unknown commands"""
+    INDEX : FuzzyIndex = None # None once the commands changed, rebuilt by the next Suggest
+
+    @staticmethod
+    def Watch(bot : Bot) -> None:
+        """drops the index whenever a command is added or removed. load/unload/reload_extension and add/remove_cog
+           all register their commands (and aliases) through add_command/remove_command, so no lookup has to check"""
+        add_command, remove_command = bot.add_command, bot.remove_command
+        def AddCommand(command):
+            add_command(command)
+            CommandSuggestions.INDEX = None
+        def RemoveCommand(name : str):
+            command = remove_command(name)
+            CommandSuggestions.INDEX = None
+            return command
+        bot.add_command, bot.remove_command = AddCommand, RemoveCommand
+
+    @staticmethod
+    def Rebuild(bot : Bot) -> None:
+        """called once the cogs are loaded, and by Suggest after the commands changed"""
+        CommandSuggestions.INDEX = FuzzyIndex({name.lower() : command.name for name, command in bot.all_commands.items()})
+
+    @staticmethod
+    def Suggest(bot : Bot, name : str, limit : int = 3) -> list[str]:
+        if CommandSuggestions.INDEX == None: CommandSuggestions.Rebuild(bot)
+        suggestions = []
+        for key in CommandSuggestions.INDEX.Suggest(name.lower(), limit=limit * 2): # an alias and its command count once
+            command_name = CommandSuggestions.INDEX.Get(key)
+            if command_name not in suggestions: suggestions.append(command_name)
+        return suggestions[:limit]
+
 def ErrorMessage (description : str):
     def decorator(func):
         func.ErrorMessage  = description
@@ -23,13 +56,9 @@ async def command_error(ctx: Context, error: CommandError):
         bot : Bot = ctx.bot
         command_name: str = command_name.lower()
         suggestion = ""
-        for existing_command in bot.commands:
-            existing_command = existing_command.name
-            existing: str = existing_command.lower()
-            if existing in command_name or command_name in existing:
-                suggestion = f"\n\nDid you mean `${existing_command}` ?"
-                break
-            await asyncio.sleep(0)
+        suggestions = CommandSuggestions.Suggest(bot, command_name)
+        if len(suggestions) > 0:
+            suggestion = "\n\nDid you mean " + " or ".join(f"`${existing_command}`" for existing_command in suggestions) + " ?"
 
         embed = discord.Embed(
             title="⚙️ Suggested ⚙️",
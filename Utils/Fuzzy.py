@@ -0,0 +1,88 @@
+from __future__ import annotations
+import heapq
+
+def EditDistance(first : str, second : str, max_distance : int = None) -> int:
+    """levenshtein distance, gives up (returning max_distance + 1) as soon as it cannot be within max_distance"""
+    if max_distance == None: max_distance = max(len(first), len(second))
+    if abs(len(first) - len(second)) > max_distance: return max_distance + 1
+    if len(first) < len(second): first, second = second, first
+    previous = list(range(len(second) + 1))
+    for row, first_char in enumerate(first, start=1):
+        current = [row]
+        for column, second_char in enumerate(second, start=1):
+            current.append(min(previous[column] + 1,                                    # deletion
+                               current[column - 1] + 1,                                 # insertion
+                               previous[column - 1] + (first_char != second_char)))     # substitution
+        if min(current) > max_distance: return max_distance + 1
+        previous = current
+    return previous[-1] if previous[-1] <= max_distance else max_distance + 1
+
+def Trigrams(text : str) -> set[str]:
+    text = f"  {text} "
+    return {text[idx:idx + 3] for idx in range(len(text) - 2)}
+
+class FuzzyIndex:
+    """name lookup built once over a fixed set of lower-case keys:
+    a prefix trie to resolve unambiguous prefixes, and a trigram index so suggestions
+    only run the edit distance on a handful of candidates instead of on every key"""
+    CANDIDATES = 8 # keys sharing the most trigrams with the query that get an edit distance computed
+
+    def __init__(self, entries : dict[str, object]) -> None:
+        self.entries = dict(entries)
+        self.trie : dict = {} # char -> node, a node's None key holds (keys below it, one value below it), "" marks the end of a key
+        self.trigrams : dict[str, list[str]] = {}
+        for key, value in self.entries.items():
+            node = self.trie
+            for char in key:
+                node = node.setdefault(char, {})
+                count, _ = node.get(None, (0, None))
+                node[None] = (count + 1, value)
+            node[""] = key
+            for trigram in Trigrams(key):
+                self.trigrams.setdefault(trigram, []).append(key)
+
+    def Get(self, key : str, default = None):
+        return self.entries.get(key, default)
+
+    def Prefix(self, prefix : str):
+        """the value whose key starts with prefix, None when there is no such key or more than one"""
+        node = self.trie
+        for char in prefix:
+            node = node.get(char)
+            if node == None: return None
+        count, value = node.get(None, (0, None))
+        return value if count == 1 else None
+
+    def Completions(self, prefix : str, limit : int = 3) -> list[str]:
+        """up to limit keys starting with prefix, shortest first"""
+        node = self.trie
+        for char in prefix:
+            node = node.get(char)
+            if node == None: return []
+        found, level = [], [node]
+        while len(level) > 0 and len(found) < limit:
+            found += [child[""] for child in level if "" in child]
+            level = [child[char] for child in level for char in sorted(key for key in child if key)]
+        return found[:limit]
+
+    def Suggest(self, query : str, limit : int = 3, max_distance : int = None) -> list[str]:
+        """the closest keys, best first. keys the query is a prefix of come first"""
+        completions = self.Completions(query, limit=limit)
+        if len(completions) >= limit: return completions
+        if max_distance == None: max_distance = max(2, len(query) // 3)
+        shared : dict[str, int] = {}
+        for trigram in Trigrams(query):
+            for key in self.trigrams.get(trigram, ()):
+                shared[key] = shared.get(key, 0) + 1
+        candidates = heapq.nlargest(FuzzyIndex.CANDIDATES, shared, key=shared.__getitem__)
+        scored = []
+        for key in candidates:
+            if key in completions or abs(len(key) - len(query)) > max_distance: continue
+            distance = EditDistance(query, key, max_distance=max_distance)
+            if distance <= max_distance: scored.append((distance, key))
+        return (completions + [key for _, key in sorted(scored)])[:limit]
+
+    def Resolve(self, query : str):
+        """exact key first, then an unambiguous prefix"""
+        value = self.entries.get(query)
+        return value if value is not None else self.Prefix(query)
\ No newline at end of file
@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+class LazyEntity:
+    """base for game objects that are handed out before they are loaded from the database.
+    a handle starts out knowing only its id, the first load fills its fields in place,
+    so once loaded every attribute access is a plain attribute lookup with no proxy in between"""
+    __slots__ = ("id", "is_loaded", "__weakref__")
+    REPOSITORY = None # set by every subclass, see Utils.Repository
+
+    @classmethod
+    def Handle(cls, id : str) -> LazyEntity:
+        handle = cls.__new__(cls)
+        handle.id = str(id)
+        handle.is_loaded = False
+        return handle
+
+    def __getattr__(self, name : str):
+        # python only gets here when the normal lookup failed, i.e. this handle has not been loaded yet
+        if name.startswith("__") or name in LazyEntity.__slots__ or self.is_loaded:
+            raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+        type(self).REPOSITORY.LoadBlocking(self)
+        return getattr(self, name)
+
+    @classmethod
+    def __Fields__(cls) -> list[str]:
+        return [slot for klass in cls.__mro__ for slot in klass.__dict__.get("__slots__", ()) if slot not in LazyEntity.__slots__]
+
+    def Adopt(self, loaded : LazyEntity) -> LazyEntity:
+        """takes over every field of a freshly loaded copy of this entity"""
+        for name in type(self).__Fields__():
+            setattr(self, name, getattr(loaded, name))
+        if hasattr(loaded, "__dict__"):
+            self.__dict__.update(loaded.__dict__)
+        self.is_loaded = True
+        return self
+
+    def Unload(self) -> LazyEntity:
+        """drops every field but the id, the next access loads them again"""
+        for name in type(self).__Fields__():
+            try: delattr(self, name)
+            except AttributeError: pass
+        if hasattr(self, "__dict__"):
+            self.__dict__.clear()
+        self.is_loaded = False
+        return self
\ No newline at end of file
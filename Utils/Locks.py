@@ -0,0 +1,68 @@
+from __future__ import annotations
+from contextlib import asynccontextmanager
+import asyncio, time
+
+class PlayerLocks:
+    """one asyncio lock per player, so a command that checks an inventory or a balance and changes it after an await
+    cannot interleave with another command touching the same player. commands for different players never wait on each other.
+    operations on several players take every lock in sorted id order, which is what keeps two of them from deadlocking.
+    a task that already holds a player's lock does not take it again, and a lock is dropped once nobody holds or waits on it.
+    holding one player and then asking for another would break the sorted order, so a task takes every lock it needs in one Hold"""
+    def __init__(self) -> None:
+        self.locks : dict[str, tuple[asyncio.Lock, int]] = {} # id -> (lock, tasks holding or waiting on it)
+        self.owners : dict[str, asyncio.Task] = {}
+        ####### metrics #######
+        self.acquired = 0
+        self.contended = 0 # acquisitions that had to wait
+        self.waited = 0.0  # seconds, summed over every acquisition
+        self.longest_wait = 0.0
+
+    @asynccontextmanager
+    async def Hold(self, *ids : str):
+        task = asyncio.current_task()
+        ids = [id for id in sorted({str(id) for id in ids}) if self.owners.get(id) is not task]
+        if len(ids) > 0 and task in self.owners.values():
+            raise RuntimeError(f"cannot lock {ids} while already holding other players, every lock has to be taken in one Hold")
+        taken = []
+        try:
+            for id in ids:
+                await self.__Acquire__(id, task)
+                taken.append(id)
+            yield
+        finally:
+            for id in reversed(taken):
+                self.__Release__(id)
+
+    async def __Acquire__(self, id : str, task : asyncio.Task) -> None:
+        lock, users = self.locks.get(id, (None, 0))
+        if lock == None: lock = asyncio.Lock()
+        self.locks[id] = (lock, users + 1)
+        started = time.monotonic()
+        try:
+            await lock.acquire()
+        except BaseException: # cancelled while waiting
+            self.__Forget__(id)
+            raise
+        if users > 0: # someone else was holding or waiting on it
+            waited = time.monotonic() - started
+            self.contended += 1
+            self.waited += waited
+            self.longest_wait = max(self.longest_wait, waited)
+        self.acquired += 1
+        self.owners[id] = task
+
+    def __Release__(self, id : str) -> None:
+        self.owners.pop(id, None)
+        self.locks[id][0].release()
+        self.__Forget__(id)
+
+    def __Forget__(self, id : str) -> None:
+        lock, users = self.locks[id]
+        if users <= 1: self.locks.pop(id)
+        else: self.locks[id] = (lock, users - 1)
+
+    def __repr__(self) -> str:
+        average = self.waited / self.contended * 1000 if self.contended > 0 else 0
+        return f"{self.acquired} acquired, {self.contended} waited (avg {average:.1f}ms, max {self.longest_wait * 1000:.1f}ms), {len(self.locks)} in use"
+
+PLAYER_LOCKS = PlayerLocks()
\ No newline at end of file
@@ -0,0 +1,30 @@
+from __future__ import annotations
+
+class MemberDirectory:
+    """id -> name of every user the bot has seen, kept up to date from gateway events
+    so looking a name up never walks the member list of every guild"""
+    NAMES : dict[int, str] = {}
+    BOT = None
+
+    @staticmethod
+    def Fill(bot) -> int:
+        """seeds the directory from the user cache, called once the gateway is ready"""
+        MemberDirectory.BOT = bot
+        for user in bot.users:
+            MemberDirectory.NAMES[user.id] = user.name
+        return len(MemberDirectory.NAMES)
+
+    @staticmethod
+    def Update(user) -> None:
+        """takes a discord.User or discord.Member"""
+        MemberDirectory.NAMES[user.id] = user.name
+
+    @staticmethod
+    def GetName(id : int, default : str = None) -> str:
+        id = int(id)
+        name = MemberDirectory.NAMES.get(id)
+        if name == None and MemberDirectory.BOT != None:
+            user = MemberDirectory.BOT.get_user(id) # the gateway's user cache, no request is made
+            if user != None:
+                name = MemberDirectory.NAMES[id] = user.name
+        return default if name == None else name
\ No newline at end of file
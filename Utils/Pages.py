@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+def PageCount(entries : int, limit : int) -> int:
+    return max(1, -(-entries // limit))
+
+def ClampPage(page : int, pages : int) -> int:
+    """1-based page number the user typed -> 0-based index of an existing page"""
+    return min(max(1, page), pages) - 1
+
+class PageCache:
+    """pages rendered from something that bumps a version number on every mutation.
+    only the requested page is rendered, and it is reused by everyone until the version changes"""
+    __slots__ = ("version", "pages")
+    def __init__(self) -> None:
+        self.version = None
+        self.pages : dict = {}
+
+    def Get(self, version : int, key, render) -> str:
+        if version != self.version:
+            self.pages.clear()
+            self.version = version
+        page = self.pages.get(key)
+        if page == None:
+            page = self.pages[key] = render()
+        return page
+
+class PagedIndex:
+    """an insertion ordered dict that can jump to any page in O(log n) instead of walking every entry before it.
+    removed entries leave a hole in the slot list, a fenwick tree over the live slots finds where a page starts
+    and the holes are compacted away once they outnumber the live entries. the page count is kept up to date on every change"""
+    __slots__ = ("page_size", "position", "keys", "values_at", "tree", "holes", "pages")
+    def __init__(self, page_size : int) -> None:
+        self.page_size = page_size
+        self.position : dict = {} # key -> slot
+        self.keys : list = []      # slot -> key, None once removed
+        self.values_at : list = []
+        self.tree : list[int] = [0] # 1-based fenwick tree of live slots
+        self.holes = 0
+        self.pages = 1
+
+    ####### dict interface #######
+    def __len__(self) -> int:
+        return len(self.position)
+
+    def __contains__(self, key) -> bool:
+        return key in self.position
+
+    def __iter__(self):
+        return (key for key in self.keys if key is not None)
+
+    def __getitem__(self, key):
+        return self.values_at[self.position[key]]
+
+    def __setitem__(self, key, value) -> None:
+        slot = self.position.get(key)
+        if slot != None:
+            self.values_at[slot] = value
+            return
+        self.position[key] = len(self.keys)
+        self.keys.append(key)
+        self.values_at.append(value)
+        self.__Grow__()
+        self.pages = PageCount(len(self.position), self.page_size)
+
+    def get(self, key, default = None):
+        slot = self.position.get(key)
+        return default if slot == None else self.values_at[slot]
+
+    def pop(self, key, *default):
+        if key not in self.position:
+            if len(default) > 0: return default[0]
+            raise KeyError(key)
+        slot = self.position.pop(key)
+        value = self.values_at[slot]
+        self.keys[slot] = self.values_at[slot] = None
+        self.__Add__(slot + 1, -1)
+        self.holes += 1
+        if self.holes > 32 and self.holes > len(self.position): self.__Compact__()
+        self.pages = PageCount(len(self.position), self.page_size)
+        return value
+
+    def values(self):
+        return (value for key, value in zip(self.keys, self.values_at) if key is not None)
+
+    ####### pages #######
+    def Page(self, page : int) -> list:
+        """the values on a 0-based page"""
+        result = []
+        first = page * self.page_size
+        if first >= len(self.position): return result
+        slot = self.__Find__(first + 1)
+        while len(result) < self.page_size and slot < len(self.keys):
+            if self.keys[slot] is not None: result.append(self.values_at[slot])
+            slot += 1
+        return result
+
+    ####### fenwick tree #######
+    def __Grow__(self) -> None:
+        """appends a live slot: its node covers (i - lowbit(i), i], which is 1 + the nodes right below it"""
+        index = len(self.tree)
+        total, child = 1, index - 1
+        while child > index - (index & -index):
+            total += self.tree[child]
+            child -= child & -child
+        self.tree.append(total)
+
+    def __Add__(self, index : int, delta : int) -> None:
+        while index < len(self.tree):
+            self.tree[index] += delta
+            index += index & -index
+
+    def __Find__(self, rank : int) -> int:
+        """0-based slot of the rank-th (1-based) live entry"""
+        index, step = 0, 1 << (len(self.tree) - 1).bit_length()
+        while step > 0:
+            if index + step < len(self.tree) and self.tree[index + step] < rank:
+                index += step
+                rank -= self.tree[index]
+            step >>= 1
+        return index
+
+    def __Compact__(self) -> None:
+        live = [(key, value) for key, value in zip(self.keys, self.values_at) if key is not None]
+        self.keys = [key for key, _ in live]
+        self.values_at = [value for _, value in live]
+        self.position = {key : slot for slot, key in enumerate(self.keys)}
+        self.tree = [0]
+        for _ in self.keys: self.__Grow__()
+        self.holes = 0
\ No newline at end of file
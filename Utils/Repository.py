@@ -0,0 +1,156 @@
+from __future__ import annotations
+from Utils.Cache import LRUCache
+from Utils.Database import AbstractDatabase, AsyncAbstractDatabase, FlushEngine, FlushReport
+from Utils.Handle import LazyEntity
+from pymongo.errors import OperationFailure
+import asyncio, time, traceback, weakref
+
+class Repository:
+    """identity map, cache and write-behind for one kind of LazyEntity (players, plant/bee/pet storages).
+    the entity type provides:
+        create(id, document)  -> a loaded entity, document is None when nothing is stored yet
+        entity.GetChanges()   -> the update document to flush, or None if nothing changed
+        entity.MarkSaved()    -> called once its changes have been queued
+        entity.HasChanges()   -> whether it was mutated since then"""
+    def __init__(self, database : AbstractDatabase, async_database : AsyncAbstractDatabase, entity : type, create, max_entries : int, idle_ttl : float) -> None:
+        self.database = database
+        self.async_database = async_database
+        self.entity = entity
+        self.create = create
+        self.references : weakref.WeakValueDictionary[str, LazyEntity] = weakref.WeakValueDictionary() # every live handle, loaded or not
+        self.cache = LRUCache(max_entries=max_entries, idle_ttl=idle_ttl, on_evict=LazyEntity.Unload) # only loaded handles
+        self.write_behind = FlushEngine(async_database)
+        self.loading : dict[str, asyncio.Future] = {} # id -> the fetch currently bringing it in
+        self.coalesced = 0 # loads that piggybacked on a fetch already in flight
+        self.blocking = 0 # LoadBlocking calls made on the event loop
+        self.deleting : set[str] = set() # ids being deleted, they can neither be loaded nor saved until the delete is done
+
+    def Get(self, id : str) -> LazyEntity:
+        """returns the handle for this id, it is only loaded once one of its fields is used"""
+        id = str(id)
+        entity = self.references.get(id)
+        if entity is not None: return entity
+        entity = self.entity.Handle(id)
+        self.references[id] = entity
+        return entity
+
+    async def Load(self, id : str) -> LazyEntity:
+        """same as Get, but the entity is fetched without blocking the event loop"""
+        id = str(id)
+        entity = self.cache.Get(id)
+        if entity is not None: return entity
+        entity = self.Get(id)
+        if entity.is_loaded: self.cache.Put(id, entity)
+        else: await self.__Fetch__([id], fetch=self.__FetchOne__)
+        return entity
+
+    async def Prefetch(self, ids : list[str]) -> list[LazyEntity]:
+        """loads every id with a single $in query, the loaded entities are returned in the order of ids"""
+        entities = [self.Get(id) for id in ids]
+        missing = list(dict.fromkeys(entity.id for entity in entities if self.cache.Get(entity.id) is None))
+        if len(missing) > 0:
+            await self.__Fetch__(missing, fetch=self.async_database.GetMany)
+        return entities
+
+    async def __Fetch__(self, ids : list[str], fetch) -> None:
+        """single-flight: ids somebody is already fetching are waited on, only the rest are fetched,
+        so concurrent loads of one id cost a single read and all end on the same handle"""
+        self.__Refuse__(ids)
+        in_flight = {self.loading[id] for id in ids if id in self.loading}
+        self.coalesced += sum(1 for id in ids if id in self.loading)
+        missing = [id for id in ids if id not in self.loading and not self.Get(id).is_loaded]
+        if len(missing) > 0:
+            flight = asyncio.get_running_loop().create_future()
+            for id in missing: self.loading[id] = flight
+            try:
+                documents = {document["id"] : document for document in await fetch(missing)}
+                for id in missing:
+                    entity = self.Get(id)
+                    if not entity.is_loaded and id not in self.deleting: # deleted while the read was in flight
+                        entity.Adopt(self.create(id, documents.get(id)))
+            finally:
+                for id in missing: self.loading.pop(id, None)
+                flight.set_result(None) # waiters retry on their own if this fetch failed
+        if len(in_flight) > 0:
+            await asyncio.wait(in_flight)
+            failed = [id for id in ids if not self.Get(id).is_loaded]
+            if len(failed) > 0: await self.__Fetch__(failed, fetch=fetch)
+        self.__Refuse__(ids)
+        for id in ids: self.cache.Put(id, self.Get(id))
+
+    async def __FetchOne__(self, ids : list[str]) -> list[dict]:
+        document = await self.async_database.Get(key=ids[0])
+        return [] if document == None else [document]
+
+    def LoadBlocking(self, entity : LazyEntity) -> LazyEntity:
+        """fallback for handles used before anything awaited their load. it is a synchronous read, so when it happens
+        on the event loop it is counted and the line that used the handle is printed, that code path should await Load first"""
+        self.__Refuse__([entity.id])
+        if Repository.__OnLoop__():
+            self.blocking += 1
+            caller = traceback.extract_stack(limit=3)[0] # the frame that used the handle, before LazyEntity.__getattr__
+            print(f"[{self.entity.__name__}] {entity.id} was loaded blocking the event loop at {caller.filename}:{caller.lineno}")
+        entity.Adopt(self.create(entity.id, self.database.Get(key=entity.id)))
+        self.cache.Put(entity.id, entity)
+        return entity
+
+    async def CreateIndex(self) -> None:
+        """loads, prefetches and every upsert of a flush find their document by id, without an index each one scans the collection"""
+        try:
+            await self.async_database.CreateIndex("id", unique=True)
+        except OperationFailure as error: # an id stored twice (or an older index on id) keeps it from being unique
+            print(f"[{self.entity.__name__}] cannot make id unique ({error}), indexing it anyway")
+            await self.async_database.CreateIndex("id")
+
+    async def Save(self) -> FlushReport:
+        started = time.monotonic()
+        for entity in self.cache.values():
+            if entity.id in self.deleting: continue
+            update = entity.GetChanges()
+            if update != None:
+                self.write_behind.Queue(key=entity.id, update=update)
+                entity.MarkSaved()
+        report = await self.write_behind.Flush()
+        if report.ok:
+            # anything touched or mutated while the flush was in flight has to stay loaded for the next one
+            self.cache.Evict(can_evict=lambda entity: not entity.HasChanges(), accessed_before=started)
+        return report
+
+    async def Delete(self, id : str) -> None:
+        """the id is tombstoned until the document is gone, so nothing touching it meanwhile can bring
+        a default entity back into the cache and have the next save write it again"""
+        id = str(id)
+        self.deleting.add(id)
+        try:
+            self.cache.Pop(id)
+            entity = self.references.pop(id, None)
+            if entity is not None: entity.Unload()
+            await self.write_behind.WaitFor(id) # a failed chunk would queue it again
+            self.write_behind.pending.pop(id, None)
+            await self.async_database.Delete(id)
+        finally:
+            self.deleting.discard(id)
+
+    @staticmethod
+    def __OnLoop__() -> bool:
+        try:
+            asyncio.get_running_loop()
+            return True
+        except RuntimeError:
+            return False
+
+    def __Refuse__(self, ids : list[str]) -> None:
+        for id in ids:
+            if id in self.deleting: raise LookupError(f"{self.entity.__name__} {id} is being deleted")
+
+    def Clear(self) -> int:
+        """unloads everything without saving it"""
+        entities = self.cache.Clear()
+        for entity in entities: entity.Unload()
+        return len(entities)
+
+    def __len__(self) -> int:
+        return len(self.references)
+
+    def __repr__(self) -> str:
+        return f"{self.cache}, {self.coalesced} coalesced loads, {self.blocking} blocking loads"
\ No newline at end of file
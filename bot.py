@@ -4,7 +4,7 @@
 import time
 from discord.reaction import Reaction
 from dotenv import load_dotenv
-import os, random
+import os, random, asyncio
 
 load_dotenv()
 
@@ -14,13 +14,17 @@ TOKEN = os.environ["DISCORD_TOKEN"]
 
 ################ IMPORTS ################
 import discord
-from Utils.ErrorHandling import command_error
-from Utils.Constants import BOT_MAX_ITEMS_SELLING, GLOBAL_SHOP, MSG_EVENTS, RefreshShop, SHOP_CONSTANTS
+from Utils.ErrorHandling import CommandSuggestions, command_error
+from Utils.Constants import BOT_MAX_ITEMS_SELLING, BOT_METRICS, GLOBAL_SHOP, MSG_EVENTS, RefreshShop, SHOP_CONSTANTS
 from discord.ext import commands
 from GameLogic.Player import Player
 from GameLogic.Trading import CancelAllTrades
 from GameLogic.plants import Plant, PlantStorage
 from GameLogic.Bees import Bee, BeeStorage
+from GameLogic.Pets import PetStorage
+from Utils.Members import MemberDirectory
+from GameLogic.Scheduler import GROWTH_SCHEDULER
+from Utils.Database import AsyncPlantDatabase, AsyncBeeDatabase, AsyncPetDatabase
 from discord.ext import tasks
 #########################################
 
@@ -33,6 +37,7 @@ bot : commands.Bot = commands.Bot(
                     intents=intents,
                     help_command=None
                     )
+CommandSuggestions.Watch(bot)
 
 
 def LoadCogs():
@@ -55,13 +60,18 @@ def LoadCogs():
             print(f"\u001b[31m{cog} cannot be loaded: {e} \u001b[0m")
             #raise e
 
+    CommandSuggestions.Rebuild(bot)
     print("\u001b[36mdone loading cogs \u001b[0m")
 
 @bot.event
 async def on_message(message : discord.Message):
     if message.author == bot.user: 
         return
-    await bot.fetch_user(message.author.id)
+    BOT_METRICS.rest_calls_avoided += 1 # the author comes from the gateway cache, no need to fetch it
+    if not message.content.startswith(bot.command_prefix): # plain chat, nothing to do
+        BOT_METRICS.messages_skipped += 1
+        return
+    MemberDirectory.Update(message.author)
     await bot.process_commands(message=message)
 
 @bot.command()
@@ -77,14 +87,26 @@ async def on_reaction_add(reaction : Reaction, user):
             await callback(reaction,user)
     
 
+############## keeps the id -> name directory current ##############
+@bot.event
+async def on_member_join(member : discord.Member):
+    MemberDirectory.Update(member)
+
+@bot.event
+async def on_user_update(before : discord.User, after : discord.User):
+    MemberDirectory.Update(after)
+###################################################################
+
 bot.on_command_error = command_error
 
 
+async def SaveAll():
+    for report in [await Player.Save(), await PlantStorage.Save(), await BeeStorage.Save()]:
+        print(report)
+
 @tasks.loop(seconds=(60 * 5))
 async def SaveLoop():
-    Player.Save()
-    PlantStorage.Save()
-    BeeStorage.Save()
+    await SaveAll()
 
 
 @tasks.loop(seconds=30)
@@ -96,9 +118,26 @@ async def BotSellItem():
     items = GLOBAL_SHOP.GetAllSalesFor(user = bot_user)
     if len(items) < BOT_MAX_ITEMS_SELLING:
         sale = Sale(item= Item.GetRandomItem(), amount=1, price=random.randint(3, 11), seller=bot_user)
-        GLOBAL_SHOP.AddSale(sale=sale)
+        await GLOBAL_SHOP.AddSale(sale=sale)
         items.append(sale)
 
+HARVEST_COMMANDS = {"plants" : "$checkplants", "bees" : "$checkbees"}
+
+async def NotifyOwner(owner_id : str, kind : str, name : str):
+    user = bot.get_user(int(owner_id))
+    if user == None: return # no longer shares a guild with the bot
+    text = f"{name} has finished growing!"
+    if kind in HARVEST_COMMANDS: text += f"\n\n use `{HARVEST_COMMANDS[kind]}` to collect it!"
+    embed = discord.Embed(
+    title="`⏰` Ready `⏰`",
+    description= text,
+    color=discord.Color.dark_teal(),
+    )
+    try:
+        await user.send(embed=embed)
+    except discord.Forbidden:
+        pass # DMs are closed
+
 @tasks.loop(minutes=30)
 async def BotRefreshSales():
     await RefreshShop()
@@ -106,9 +145,15 @@ async def BotRefreshSales():
 @bot.event 
 async def on_ready():
     Player.BOT = bot
+    MemberDirectory.Fill(bot)
+    for storage in [Player, PlantStorage, BeeStorage, PetStorage]:
+        await storage.REPOSITORY.CreateIndex()
     SaveLoop.start()
-    BotSellItem.start()
-    GLOBAL_SHOP.LoadAll()
+    await GLOBAL_SHOP.LoadAll()
+    print(f"removed {await GLOBAL_SHOP.Compact()} stale shop documents")
+    BotSellItem.start() # only once the stored sales are listed, or its first sale is loaded a second time
+    await GROWTH_SCHEDULER.Rebuild({"plants" : AsyncPlantDatabase, "bees" : AsyncBeeDatabase, "pets" : AsyncPetDatabase})
+    GROWTH_SCHEDULER.Start(on_due=NotifyOwner)
     BotRefreshSales.start()
     SHOP_CONSTANTS.next_refresh_at = time.time() + (60 * 30)
     print(f"{bot.user.name} has connected to Discord!")
@@ -119,7 +164,5 @@ bot.run(TOKEN)
 ########### ATTEMPT AT SAVING RIGHT AS THE BOT IS TURNING OFF ###########
 #GLOBAL_SHOP.CancelAllSales() not neccessary anymore, since mongodb is used
 CancelAllTrades()
-Player.Save()
-PlantStorage.Save()
-BeeStorage.Save()
+asyncio.run(SaveAll())
 #########################################################################
\ No newline at end of file
@@ -28,7 +28,7 @@ class BeeCommands(commands.Cog):
         if len(bees) == 0:
             await ReplyWith( f"Error! use **$growbee** `bee name`!" )
             return
-        player = Player.GetPlayer(id = ctx.author.id)
+        player = await Player.LoadPlayer(id = ctx.author.id)
         honey = Item.GetItem(id = "honey")
         if not player.inventory.HasItem(item=honey):
             await ReplyWith( f"Error! You do not have any {honey} !" )
@@ -38,6 +38,7 @@ class BeeCommands(commands.Cog):
         if not player.inventory.HasItem(item=bee):
             await ReplyWith( f"Error! You do not have any {bee} !" )
             return
+        await BeeStorage.LoadBeeStorage(id = ctx.author.id) # the bee below is put in it without loading it on the event loop
 
         if bee.name.lower() == "bee":
             bee_growing = NormalBee(user=Player.GetPlayer(ctx.author.id))
@@ -50,7 +51,7 @@ class BeeCommands(commands.Cog):
 
     @commands.command()
     async def CheckBees(self, ctx: commands.Context):
-        storage = BeeStorage.GetBeeStorage(id = ctx.author.id)
+        storage = await BeeStorage.LoadBeeStorage(id = ctx.author.id)
         await storage.CheckForCompletion(ctx)
 
         embed = discord.Embed(
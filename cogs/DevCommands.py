@@ -1,13 +1,18 @@
-from GameLogic.Trading import Trade
+from GameLogic.Trading import PendingTrade, Trade
 from GameLogic.Bees import BeeStorage
 from GameLogic.plants import PlantStorage
+from GameLogic.Pets import PetStorage
+from GameLogic.Scheduler import GROWTH_SCHEDULER
 import discord
 
 from discord.ext import commands
 from GameLogic.Player import Player
 from GameLogic.Items import Item
+from GameLogic.LootTables import LootTable
+from collections import Counter
 from cogs.PlayerCommands import ConvertItemList
-from Utils.Constants import CURRENCY_SYMBOL, GLOBAL_SHOP, OnReactionOnly, OnReactionOnlyOnce, RefreshShop, pretty_time_delta
+from Utils.Locks import PLAYER_LOCKS
+from Utils.Constants import ANIMATIONS, BOT_METRICS, CURRENCY_SYMBOL, GLOBAL_SHOP, OnReactionOnly, OnReactionOnlyOnce, RefreshShop, pretty_time_delta
 
 
 class DevCommands(commands.Cog):
@@ -38,7 +43,7 @@ class DevCommands(commands.Cog):
             item = Item.GetItem(id=id)
             items_to_give[item] = amount
 
-        player : Player = Player.GetPlayer(user.id)
+        player : Player = await Player.LoadPlayer(user.id)
         player.inventory.AddItems(items=items_to_give)
         text = ""
         for item in items_to_give:
@@ -68,7 +73,7 @@ class DevCommands(commands.Cog):
             item = Item.GetItem(id=id)
             items_to_take[item] = amount
 
-        player : Player = Player.GetPlayer(user.id)
+        player : Player = await Player.LoadPlayer(user.id)
         player.inventory.RemoveItems(items=items_to_take)
         text = ""
         for item in items_to_take:
@@ -78,34 +83,27 @@ class DevCommands(commands.Cog):
     @commands.is_owner()
     @commands.command()
     async def Peek(self, ctx: commands.Context, user : discord.Member, page : int = 1):
-        player: Player = Player.GetPlayer(user.id)
-        pages = player.inventory.ToPages()
-        page = max(1, page)
-        page = min(page, len(pages))
-        page -= 1
+        player: Player = await Player.LoadPlayer(user.id)
+        text, page, pages = player.inventory.GetPage(page)
         embed = discord.Embed(
         title="`😈` Dev Tools `😈`",
-        description= pages[page],
+        description= text,
         color=discord.Color.dark_teal(),
         )
         embed.add_field(name="\u200b", value=f"**Balance:**`{CURRENCY_SYMBOL} {player.balance}`")
-        embed.set_footer(text=f"({page + 1}/{len(pages)}) pages")
+        embed.set_footer(text=f"({page + 1}/{pages}) pages")
         await ctx.send(content=f"<@{user.id}>", embed=embed)
 
     @commands.is_owner()
     @commands.command()
     async def PeekSelling(self, ctx: commands.Context, user : discord.Member, page : int = 1):
-        items_for_sale = dict(enumerate(GLOBAL_SHOP.GetAllSalesFor(user = Player.GetPlayer(id = user.id))))
-        pages = GLOBAL_SHOP.__ToPages__(items_for_sale)
-        page = max(1, page)
-        page = min(page, len(pages))
-        page -= 1
+        text, page, pages = GLOBAL_SHOP.GetPageFor(user = Player.GetPlayer(id = user.id), page = page)
         embed = discord.Embed(
         title=f"`💷` Dev Tools ({user.name}'s items on sale) `💷`",
-        description=pages[page],
+        description=text,
         color=discord.Color.dark_teal(),
         )
-        embed.set_footer(text=f"({page + 1}/{len(pages)}) pages")
+        embed.set_footer(text=f"({page + 1}/{pages}) pages")
         await ctx.send(embed=embed)
 
     @commands.is_owner()
@@ -113,13 +111,13 @@ class DevCommands(commands.Cog):
     async def cancelSalesFor(self, ctx: commands.Context, user : discord.Member):
         sales = GLOBAL_SHOP.GetAllSalesFor(user = Player.GetPlayer(id = user.id))
         for sale in sales:
-            sale.Cancel()
+            await sale.Cancel()
         await ctx.reply(content=f"`💸` `x{len(sales)}` sales for {user.name} have been cancelled! `💸`")
 
     @commands.is_owner()
     @commands.command()
     async def GiveMoney(self, ctx: commands.Context, user : discord.Member, amount : int = 1):
-        player: Player = Player.GetPlayer(user.id)
+        player: Player = await Player.LoadPlayer(user.id)
         player.balance += amount
         embed = discord.Embed(
         title="`😈` Dev Tools `😈`",
@@ -131,7 +129,7 @@ class DevCommands(commands.Cog):
     @commands.is_owner()
     @commands.command()
     async def TakeMoney(self, ctx: commands.Context, user : discord.Member, amount : int = 1):
-        player: Player = Player.GetPlayer(user.id)
+        player: Player = await Player.LoadPlayer(user.id)
         player.balance -= amount
         embed = discord.Embed(
         title="`💰` Money `💰`",
@@ -144,13 +142,69 @@ class DevCommands(commands.Cog):
     @commands.command()
     async def Clear(self, ctx: commands.Context):
         Player.Clear()
-        await ctx.reply(content=f"Cleared {len(Player.PLAYER_REFERENCES)} references.")
+        await ctx.reply(content=f"Cleared {len(Player.REPOSITORY)} references.")
 
     @commands.is_owner()
     @commands.command()
     async def Save(self, ctx: commands.Context):
-        Player.Save()
-        await ctx.reply(content=f"Saved {len(Player.PLAYER_REFERENCES)} references.")
+        report = await Player.Save()
+        await ctx.reply(content=f"Saved {len(Player.REPOSITORY)} references.\n`{report}`")
+
+    @commands.is_owner()
+    @commands.command()
+    async def CompactShop(self, ctx: commands.Context):
+        """removes the stored sales/bids that are not in the shop anymore"""
+        removed = await GLOBAL_SHOP.Compact()
+        await ctx.reply(content=f"Removed {removed} stale shop documents.")
+
+    @commands.is_owner()
+    @commands.command()
+    async def CacheStats(self, ctx: commands.Context):
+        text = ""
+        for name, repository in [("Players", Player.REPOSITORY), ("Plants", PlantStorage.REPOSITORY), ("Bees", BeeStorage.REPOSITORY), ("Pets", PetStorage.REPOSITORY)]:
+            text += f"**{name}:** `{repository}`\n"
+        text += f"**Messages:** `{BOT_METRICS.rest_calls_avoided} user fetches avoided, {BOT_METRICS.messages_skipped} skipped as non-commands`\n"
+        text += f"**Growth timers:** `{GROWTH_SCHEDULER}`\n"
+        text += f"**Animations:** `{ANIMATIONS}`\n"
+        text += f"**Player locks:** `{PLAYER_LOCKS}`\n"
+        embed = discord.Embed(
+        title="`😈` Dev Tools `😈`",
+        description= text,
+        color=discord.Color.dark_teal(),
+        )
+        await ctx.send(embed=embed)
+
+    @commands.is_owner()
+    @commands.command()
+    async def LootStats(self, ctx: commands.Context, *source : str):
+        """simulates a batch of drops from a loot table and compares the observed rates with the configured ones"""
+        draws = 100_000
+        if len(source) > 0 and source[-1].isdigit():
+            draws = min(int(source[-1]), 1_000_000) # the simulation runs on the event loop
+            source = source[:-1]
+        if len(source) == 0:
+            await ctx.reply(content=f"Use **$LootStats** `source` `draws`, sources: {', '.join(f'`{name}`' for name in LootTable.TABLES)}")
+            return
+        table = LootTable.Get(" ".join(source).lower())
+        counts = Counter(table.DrawMany(count=draws))
+        rarities : dict[str, list[float]] = {}
+        for item, chance in table.chances.items():
+            observed = rarities.setdefault(item.rarity, [0.0, 0.0])
+            observed[0] += counts[item] / draws
+            observed[1] += chance
+        text = "**Rarities** (observed / expected)\n"
+        for rarity, (observed, expected) in rarities.items():
+            text += f"`{rarity}` {observed:.2%} / {expected:.2%}\n"
+        text += "\n**Most likely items**\n"
+        for item, chance in sorted(table.chances.items(), key=lambda entry: entry[1], reverse=True)[:15]:
+            text += f"{item} {counts[item] / draws:.2%} / {chance:.2%}\n"
+        embed = discord.Embed(
+        title=f"`😈` Dev Tools (loot table: {table.source}) `😈`",
+        description= text,
+        color=discord.Color.dark_teal(),
+        )
+        embed.set_footer(text=f"{draws} simulated draws, {len(table.chances)} possible items")
+        await ctx.send(embed=embed)
 
     @commands.is_owner()
     @commands.command()
@@ -179,7 +233,7 @@ class DevCommands(commands.Cog):
 
         sales = GLOBAL_SHOP.GetAllSales()
         num = len(sales)
-        for sale in sales: sale.Cancel()
+        for sale in sales: await sale.Cancel()
         await ReplyWith(f"`✔️\u200b` successfully **cancelled**: x{num} sales!")
 
     @commands.is_owner()
@@ -187,17 +241,23 @@ class DevCommands(commands.Cog):
     async def ClearInv(self, ctx: commands.Context, user : discord.Member):
         """clears the user's inventory"""
         await ctx.reply(content=f"Ok. cleared {user.mention}'s inventory.")
-        Player.GetPlayer(user.id).inventory.Clear()
+        (await Player.LoadPlayer(user.id)).inventory.Clear()
 
     @commands.is_owner()
     @commands.command()
     async def Delete(self, ctx: commands.Context, user : discord.Member):
         """Deletes a user from the databases"""
-        Player.DeletePlayer(user.id)
-        PlantStorage.DeletePlantStorage(user.id)
-        GLOBAL_SHOP.DeleteSalesFor(user.id)
-        BeeStorage.DeleteBeeStorage(user.id)
-        Trade.CancelTradesWith(user.id)
+        # everything that could give the user items back goes first, without refunding them,
+        # otherwise it would load a fresh default player right after the delete and the next save would store it
+        async with PLAYER_LOCKS.Hold(user.id): # trades, sales and gifts touching this user all hold it too
+            GROWTH_SCHEDULER.Cancel(user.id)
+            PendingTrade.CancelTradesBy(user.id)
+            await Trade.CancelTradesWith(user.id)
+            await GLOBAL_SHOP.DeleteSalesFor(user.id)
+            await Player.DeletePlayer(user.id)
+            await PlantStorage.DeletePlantStorage(user.id)
+            await BeeStorage.DeleteBeeStorage(user.id)
+            await PetStorage.DeletePetStorage(user.id)
         await ctx.reply(content=f"Ok. deleted {user.mention} from database.")
 
     @commands.is_owner()
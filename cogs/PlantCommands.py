@@ -30,7 +30,7 @@ class PlantCommands(commands.Cog):
             await ReplyWith( f"Error! use **$Plant** `plantable item`!" )
             return
 
-        player = Player.GetPlayer(id = ctx.author.id)
+        player = await Player.LoadPlayer(id = ctx.author.id)
         water_droplet = Item.GetItem(id = "water droplet")
         if not player.inventory.HasItem(item=water_droplet):
             await ReplyWith( f"Error! You do not have any {water_droplet} !" )
@@ -41,6 +41,7 @@ class PlantCommands(commands.Cog):
         if not player.inventory.HasItem(item=seed_item):
             await ReplyWith( f"Error! You do not have any {seed_item} !" )
             return
+        await PlantStorage.LoadPlantStorage(id = ctx.author.id) # the plants below are put in it without loading it on the event loop
 
         if seed_item.name == "X Seed":
             plant = XSeedPlant(user=Player.GetPlayer(ctx.author.id))
@@ -70,7 +71,7 @@ class PlantCommands(commands.Cog):
     @commands.command()
     async def CheckPlants(self, ctx: commands.Context):
         """check the plant that are currently being grown"""
-        storage = PlantStorage.GetPlantStorage(id = ctx.author.id )
+        storage = await PlantStorage.LoadPlantStorage(id = ctx.author.id )
         await storage.CheckForCompletion(ctx)
 
         embed = discord.Embed(
@@ -2,16 +2,19 @@
 import asyncio
 import random
 import time
+from collections import Counter
 import discord
 
 from discord.ext import commands
-from Utils.ErrorHandling import ErrorMessage 
+from Utils.ErrorHandling import ErrorMessage, ShopError, TradeError
+from Utils.Locks import PLAYER_LOCKS
 
-from GameLogic.shop import Sale, CURRENCY_SYMBOL
+from GameLogic.shop import BuyOrder, Sale, CURRENCY_SYMBOL
 from GameLogic.Player import Player
 from GameLogic.Items import Inventory, Item
+from GameLogic.LootTables import LootTable
 from GameLogic.Trading import PendingTrade, Trade, IsTrading, GetAnyTradeInvolving
-from Utils.Constants import DAILY_REWARD_TIME, HOUR, ITEMS_PER_TRADE_LIMIT, RewardUI, SHOP_CONSTANTS
+from Utils.Constants import BULK_OPEN_THRESHOLD, DAILY_REWARD_TIME, HOUR, ITEMS_PER_TRADE_LIMIT, PAGE_ITEM_LIMIT, RewardUI, SHOP_CONSTANTS
 
 from Utils.Constants import GLOBAL_SHOP, pretty_time_delta, ConvertItemList
 from discord.ext.commands import MemberConverter
@@ -30,34 +33,48 @@ class PlayerCommands(commands.Cog):
     @commands.command(aliases=["inv"])
     @ErrorMessage("\n👋 **Use this:**  \n\n**$Inventory** `optional: page number`")
     async def Inventory(self, ctx: commands.Context, page : int = 1):
-        player: Player = Player.GetPlayer(ctx.author.id)
-        pages = player.inventory.ToPages()
-        page = max(1, page)
-        page = min(page, len(pages))
-        page -= 1
+        player: Player = await Player.LoadPlayer(ctx.author.id)
+        text, page, pages = player.inventory.GetPage(page)
         embed = discord.Embed(
         title="💼 Inventory 💼",
-        description= pages[page],
+        description= text,
         color=discord.Color.dark_teal(),
         )
         embed.add_field(name="\u200b", value=f"**Balance:**`{CURRENCY_SYMBOL} {player.balance}`")
-        embed.set_footer(text=f"({page + 1}/{len(pages)}) pages")
+        embed.set_footer(text=f"({page + 1}/{pages}) pages")
         await ctx.send(embed=embed)
 
     @commands.command()
-    @ErrorMessage("\n👋 **Use this:**  \n\n**$Shop** `optional: page number`")
-    async def Shop(self, ctx: commands.Context, page : int = 1):
-        """opens up the global shop."""
-        pages = GLOBAL_SHOP.ToPages()
-        page = max(1, page)
-        page = min(page, len(pages))
-        page -= 1
+    @ErrorMessage("\n👋 **Use this:**  \n\n**$Shop** `optional: page number`\n**$Shop item** `id | name` `optional: page number`\n**$Shop category** `name` `optional: page number`\n**$Shop sort price** `optional: page number`")
+    async def Shop(self, ctx: commands.Context, *args : str):
+        """opens up the global shop. can be filtered with: item `name`, category `name`, sort price"""
+        args = list(args)
+        page = 1
+        if len(args) > 0 and args[-1].isdigit():
+            page = int(args.pop())
+        title = "💷 Shop 💷"
+        view = args[0].lower() if len(args) > 0 else None
+        if view == None:
+            text, page, pages = GLOBAL_SHOP.GetPage(page)
+        elif view == "item" and len(args) > 1:
+            item = Item.GetItem(id=" ".join(args[1:]))
+            text, page, pages = GLOBAL_SHOP.GetPageOf(item, page)
+            title = f"💷 Shop ({item.name}) 💷"
+        elif view == "category" and len(args) > 1:
+            category = " ".join(args[1:]).lower()
+            text, page, pages = GLOBAL_SHOP.GetPageIn(category, page)
+            title = f"💷 Shop ({category}) 💷"
+        elif view == "sort" and len(args) == 2 and args[1].lower() == "price":
+            text, page, pages = GLOBAL_SHOP.GetPageByPrice(page)
+            title = "💷 Shop (cheapest first) 💷"
+        else:
+            raise commands.BadArgument(f"unknown shop filter: {' '.join(args)}")
         embed = discord.Embed(
-        title="💷 Shop 💷",
-        description=pages[page],
+        title=title,
+        description=text,
         color=discord.Color.dark_teal(),
         )
-        embed.set_footer(text=f"({page + 1}/{len(pages)}) pages")
+        embed.set_footer(text=f"({page + 1}/{pages}) pages")
         await ctx.send(embed=embed)
 
     @commands.command()
@@ -90,22 +107,82 @@ class PlayerCommands(commands.Cog):
             await ReplyWith(f"Cannot sell `{CURRENCY_SYMBOL}{price}` price!")
             return
 
-        player = Player.GetPlayer(id = ctx.author.id)
-        item = Item.GetItem(id)
-        itemCount = player.inventory.GetItemCount(item=item)
+        async with PLAYER_LOCKS.Hold(ctx.author.id):
+            player = await Player.LoadPlayer(id = ctx.author.id)
+            item = Item.GetItem(id)
+            itemCount = player.inventory.GetItemCount(item=item)
 
-        if itemCount == 0 or itemCount < amount: 
-            await ReplyWith(f"Cannot sell [{item}] because you do not have `x{amount}`!")
-            return
-            
+            if itemCount == 0 or itemCount < amount: 
+                await ReplyWith(f"Cannot sell [{item}] because you do not have `x{amount}`!")
+                return
+            player.inventory.RemoveItem(item=item, amount=amount)
+        # the sale holds the items from here on, AddSale locks the seller again along with the bidders it sells to
         sale = Sale(item=item, amount=amount, price=price, seller=player)
-        GLOBAL_SHOP.AddSale(sale=sale)
-        player.inventory.RemoveItem(item=item, amount=amount)
-        await ReplyWith(f"{sale.item} `x{sale.amount}` **for** `{CURRENCY_SYMBOL}{sale.price}` is now in the shop `🎉`! ")
+        await GLOBAL_SHOP.AddSale(sale=sale)
+        text = ""
+        if sale.amount < amount:
+            text += f"`x{amount - sale.amount}` sold right away to standing bids `💸`!\n"
+        if sale.amount > 0:
+            text += f"{sale.item} `x{sale.amount}` **for** `{CURRENCY_SYMBOL}{sale.price}` is now in the shop `🎉`! "
+        await ReplyWith(text)
+
+    @commands.command()
+    @ErrorMessage("\n👋 **Use this:**  \n\n**$Bid** `id | name of item` `amount` `max price per item`")
+    async def Bid(self, ctx: commands.Context, *args : str):
+        """places a buy order, the money is held until sales fill it or you $CancelBid it"""
+        async def ReplyWith(text : str):
+            embed = discord.Embed(
+            title="💷 Bidding 💷",
+            description= text,
+            color=discord.Color.dark_teal(),
+            )
+            await ctx.send(embed=embed)
+
+        args : list = ConvertItemList(args)
+        if len(args) != 3 or not isinstance(args[1], int) or not isinstance(args[2], int):
+            await ReplyWith("\nError: **Use this:**  \n\n**$Bid** `id | name of item` `amount` `max price per item`")
+            return
+
+        name, amount, price = args
+        order = BuyOrder(item=Item.GetItem(name), amount=amount, price=price, buyer=Player.GetPlayer(id = ctx.author.id))
+        bought = await GLOBAL_SHOP.PlaceBid(order) # locks the buyer along with the sellers it buys from
+        text = "".join(f"`✔️\u200b` bought {sale.item} `x{sale.amount}` **for** `{CURRENCY_SYMBOL}{sale.price}`\n" for sale in bought)
+        if order.amount > 0:
+            text += f"\nbidding on {order.item} `x{order.amount}` **at most** `{CURRENCY_SYMBOL}{order.price}` each, `{CURRENCY_SYMBOL}{order.amount * order.price}` is held until it fills `🎉`!"
+        await ReplyWith(text)
+
+    @commands.command()
+    async def Bids(self, ctx: commands.Context):
+        """shows your standing bids"""
+        orders = GLOBAL_SHOP.GetOrdersFor(Player.GetPlayer(id = ctx.author.id))
+        embed = discord.Embed(
+        title="💷 My bids 💷",
+        description="\u200b" + "".join(f"{order}\n" for order in orders[:PAGE_ITEM_LIMIT]),
+        color=discord.Color.dark_teal(),
+        )
+        if len(orders) > PAGE_ITEM_LIMIT: embed.set_footer(text=f"and {len(orders) - PAGE_ITEM_LIMIT} more")
+        await ctx.send(embed=embed)
+
+    @commands.command()
+    @ErrorMessage("\n👋 **Use this:**  \n\n**$CancelBid** `bid id`")
+    async def CancelBid(self, ctx: commands.Context, order_id : str):
+        """cancels one of your bids and gives back the money held for it"""
+        async with PLAYER_LOCKS.Hold(ctx.author.id):
+            order = GLOBAL_SHOP.GetOrder(order_id.upper())
+            if str(order.buyer.id) != str(ctx.author.id):
+                await ctx.reply(content="That bid is not yours!")
+                return
+            await GLOBAL_SHOP.CancelBid(order)
+        embed = discord.Embed(
+        title="💷 Bidding 💷",
+        description=f"`✔️\u200b` successfully **cancelled**:\n\n {order}\n\n`{CURRENCY_SYMBOL}{order.amount * order.price}` was given back",
+        color=discord.Color.dark_teal(),
+        )
+        await ctx.send(embed=embed)
 
     @commands.command()
     @ErrorMessage("\n👋 **Use this:**  \n\n**$CancelSale** `sale id`")
-    async def CancelSale(self, ctx: commands.Context, sale_id : int):
+    async def CancelSale(self, ctx: commands.Context, sale_id : str):
         """cancels a sale you put up, must specify which one with the sale_id (the number inside the [] brackets)"""
         async def ReplyWith(text : str):
             embed = discord.Embed(
@@ -115,27 +192,36 @@ class PlayerCommands(commands.Cog):
             )
             await ctx.send(embed=embed)
 
-        if not GLOBAL_SHOP.HasSale(sale_id): 
-            await ReplyWith("That sale does not exist!")
-            return
-        sale = GLOBAL_SHOP.GetSale(sale_id)
-        if not str(sale.seller.id) == str(ctx.author.id):
-            await ReplyWith("That sale is not yours!")
-            return
-        sale.Cancel()
+        sale_id = sale_id.upper()
+        async with PLAYER_LOCKS.Hold(ctx.author.id):
+            if not GLOBAL_SHOP.HasSale(sale_id): 
+                await ReplyWith("That sale does not exist!")
+                return
+            sale = GLOBAL_SHOP.GetSale(sale_id)
+            if not str(sale.seller.id) == str(ctx.author.id):
+                await ReplyWith("That sale is not yours!")
+                return
+            await sale.Cancel()
         await ReplyWith(f"`✔️\u200b` successfully **cancelled**:\n\n {sale}")
 
     @commands.command()
-    @ErrorMessage("\n👋 **Use this:**  \n\n**$Buy** `sale id`")
-    async def buy(self, ctx: commands.Context, sale_id : str):
-        """Buys an item from the $shop. The sale_id is the corresponding number inside the [] brackets in the shop"""
-        sale = GLOBAL_SHOP.GetSale(sale_id.upper())
-        
-        user = Player.GetPlayer(id = ctx.author.id)
-        if sale.seller == user:
-            await ctx.reply(content="HEY! stop that. you cannot buy your own items....")
+    @ErrorMessage("\n👋 **Use this:**  \n\n**$Buy** `sale id`\n**$Buy** `id | name of item` `amount` `optional: max price per item`")
+    async def buy(self, ctx: commands.Context, *args : str):
+        """Buys an item from the $shop. The sale_id is the corresponding number inside the [] brackets in the shop.
+           $buy item amount [max price] buys the cheapest ones across every sale instead"""
+        if len(args) > 1:
+            await self.SweepBuy(ctx, args)
             return
-        sale.Buy(client=user)
+        if len(args) == 0: raise commands.BadArgument("missing sale id")
+        sale = GLOBAL_SHOP.GetSale(args[0].upper())
+        
+        async with PLAYER_LOCKS.Hold(ctx.author.id, sale.seller.id):
+            if not GLOBAL_SHOP.HasSale(sale.id): raise ShopError("That sale was bought or cancelled meanwhile!")
+            user, _ = await Player.LoadPlayers([ctx.author.id, sale.seller.id])
+            if sale.seller.id == user.id:
+                await ctx.reply(content="HEY! stop that. you cannot buy your own items....")
+                return
+            await sale.Buy(client=user)
         embed = discord.Embed(
         title="💷 Selling 💷",
         description=f"You purchased {sale.item} `x{sale.amount}` **for** `{CURRENCY_SYMBOL}{sale.price}` `🎉`!",
@@ -144,20 +230,43 @@ class PlayerCommands(commands.Cog):
         await ctx.send(content=f"<@{ctx.author.id}> <@{sale.seller.id}>", embed=embed)
         
     
+    async def SweepBuy(self, ctx: commands.Context, args : tuple[str]):
+        args : list = ConvertItemList(args)
+        if len(args) not in (2, 3) or not all(isinstance(number, int) for number in args[1:]):
+            raise commands.BadArgument(f"cannot buy: {' '.join(map(str, args))}")
+        item = Item.GetItem(args[0])
+        amount = args[1]
+        max_price = args[2] if len(args) == 3 else None
+        if amount <= 0: raise commands.BadArgument(f"cannot buy `x{amount}`")
+
+        # locks the buyer along with the sellers it buys from
+        fills = await GLOBAL_SHOP.SweepBuy(buyer=Player.GetPlayer(id = ctx.author.id), item=item, amount=amount, max_price=max_price)
+        bought = sum(count for _, count, _ in fills)
+        spent = sum(price for _, _, price in fills)
+        if bought == 0:
+            text = f"No {item} for sale that you can afford" + ("" if max_price == None else f" at `{CURRENCY_SYMBOL}{max_price}` each") + "!"
+        else:
+            text = f"You purchased {item} `x{bought}` **for** `{CURRENCY_SYMBOL}{spent}` from {len(fills)} sale(s) `🎉`!"
+            if bought < amount:
+                text += f"\n\nonly `x{bought}` of the `x{amount}` you asked for were " + ("available" if max_price == None else f"available at `{CURRENCY_SYMBOL}{max_price}` each") + " and affordable."
+        embed = discord.Embed(
+        title="💷 Selling 💷",
+        description=text,
+        color=discord.Color.dark_teal(),
+        )
+        sellers = " ".join(sorted({f"<@{sale.seller.id}>" for sale, _, _ in fills}))
+        await ctx.send(content=f"<@{ctx.author.id}> {sellers}", embed=embed)
+
     @commands.command()
     async def selling(self, ctx: commands.Context, page : int = 1):
         """Shows all the items you are selling"""
-        items_for_sale = dict(enumerate(GLOBAL_SHOP.GetAllSalesFor(user = Player.GetPlayer(id = ctx.author.id))))
-        pages = GLOBAL_SHOP.__ToPages__(items_for_sale)
-        page = max(1, page)
-        page = min(page, len(pages))
-        page -= 1
+        text, page, pages = GLOBAL_SHOP.GetPageFor(user = Player.GetPlayer(id = ctx.author.id), page = page)
         embed = discord.Embed(
         title="💷 My items for sale 💷",
-        description=pages[page],
+        description=text,
         color=discord.Color.dark_teal(),
         )
-        embed.set_footer(text=f"({page + 1}/{len(pages)}) pages")
+        embed.set_footer(text=f"({page + 1}/{pages}) pages")
         await ctx.send(embed=embed)
 
     @commands.command()
@@ -179,21 +288,21 @@ class PlayerCommands(commands.Cog):
 
         items_to_give : dict[Item, int] = {}
 
-        sender = Player.GetPlayer(id = ctx.author.id)
-        recipient : Player = Player.GetPlayer(user.id)
-        if len(items) != 0:
-            for id,amount in zip(items[0::2], items[1::2]):
-                amount = int(amount)
-                item = Item.GetItem(id=id)
-                if amount <= 0:
-                    await ReplyWith(f"⚙️ Error: Amount (`x{amount}`) must be greater than 0! \u200b\u200b⚙️", f"<@{sender.id}>")
-                    return
-                if not sender.inventory.HasAmount(item, amount):
-                    await ReplyWith(f"⚙️ Error: You do not have `x{amount}` of {item} \u200b\u200b⚙️", f"<@{sender.id}>")
-                    return
-                items_to_give[item] = amount
-
-        sender.Gift(recipient= recipient, items = items_to_give)
+        async with PLAYER_LOCKS.Hold(ctx.author.id, user.id):
+            sender, recipient = await Player.LoadPlayers([ctx.author.id, user.id])
+            if len(items) != 0:
+                for id,amount in zip(items[0::2], items[1::2]):
+                    amount = int(amount)
+                    item = Item.GetItem(id=id)
+                    if amount <= 0:
+                        await ReplyWith(f"⚙️ Error: Amount (`x{amount}`) must be greater than 0! \u200b\u200b⚙️", f"<@{sender.id}>")
+                        return
+                    if not sender.inventory.HasAmount(item, amount):
+                        await ReplyWith(f"⚙️ Error: You do not have `x{amount}` of {item} \u200b\u200b⚙️", f"<@{sender.id}>")
+                        return
+                    items_to_give[item] = amount
+
+            sender.Gift(recipient= recipient, items = items_to_give)
         text = ""
         for item in items_to_give:
             text += f'-> {item} `x`{items_to_give[item]}\n'
@@ -212,44 +321,45 @@ class PlayerCommands(commands.Cog):
             )
             await ctx.send(embed=embed)
 
-        user = Player.GetPlayer(id = ctx.author.id)
-        if IsTrading(user=user):
-            await ReplyWith("You are already in a trade!")
-            return
-
-        if len(items) % 2 != 0:
-            await ReplyWith("⚙️ Error: Use **$Trade `id | name` `amount` `id | name` `amount` ...** \u200b\u200b⚙️")
-            return
-        if len(items[0::2]) > ITEMS_PER_TRADE_LIMIT:
-            await ReplyWith(f"⚙️ Error: You are trading too many items! maximum allowed: {ITEMS_PER_TRADE_LIMIT} \u200b\u200b⚙️")
-            return     
+        async with PLAYER_LOCKS.Hold(ctx.author.id):
+            user = await Player.LoadPlayer(id = ctx.author.id)
+            if IsTrading(user=user):
+                await ReplyWith("You are already in a trade!")
+                return
 
-        items_trading : dict[Item, int] = {}
-        if len(items) != 0:
-            for id,amount in zip(items[0::2], items[1::2]):
-                amount = int(amount)
-                item = Item.GetItem(id=id)
-                if amount <= 0:
-                    await ReplyWith(f"⚙️ Error: Amount (`x{amount}`) must be greater than 0! \u200b\u200b⚙️")
-                    return
-                if not user.inventory.HasAmount(item, amount):
-                    await ReplyWith(f"⚙️ Error: You do not have `x{amount}` of {item} \u200b\u200b⚙️")
-                    return
-                items_trading[item] = amount
+            if len(items) % 2 != 0:
+                await ReplyWith("⚙️ Error: Use **$Trade `id | name` `amount` `id | name` `amount` ...** \u200b\u200b⚙️")
+                return
+            if len(items[0::2]) > ITEMS_PER_TRADE_LIMIT:
+                await ReplyWith(f"⚙️ Error: You are trading too many items! maximum allowed: {ITEMS_PER_TRADE_LIMIT} \u200b\u200b⚙️")
+                return     
+
+            items_trading : dict[Item, int] = {}
+            if len(items) != 0:
+                for id,amount in zip(items[0::2], items[1::2]):
+                    amount = int(amount)
+                    item = Item.GetItem(id=id)
+                    if amount <= 0:
+                        await ReplyWith(f"⚙️ Error: Amount (`x{amount}`) must be greater than 0! \u200b\u200b⚙️")
+                        return
+                    if not user.inventory.HasAmount(item, amount):
+                        await ReplyWith(f"⚙️ Error: You do not have `x{amount}` of {item} \u200b\u200b⚙️")
+                        return
+                    items_trading[item] = amount
             
-            user.inventory.RemoveItems(items=items_trading)
-        ######## CREATE TRADE MESSAGE ########
-        embed = discord.Embed(
-        title=f"`🎉` **User {user.name} is trading!** `🎉`",
-        description= "Items on Trade: ",
-        color=discord.Color.dark_teal(),
-        )
-        embed.add_field(name="\u200b", value=Inventory.CreatePageFrom(items=items_trading))
-        embed.add_field(inline=False,name="\u200b", value=f"\n`🎉` To Trade, reply with **$AcceptWith** `id | name` `amount`... `🎉`")
-        msg = await ctx.send(embed=embed)
-        ######################################
+                user.inventory.RemoveItems(items=items_trading)
+            ######## CREATE TRADE MESSAGE ########
+            embed = discord.Embed(
+            title=f"`🎉` **User {user.name} is trading!** `🎉`",
+            description= "Items on Trade: ",
+            color=discord.Color.dark_teal(),
+            )
+            embed.add_field(name="\u200b", value=Inventory.CreatePageFrom(items=items_trading))
+            embed.add_field(inline=False,name="\u200b", value=f"\n`🎉` To Trade, reply with **$AcceptWith** `id | name` `amount`... `🎉`")
+            msg = await ctx.send(embed=embed)
+            ######################################
         
-        PendingTrade(Items_on_trade=items_trading, seller=user, possible_traders=[], id = msg.id)
+            PendingTrade(Items_on_trade=items_trading, seller=user, possible_traders=[], id = msg.id)
 
     @commands.command()
     async def AcceptWith(self, ctx: commands.Context,  *items : str):
@@ -263,7 +373,7 @@ class PlayerCommands(commands.Cog):
             )
             await ctx.send(embed=embed)
 
-        user = Player.GetPlayer(id = ctx.author.id)
+        user = await Player.LoadPlayer(id = ctx.author.id)
 
         if IsTrading(user=user):
           await ReplyWith("You are already in a trade!")
@@ -279,34 +389,38 @@ class PlayerCommands(commands.Cog):
             return       
 
         trade = PendingTrade.Get(msg.reference.message_id)
+        async with PLAYER_LOCKS.Hold(ctx.author.id, *trade.Participants()):
+            if not trade.IsOpen() or IsTrading(user=user): # accepted, cancelled or another trade was started while waiting
+                await ReplyWith("That trade is no longer available!")
+                return
 
-        if not trade.CanTrade(Trader=Player.GetPlayer(id=ctx.author.id)):
-            await ReplyWith("You are not allowed to trade in this particular trading post!")
-            return
-
-        if  len(items) % 2 != 0:
-            await ReplyWith("⚙️ Error! Use while replying to a trade post: **$AcceptWith `id | name` `amount` `id | name` `amount` ...** \u200b\u200b⚙️")
-            return
-        if len(items) > ITEMS_PER_TRADE_LIMIT:
-            await ReplyWith(f"⚙️ Error: You are trading too many items! maximum allowed: {ITEMS_PER_TRADE_LIMIT} \u200b\u200b⚙️")
-            return     
+            if not trade.CanTrade(Trader=Player.GetPlayer(id=ctx.author.id)):
+                await ReplyWith("You are not allowed to trade in this particular trading post!")
+                return
 
-        items_trading : dict[Item, int] = {}
-        if len(items) != 0:
-            for id,amount in zip(items[0::2], items[1::2]):
-                amount = int(amount)
-                item = Item.GetItem(id=id)
-                if amount <= 0:
-                    await ReplyWith(f"⚙️ Error: Amount (`x{amount}`) must be greater than 0! \u200b\u200b⚙️")
-                    return
-                if not user.inventory.HasAmount(item, amount):
-                    await ReplyWith(f"⚙️ Error: You do not have `x{amount}` of {item} \u200b\u200b⚙️")
-                    return
-                items_trading[item] = amount
+            if  len(items) % 2 != 0:
+                await ReplyWith("⚙️ Error! Use while replying to a trade post: **$AcceptWith `id | name` `amount` `id | name` `amount` ...** \u200b\u200b⚙️")
+                return
+            if len(items) > ITEMS_PER_TRADE_LIMIT:
+                await ReplyWith(f"⚙️ Error: You are trading too many items! maximum allowed: {ITEMS_PER_TRADE_LIMIT} \u200b\u200b⚙️")
+                return     
+
+            items_trading : dict[Item, int] = {}
+            if len(items) != 0:
+                for id,amount in zip(items[0::2], items[1::2]):
+                    amount = int(amount)
+                    item = Item.GetItem(id=id)
+                    if amount <= 0:
+                        await ReplyWith(f"⚙️ Error: Amount (`x{amount}`) must be greater than 0! \u200b\u200b⚙️")
+                        return
+                    if not user.inventory.HasAmount(item, amount):
+                        await ReplyWith(f"⚙️ Error: You do not have `x{amount}` of {item} \u200b\u200b⚙️")
+                        return
+                    items_trading[item] = amount
         
-            user.inventory.RemoveItems(items=items_trading)
+                user.inventory.RemoveItems(items=items_trading)
 
-        trade = trade.ConvertToTrade(Trader=user, items=items_trading)
+            trade = trade.ConvertToTrade(Trader=user, items=items_trading)
 
         ######## CREATE TRADE MESSAGE ########
         embed = discord.Embed(
@@ -330,17 +444,23 @@ class PlayerCommands(commands.Cog):
             color=discord.Color.dark_teal(),
             )
             await ctx.reply(embed=embed)
-        user = Player.GetPlayer(ctx.author.id)
+        user = await Player.LoadPlayer(ctx.author.id)
         trade = GetAnyTradeInvolving(user)
-        trade.Cancel()
+        async with PLAYER_LOCKS.Hold(*trade.Participants()):
+            if not trade.IsOpen(): raise TradeError("That trade was already completed or cancelled!")
+            await trade.LoadParticipants()
+            trade.Cancel()
         await ReplyWith("`👍`\n Successfully cancelled the trade `✔️` ")
 
     @commands.command()
     async def accept(self, ctx: commands.Context):
         """"Attempts to accept the trade offer that is going on"""
-        user = Player.GetPlayer(ctx.author.id)
+        user = await Player.LoadPlayer(ctx.author.id)
         trade = Trade.GetTradeBy(user=user)
-        trade.confirm()
+        async with PLAYER_LOCKS.Hold(*trade.Participants()):
+            if not trade.IsOpen(): raise TradeError("That trade was already completed or cancelled!")
+            await trade.LoadParticipants()
+            trade.confirm()
         embed = discord.Embed(
             title="💷 Trading 💷",
             description= "`👍` Successfully completed the trade `👍`\n\n ",
@@ -374,7 +494,7 @@ class PlayerCommands(commands.Cog):
             await ReplyWith("⚙️ Error! Use **$discard** `id | name` `amount`...⚙️")
             return
 
-        player = Player.GetPlayer(id = ctx.author.id)
+        player = await Player.LoadPlayer(id = ctx.author.id)
         
         items_to_sell = {}
         money_gained = 0
@@ -420,7 +540,7 @@ class PlayerCommands(commands.Cog):
             )
             await ctx.send(embed=embed)
 
-        user = Player.GetPlayer(id = ctx.author.id)
+        user = await Player.LoadPlayer(id = ctx.author.id)
 
         if IsTrading(user=user):
           await ReplyWith("You are already in a trade!")
@@ -436,34 +556,38 @@ class PlayerCommands(commands.Cog):
             return       
 
         trade = PendingTrade.Get(msg.reference.message_id)
+        async with PLAYER_LOCKS.Hold(ctx.author.id, *trade.Participants()):
+            if not trade.IsOpen() or IsTrading(user=user): # accepted, cancelled or another trade was started while waiting
+                await ReplyWith("That trade is no longer available!")
+                return
 
-        if not trade.CanTrade(Trader=Player.GetPlayer(id=ctx.author.id)):
-            await ReplyWith("You are not allowed to trade in this particular trading post!")
-            return
-
-        if  len(items) % 2 != 0:
-            await ReplyWith("⚙️ Error! Use while replying to a trade post: **$AcceptWith `id | name` `amount` `id | name` `amount` ...** \u200b\u200b⚙️")
-            return
-        if len(items) > ITEMS_PER_TRADE_LIMIT:
-            await ReplyWith(f"⚙️ Error: You are trading too many items! maximum allowed: {ITEMS_PER_TRADE_LIMIT} \u200b\u200b⚙️")
-            return     
+            if not trade.CanTrade(Trader=Player.GetPlayer(id=ctx.author.id)):
+                await ReplyWith("You are not allowed to trade in this particular trading post!")
+                return
 
-        items_trading : dict[Item, int] = {}
-        if len(items) != 0:
-            for id,amount in zip(items[0::2], items[1::2]):
-                amount = int(amount)
-                item = Item.GetItem(id=id)
-                if amount <= 0:
-                    await ReplyWith(f"⚙️ Error: Amount (`x{amount}`) must be greater than 0! \u200b\u200b⚙️")
-                    return
-                if not user.inventory.HasAmount(item, amount):
-                    await ReplyWith(f"⚙️ Error: You do not have `x{amount}` of {item} \u200b\u200b⚙️")
-                    return
-                items_trading[item] = amount
+            if  len(items) % 2 != 0:
+                await ReplyWith("⚙️ Error! Use while replying to a trade post: **$AcceptWith `id | name` `amount` `id | name` `amount` ...** \u200b\u200b⚙️")
+                return
+            if len(items) > ITEMS_PER_TRADE_LIMIT:
+                await ReplyWith(f"⚙️ Error: You are trading too many items! maximum allowed: {ITEMS_PER_TRADE_LIMIT} \u200b\u200b⚙️")
+                return     
+
+            items_trading : dict[Item, int] = {}
+            if len(items) != 0:
+                for id,amount in zip(items[0::2], items[1::2]):
+                    amount = int(amount)
+                    item = Item.GetItem(id=id)
+                    if amount <= 0:
+                        await ReplyWith(f"⚙️ Error: Amount (`x{amount}`) must be greater than 0! \u200b\u200b⚙️")
+                        return
+                    if not user.inventory.HasAmount(item, amount):
+                        await ReplyWith(f"⚙️ Error: You do not have `x{amount}` of {item} \u200b\u200b⚙️")
+                        return
+                    items_trading[item] = amount
         
-            user.inventory.RemoveItems(items=items_trading)
+                user.inventory.RemoveItems(items=items_trading)
 
-        trade = trade.ConvertToTrade(Trader=user, items=items_trading)
+            trade = trade.ConvertToTrade(Trader=user, items=items_trading)
 
         ######## CREATE TRADE MESSAGE ########
         embed = discord.Embed(
@@ -490,7 +614,7 @@ class PlayerCommands(commands.Cog):
             )
             await ctx.send(embed=embed)
 
-        user = Player.GetPlayer(id = ctx.author.id)
+        user = await Player.LoadPlayer(id = ctx.author.id)
 
         if  len(items) % 2 != 0 and len(items) != 0:
             await ReplyWith("⚙️ Error! Use while replying to a trade post: **$use `id | name` `amount`  ...** \u200b\u200b⚙️")
@@ -514,12 +638,16 @@ class PlayerCommands(commands.Cog):
                 
                 user.inventory.RemoveItem(item=item, amount=amount)
 
+                if amount >= BULK_OPEN_THRESHOLD:
+                    await self.BulkOpen(ctx=ctx, user=user, name=name, amount=amount)
+                    continue
+
                 if name == 'lootbox':
                     await ReplyWith(f"📦 Attempting to open {amount} lootboxes! 📦")
                     for i in range(amount):
                         await RewardUI(ctx = ctx,
                                        user = user,
-                                       items_to_give= [Item.GetRandomItem() for _ in range(random.randint(1,5))],
+                                       items_to_give= LootTable.Get("lootbox").DrawMany(count=random.randint(1,5)),
                                        title= f"`📦` Opening Lootbox `{i+1}` `📦`"
                                        )
 
@@ -535,6 +663,32 @@ class PlayerCommands(commands.Cog):
                         )
                         user.balance += amount
                         await ctx.send(embed=embed)
+
+    async def BulkOpen(self, ctx: commands.Context, user : Player, name : str, amount : int):
+        """opens every lootbox/purse at once, same odds as opening them one by one but a single draw and a single message"""
+        if name == 'lootbox':
+            rewards = Counter( LootTable.Get("lootbox").DrawMany(count=sum(random.choices(range(1, 6), k=amount))) )
+            user.inventory.AddItems(items=rewards)
+            embed = discord.Embed(
+            title=f"`📦` Opened `{amount}` Lootboxes `📦`",
+            description= Inventory.CreatePageFrom(items=dict(rewards.most_common())),
+            color=discord.Color.dark_teal(),
+            )
+            embed.set_footer(text=f"{sum(rewards.values())} items")
+            await ctx.reply(embed=embed)
+
+        if name == 'purse':
+            money = sum(random.choices(range(1, 11), k=amount))
+            jackpots = sum(1 for roll in random.choices(range(1000), k=amount) if roll < 2)
+            money += jackpots * 100
+            user.balance += money
+            jackpot_text = f"\n\n`🎉` {jackpots} of them had a jackpot!" if jackpots > 0 else ""
+            embed = discord.Embed(
+            title=f"`👛` Opened `{amount}` Purses `👛`",
+            description= f"You found `{CURRENCY_SYMBOL}{money}` !{jackpot_text}",
+            color=discord.Color.dark_teal(),
+            )
+            await ctx.reply(embed=embed)
                         
                                 
 
@@ -555,17 +709,18 @@ class PlayerCommands(commands.Cog):
         item = Item.GetItem(id=item)
         arg = await converter.convert(ctx, items[-1])
         if item.name == "Arctic Parasite":
-            user = Player.GetPlayer(id = ctx.author.id)
-            victim = Player.GetPlayer(id = arg.id)
-            if len(victim.inventory.items) == 0:
-                await ReplyWith(f"⚙️ Error: {victim} does not have any items! \u200b\u200b⚙️")
-                return
-            stolen_items = victim.inventory.GetRandomItems(count=random.randint(1,3))
-            # give the attacker the items
-            user.inventory.AddItems(items=stolen_items)
-            user.inventory.RemoveItem(Item.GetItem(id="Arctic Parasite"))
-            # remove the items from the victim
-            victim.inventory.RemoveItems(items=stolen_items)
+            async with PLAYER_LOCKS.Hold(ctx.author.id, arg.id):
+                user, victim = await Player.LoadPlayers([ctx.author.id, arg.id])
+                if not user.inventory.HasAmount(item, 1):
+                    await ReplyWith(f"⚙️ Error: You do not have {item} \u200b\u200b⚙️")
+                    return
+                if len(victim.inventory.items) == 0:
+                    await ReplyWith(f"⚙️ Error: {victim} does not have any items! \u200b\u200b⚙️")
+                    return
+                stolen_items = victim.inventory.GetRandomItems(count=random.randint(1,3))
+                user.inventory.RemoveItem(item)
+                # remove the items from the victim, RewardUI gives them to the attacker
+                victim.inventory.RemoveItems(items=stolen_items)
             await RewardUI(ctx = ctx,
                            user = user,
                            items_to_give= Inventory.GetDictAsList(stolen_items),
@@ -586,18 +741,18 @@ class PlayerCommands(commands.Cog):
     @commands.command()
     async def Daily(self, ctx: commands.Context):
         """Gives you daily rewards"""
-        player = Player.GetPlayer(id=ctx.author.id)
+        player = await Player.LoadPlayer(id=ctx.author.id)
         async def GiveDaily():
+            player.extra['last_claimed_daily'] = int( time.time() ) # before any await, a second $daily during the animation is refused
             items = {Item.GetItem(id="lootbox") : 3,
                     Item.GetItem(id="water droplet") : 3,
                     Item.GetItem(id="honey") : 1,
                     }
             await RewardUI(ctx = ctx,
                            user = player,
-                           items_to_give= Inventory.GetDictAsList(items),
+                           items_to_give= Inventory.GetDictAsList(items) + [LootTable.Get("daily").Draw()], # plus one bonus drop
                            title= "`📅` Daily Reward `📅`"
                            )
-            player.extra['last_claimed_daily'] = int( time.time() )
 
         last_claimed_daily = player.extra.get("last_claimed_daily", None)
         if last_claimed_daily == None:
@@ -0,0 +1,71 @@
+"""shared fixtures. the modules connect to mongo lazily, so importing them only needs MONGO_KEY to be a valid uri,
+every test that touches a collection gets mongomock ones instead (see the mongo fixture)"""
+from __future__ import annotations
+import os, sys
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("MONGO_KEY", "mongodb://localhost:27017")
+
+COLLECTIONS = {"Player" : "Players", "Shop" : "Shop", "Plant" : "Plants", "Bee" : "Bees", "Pet" : "Pets"}
+
+@pytest.fixture
+def items():
+    """the frozen item registry, for the tests that do not touch a collection"""
+    pytest.importorskip("discord")
+    import Utils.Constants # resolves the Constants <-> GameLogic import cycle the same way bot.py does
+    from GameLogic.Items import Item
+    return Item
+
+@pytest.fixture
+def mongo(monkeypatch):
+    """points every database of Utils.Database at a fresh mongomock database, returns it"""
+    mongomock = pytest.importorskip("mongomock")
+    pytest.importorskip("discord")
+    import Utils.Constants # resolves the Constants <-> GameLogic import cycle the same way bot.py does
+    import Utils.Database as Database
+    database = mongomock.MongoClient().get_database("Arrodes")
+    executor = ThreadPoolExecutor(max_workers=1) # mongomock is not meant to be used from several threads
+    for name, collection in COLLECTIONS.items():
+        monkeypatch.setattr(getattr(Database, f"{name}Database"), "collection", database[collection])
+        asynchronous = getattr(Database, f"Async{name}Database")
+        monkeypatch.setattr(asynchronous, "collection", database[collection])
+        monkeypatch.setattr(asynchronous.database, "collection", database[collection])
+        monkeypatch.setattr(asynchronous, "executor", executor)
+    yield database
+    executor.shutdown()
+
+@pytest.fixture
+def players(mongo, monkeypatch):
+    """a fresh player repository on top of the mongomock database"""
+    from GameLogic.Player import Player
+    from Utils.Repository import Repository
+    repository = Repository(database=Player.REPOSITORY.database, async_database=Player.REPOSITORY.async_database, entity=Player,
+                            create=Player.__Create__, max_entries=1000, idle_ttl=60)
+    monkeypatch.setattr(Player, "REPOSITORY", repository)
+    return repository
+
+@pytest.fixture
+def shop(players, monkeypatch):
+    """an empty shop, also installed as GLOBAL_SHOP"""
+    import Utils.Constants
+    from GameLogic.shop import Shop
+    result = Shop()
+    monkeypatch.setattr(Utils.Constants, "GLOBAL_SHOP", result)
+    return result
+
+@pytest.fixture
+def honey(shop):
+    from GameLogic.Items import Item
+    return Item.GetItem("honey")
+
+@pytest.fixture
+def sell(shop):
+    """lists a sale the way $sell does: the items leave the seller's inventory before the sale is added"""
+    from GameLogic.shop import Sale
+    async def Sell(item, amount : int, price : int, seller):
+        seller.inventory.AddItem(item, amount)
+        seller.inventory.RemoveItem(item, amount)
+        return await shop.AddSale(Sale(item=item, amount=amount, price=price, seller=seller))
+    return Sell
\ No newline at end of file
@@ -0,0 +1,42 @@
+from __future__ import annotations
+import asyncio
+from types import SimpleNamespace
+from Utils.Animation import AnimationEngine
+
+def Message(channel_id : int):
+    """records the descriptions it was edited with"""
+    edits = []
+    async def edit(embed): edits.append(embed.description)
+    return SimpleNamespace(channel=SimpleNamespace(id=channel_id), edit=edit), edits
+
+def test_plan_spreads_the_budget_and_ends_on_the_last_frame():
+    engine = AnimationEngine(edits_per_message=4, frame_delay=0, channel_edits=5, channel_refill_per_second=1)
+    assert engine.Plan(10, 4) == [1, 4, 6, 9]
+    assert engine.Plan(3, 4) == [0, 1, 2]
+    assert engine.Plan(10, 1) == [9] and engine.Plan(0, 4) == []
+
+def test_a_hot_channel_only_shows_the_result():
+    engine = AnimationEngine(edits_per_message=4, frame_delay=0, channel_edits=5, channel_refill_per_second=1000)
+    frames = [str(frame) for frame in range(20)]
+    first, first_edits = Message(1)
+    second, second_edits = Message(1)
+    async def main():
+        await engine.Play(first, SimpleNamespace(description=None), frames)
+        engine.Bucket(1).refill_per_second = 0.001 # 1 token left, no time to recover
+        await engine.Play(second, SimpleNamespace(description=None), frames)
+    asyncio.run(main())
+    assert first_edits == ["4", "9", "14", "19"]
+    assert second_edits == ["19"]
+    assert engine.playing == {}
+
+def test_full_idle_buckets_are_pruned(monkeypatch):
+    monkeypatch.setattr(AnimationEngine, "PRUNE_FROM", 4)
+    engine = AnimationEngine(edits_per_message=4, frame_delay=0, channel_edits=5, channel_refill_per_second=0.001)
+    for channel_id in range(4): engine.Bucket(channel_id)
+    engine.Bucket(1).Take() # still refilling
+    engine.playing[2] = 1   # an animation is running in it
+    engine.Bucket(4)        # the table is full: 0 and 3 are dropped before 4 is added
+    assert sorted(engine.buckets) == [1, 2, 4]
+    assert engine.prune_at == 4
+    for channel_id in range(5, 100): engine.Bucket(channel_id)
+    assert len(engine.buckets) <= 2 * engine.prune_at
@@ -0,0 +1,67 @@
+from __future__ import annotations
+import asyncio
+import pytest
+
+def test_new_sale_fills_the_best_bids_first(shop, honey, sell):
+    from GameLogic.Player import Player
+    from GameLogic.shop import BuyOrder
+    async def main():
+        seller, low, high, late = await Player.LoadPlayers(["1", "2", "3", "4"])
+        low.balance = high.balance = late.balance = 100
+        await shop.PlaceBid(BuyOrder(honey, 3, 5, low, placed_at=1))
+        await shop.PlaceBid(BuyOrder(honey, 2, 8, high, placed_at=2))
+        await shop.PlaceBid(BuyOrder(honey, 3, 5, late, placed_at=3)) # same price as low, placed later
+        sale = await sell(honey, 4, 12, seller) # 3 each, every bid pays more
+        return seller, low, high, late, sale
+    seller, low, high, late, sale = asyncio.run(main())
+    assert sale.amount == 0 and sale.id == None
+    assert [user.inventory.GetItemCount(honey) for user in (high, low, late)] == [2, 2, 0]
+    assert seller.balance == 20 + 2 * 8 + 2 * 5 # every fill is paid at the bid's price
+    assert [order.amount for order in shop.GetOrdersFor(low)] == [1] and shop.GetBestBid(honey).buyer is low
+
+def test_what_no_bid_pays_for_is_listed(shop, honey, sell, mongo):
+    from GameLogic.Player import Player
+    from GameLogic.shop import BuyOrder
+    async def main():
+        seller, bidder = await Player.LoadPlayers(["1", "2"])
+        bidder.balance = 100
+        await shop.PlaceBid(BuyOrder(honey, 1, 5, bidder))
+        await shop.PlaceBid(BuyOrder(honey, 4, 5, seller))
+        return seller, await sell(honey, 3, 12, seller)
+    seller, sale = asyncio.run(main())
+    assert (sale.amount, sale.price) == (2, 8) # the rest keeps the asked 4 per unit, rounded up
+    assert shop.GetSalesOf(honey) == [sale] and mongo["Shop"].count_documents({"type" : "sale", "sale_id" : sale.id}) == 1
+    assert [order.amount for order in shop.GetOrdersFor(seller)] == [4] and seller.balance == 5 # nobody fills their own bid
+
+def test_bid_buys_listed_sales_and_keeps_the_rest(shop, honey, sell):
+    from GameLogic.Player import Player
+    from GameLogic.shop import BuyOrder
+    async def main():
+        buyer, seller = await Player.LoadPlayers(["1", "2"])
+        buyer.balance = 100
+        await sell(honey, 2, 6, seller)
+        await sell(honey, 2, 20, seller) # 10 each, over the bid
+        order = BuyOrder(honey, 3, 4, buyer)
+        bought = await shop.PlaceBid(order)
+        return buyer, seller, order, bought
+    buyer, seller, order, bought = asyncio.run(main())
+    assert [sale.price for sale in bought] == [6] and buyer.inventory.GetItemCount(honey) == 2
+    assert buyer.balance == 100 - 6 - 4 and seller.balance == 26 # 1 unit still held at the bid price
+    assert order.amount == 1 and shop.GetOrder(order.id) is order
+    assert [sale.price for sale in shop.GetSalesOf(honey)] == [20]
+
+def test_cancelled_bid_gives_the_escrow_back(shop, honey):
+    from GameLogic.Player import Player
+    from GameLogic.shop import BuyOrder
+    from Utils.ErrorHandling import ShopError
+    async def main():
+        [buyer] = await Player.LoadPlayers(["1"])
+        order = BuyOrder(honey, 2, 7, buyer)
+        await shop.PlaceBid(order)
+        assert buyer.balance == 20 - 14
+        await shop.CancelBid(order)
+        with pytest.raises(ShopError): await shop.CancelBid(order)
+        with pytest.raises(ShopError): await shop.PlaceBid(BuyOrder(honey, 10, 10, buyer))
+        return buyer
+    buyer = asyncio.run(main())
+    assert buyer.balance == 20 and shop.GetBestBid(honey) == None and shop.orders == {}
@@ -0,0 +1,44 @@
+from __future__ import annotations
+import asyncio, random
+from types import SimpleNamespace
+
+def Context():
+    """records the embeds it was replied with"""
+    replies = []
+    async def reply(content = None, embed = None, **_): replies.append(embed)
+    return SimpleNamespace(reply=reply), replies
+
+def test_lootboxes_are_drawn_in_one_batch_and_summed_up(players, monkeypatch):
+    from cogs.PlayerCommands import PlayerCommands
+    from GameLogic.LootTables import LootTable
+    from GameLogic.Player import Player
+    counts = []
+    def DrawMany(table, count, draw=LootTable.DrawMany):
+        counts.append(count)
+        return draw(table, count)
+    monkeypatch.setattr(LootTable, "DrawMany", DrawMany)
+    ctx, replies = Context()
+    random.seed(12)
+    async def main():
+        user = await Player.LoadPlayer("1")
+        before = sum(user.inventory.items.values())
+        await PlayerCommands(None).BulkOpen(ctx=ctx, user=user, name="lootbox", amount=50)
+        return sum(user.inventory.items.values()) - before
+    gained = asyncio.run(main())
+    assert len(counts) == 1 and 50 <= counts[0] <= 250 # a single draw for every box
+    assert gained == counts[0]
+    assert len(replies) == 1 and replies[0].footer.text == f"{gained} items"
+
+def test_purses_add_up_with_their_jackpots(players, monkeypatch):
+    from cogs.PlayerCommands import PlayerCommands
+    from GameLogic.Player import Player
+    rolls = iter([[1] * 20, [0] + [999] * 19]) # every purse holds 1, one of them has the jackpot
+    monkeypatch.setattr(random, "choices", lambda population, k: next(rolls))
+    ctx, replies = Context()
+    async def main():
+        user = await Player.LoadPlayer("1")
+        balance = user.balance
+        await PlayerCommands(None).BulkOpen(ctx=ctx, user=user, name="purse", amount=20)
+        return user.balance - balance
+    assert asyncio.run(main()) == 20 + 100
+    assert len(replies) == 1 and "1 of them had a jackpot" in replies[0].description
@@ -0,0 +1,35 @@
+from __future__ import annotations
+import asyncio
+
+def test_compact_removes_only_what_is_not_listed(shop, honey, sell, mongo):
+    from GameLogic.Player import Player
+    from GameLogic.shop import BuyOrder, SaleIds
+    async def main():
+        seller, buyer = await Player.LoadPlayers(["1", "2"])
+        buyer.balance = 100
+        await sell(honey, 1, 50, seller)
+        await shop.PlaceBid(BuyOrder(honey, 2, 3, buyer))
+        await shop.SweepBuy(buyer, honey, 1) # leaves a fill behind
+        await sell(honey, 1, 40, seller)
+        # what failed deletes left behind: sales and bids nobody has anymore
+        mongo["Shop"].insert_many([{"id" : "1", "type" : "sale", "sale_id" : f"OLD{idx}", "item" : honey.id, "amount" : 1, "price" : 1, "seller" : "1"} for idx in range(5)]
+                                  + [{"id" : "2", "type" : "bid", "order_id" : "GONE", "item" : honey.id, "amount" : 1, "price" : 1, "placed_at" : 0}])
+        return await shop.Compact(batch_size=2)
+    removed = asyncio.run(main())
+    assert removed == 6
+    assert {document.get("sale_id") for document in mongo["Shop"].find({"type" : "sale"})} == set(shop.auction)
+    assert {document["order_id"] for document in mongo["Shop"].find({"type" : "bid"})} == set(shop.orders)
+    assert mongo["Shop"].count_documents({"type" : "fill"}) == 1
+    assert mongo["Shop"].count_documents({"id" : SaleIds.KEY}) == 1
+    assert asyncio.run(shop.Compact()) == 0
+
+def test_a_sale_is_deleted_by_its_id_only(shop, honey, sell, mongo):
+    from GameLogic.Player import Player
+    async def main():
+        [seller] = await Player.LoadPlayers(["1"])
+        first = await sell(honey, 1, 5, seller)
+        twin = await sell(honey, 1, 5, seller) # same seller, item, amount and price
+        await first.Cancel()
+        return twin
+    twin = asyncio.run(main())
+    assert [document["sale_id"] for document in mongo["Shop"].find({"type" : "sale"})] == [twin.id]
@@ -0,0 +1,76 @@
+from __future__ import annotations
+import asyncio
+import pytest
+
+def test_merge_keeps_the_newest_fields():
+    from Utils.Database import FlushEngine
+    older = {"$set" : {"balance" : 1, "inventory" : {"3" : 1}}, "$unset" : {"extra.a" : ""}}
+    newer = {"$set" : {"inventory.4" : 2, "extra.a" : 5}, "$unset" : {"balance" : ""}}
+    assert FlushEngine.Merge(older, newer) == {"$set" : {"inventory" : {"3" : 1, "4" : 2}, "extra.a" : 5}, "$unset" : {"balance" : ""}}
+
+def test_flush_writes_every_chunk(mongo):
+    from Utils.Database import AsyncPlayerDatabase, FlushEngine
+    engine = FlushEngine(AsyncPlayerDatabase, chunk_size=2)
+    for key in range(5):
+        engine.Queue(key, {"$set" : {"id" : str(key), "balance" : key}})
+    report = asyncio.run(engine.Flush())
+    assert (report.ok, report.chunks, report.documents, report.upserted) == (True, 3, 5, 5)
+    assert sorted(document["balance"] for document in mongo["Players"].find()) == [0, 1, 2, 3, 4]
+    assert engine.pending == {} and engine.in_flight == {}
+
+def test_failed_chunk_is_queued_again_under_newer_updates(mongo):
+    from Utils.Database import AsyncPlayerDatabase, FlushEngine
+    class FailingOnce:
+        """fails the first bulk write, after queueing a newer update for one of its keys"""
+        def __init__(self) -> None:
+            self.collection = AsyncPlayerDatabase.collection
+            self.calls = 0
+        async def BulkUpsert(self, chunk):
+            self.calls += 1
+            if self.calls == 1:
+                engine.Queue("0", {"$set" : {"balance" : 100}})
+                raise RuntimeError("connection reset")
+            return await AsyncPlayerDatabase.BulkUpsert(chunk)
+
+    engine = FlushEngine(FailingOnce(), chunk_size=2)
+    for key in range(3):
+        engine.Queue(key, {"$set" : {"id" : str(key), "balance" : key}})
+    report = asyncio.run(engine.Flush())
+    assert (report.ok, report.failed, report.documents) == (False, 2, 1)
+    # the failed chunk is back, with the update queued during the flush on top of it
+    assert engine.pending == {"0" : {"$set" : {"id" : "0", "balance" : 100}}, "1" : {"$set" : {"id" : "1", "balance" : 1}}}
+
+    report = asyncio.run(engine.Flush())
+    assert (report.ok, report.documents) == (True, 2)
+    assert {document["id"] : document["balance"] for document in mongo["Players"].find()} == {"0" : 100, "1" : 1, "2" : 2}
+
+def test_wait_for_returns_once_the_key_is_written(mongo):
+    from Utils.Database import AsyncPlayerDatabase, FlushEngine
+    engine = FlushEngine(AsyncPlayerDatabase)
+    engine.Queue("7", {"$set" : {"id" : "7"}})
+    async def main():
+        flush = asyncio.ensure_future(engine.Flush())
+        await asyncio.sleep(0) # the flush is now writing "7"
+        assert "7" in engine.in_flight
+        await engine.WaitFor("7")
+        assert mongo["Players"].find_one({"id" : "7"}) is not None
+        await flush
+    asyncio.run(main())
+
+def test_increment_and_bulk_write(mongo):
+    from pymongo import DeleteOne, InsertOne
+    from Utils.Database import AsyncShopDatabase
+    async def main():
+        assert await AsyncShopDatabase.Increment("sale_ids", "next", 50) == 50
+        assert await AsyncShopDatabase.Increment("sale_ids", "next", 50) == 100
+        await AsyncShopDatabase.BulkWrite([InsertOne({"id" : "1", "sale_id" : "A"}), InsertOne({"id" : "1", "sale_id" : "B"}), DeleteOne({"sale_id" : "A"})])
+        return await AsyncShopDatabase.Find({"id" : "1"}, projection={"_id" : 0, "sale_id" : 1})
+    assert asyncio.run(main()) == [{"sale_id" : "B"}]
+def test_repositories_index_id_even_over_duplicates(mongo, players):
+    mongo["Players"].insert_many([{"id" : "1"}, {"id" : "1"}])
+    mongo["Plants"].insert_one({"id" : "1"})
+    from GameLogic.plants import PlantStorage
+    asyncio.run(players.CreateIndex())
+    asyncio.run(PlantStorage.REPOSITORY.CreateIndex())
+    assert [index.get("unique", False) for index in mongo["Players"].index_information().values() if index["key"] == [("id", 1)]] == [False]
+    assert [index.get("unique", False) for index in mongo["Plants"].index_information().values() if index["key"] == [("id", 1)]] == [True]
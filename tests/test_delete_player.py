@@ -0,0 +1,29 @@
+from __future__ import annotations
+import asyncio
+from types import SimpleNamespace
+
+def test_delete_then_save_does_not_bring_the_player_back(shop, mongo, players):
+    from cogs.DevCommands import DevCommands
+    from GameLogic.Items import Item
+    from GameLogic.Player import Player
+    from GameLogic.shop import Sale
+    from GameLogic.Trading import PendingTrade, Trade
+    honey = Item.GetItem("honey")
+    replies = []
+    async def reply(content = None, **_): replies.append(content)
+    async def main():
+        user, other = await Player.LoadPlayers(["1", "2"])
+        await shop.AddSale(Sale(item=honey, amount=2, price=10, seller=user))
+        Trade(UserOne=user, UserTwo=other, UserOneItems={honey : 1}, UserTwoItems={honey : 3}, id=1)
+        PendingTrade({honey : 4}, user, [], id=2)
+        await Player.Save()
+        assert mongo["Players"].count_documents({"id" : "1"}) == 1
+        await DevCommands.Delete.callback(DevCommands(None), SimpleNamespace(reply=reply), SimpleNamespace(id=1, mention="<@1>"))
+        await Player.Save()
+        return other
+    other = asyncio.run(main())
+    assert mongo["Players"].count_documents({"id" : "1"}) == 0
+    assert mongo["Shop"].count_documents({"id" : "1"}) == 0 and len(shop.auction) == 0
+    assert Trade.TRADES == {} and PendingTrade.PENDING_TRADES == {}
+    assert other.inventory.GetItemCount(honey) == 3 # only the other side got their items back
+    assert "1" not in players.cache and replies == ["Ok. deleted <@1> from database."]
\ No newline at end of file
@@ -0,0 +1,52 @@
+from __future__ import annotations
+import random
+import pytest
+from Utils.Fuzzy import EditDistance, FuzzyIndex
+
+NAMES = ["honey", "honeycomb", "lootbox", "water droplet", "wooden plank", "wooden plant", "arctic parasite"]
+
+@pytest.fixture
+def index():
+    return FuzzyIndex({name : name.upper() for name in NAMES})
+
+def Levenshtein(first : str, second : str) -> int:
+    """the plain full table, to check the early exits against"""
+    table = [[row + column if row * column == 0 else 0 for column in range(len(second) + 1)] for row in range(len(first) + 1)]
+    for row in range(1, len(first) + 1):
+        for column in range(1, len(second) + 1):
+            table[row][column] = min(table[row - 1][column] + 1, table[row][column - 1] + 1, table[row - 1][column - 1] + (first[row - 1] != second[column - 1]))
+    return table[-1][-1]
+
+def test_edit_distance_matches_the_full_table_and_gives_up_past_the_bound():
+    random.seed(3)
+    for _ in range(500):
+        first = "".join(random.choices("abc", k=random.randint(0, 7)))
+        second = "".join(random.choices("abc", k=random.randint(0, 7)))
+        bound = random.randint(0, 4)
+        expected = Levenshtein(first, second)
+        assert EditDistance(first, second) == expected
+        assert EditDistance(first, second, max_distance=bound) == (expected if expected <= bound else bound + 1)
+
+def test_exact_names_and_unambiguous_prefixes_resolve(index):
+    assert index.Resolve("honey") == "HONEY" # exact, even though it is also a prefix of honeycomb
+    assert index.Resolve("honeyc") == "HONEYCOMB"
+    assert index.Resolve("loot") == "LOOTBOX"
+    assert index.Resolve("wooden plan") == None # plank or plant
+    assert index.Resolve("zebra") == None and index.Prefix("") == None
+
+def test_completions_are_shortest_first(index):
+    assert index.Completions("wooden") == ["wooden plank", "wooden plant"]
+    assert index.Completions("h", limit=1) == ["honey"]
+    assert index.Completions("x") == []
+
+def test_typos_are_suggested_closest_first(index):
+    assert index.Suggest("hony") == ["honey"]
+    assert index.Suggest("wooden plamt")[:2] == ["wooden plant", "wooden plank"]
+    assert index.Suggest("artic parasite") == ["arctic parasite"]
+    assert index.Suggest("123456789012") == []
+
+def test_item_names(items):
+    from Utils.ErrorHandling import InventoryError
+    assert items.GetItem("HONEY") is items.GetItem(id=items.GetItem("honey").id)
+    with pytest.raises(InventoryError, match="did you mean `Honey`"): items.GetItem("hony")
+    with pytest.raises(InventoryError, match="cannot find item with id"): items.GetItem(10 ** 9)
@@ -0,0 +1,66 @@
+from __future__ import annotations
+import asyncio, random
+from collections import Counter
+
+def test_compact_inventory_matches_the_dict_one_through_random_changes(items):
+    from GameLogic.Items import CompactInventory, Inventory
+    rng = random.Random(17)
+    reference, compact = Inventory(), CompactInventory()
+    pool = rng.sample(items.ALL, 12)
+    for step in range(3000):
+        item, amount = rng.choice(pool), rng.randint(1, 6)
+        roll = rng.random()
+        if roll < 0.55: reference.AddItem(item, amount), compact.AddItem(item, amount)
+        elif roll < 0.97: reference.RemoveItem(item, amount), compact.RemoveItem(item, amount)
+        else: assert reference.Clear() == compact.Clear()
+        if step % 25 == 0:
+            assert compact.items == reference.items and compact.ToDict() == reference.ToDict()
+            assert compact.GetTotalItems() == reference.GetTotalItems() and compact.held == len(reference.items)
+            assert all(compact.GetItemCount(item) == reference.GetItemCount(item) for item in pool)
+            assert compact.changed == reference.changed and compact.version == reference.version
+            assert compact.GetPage(1)[1:] == reference.GetPage(1)[1:]
+            reference.changed.clear(), compact.changed.clear()
+    assert CompactInventory.FromDict(reference.ToDict()).items == reference.items
+
+def test_packed_form_and_counts_past_two_bytes(items):
+    from GameLogic.Items import CompactInventory
+    inventory = CompactInventory()
+    honey, lootbox = items.GetItem("honey"), items.GetItem("lootbox")
+    inventory.AddItem(honey, 3).AddItem(lootbox, 70_000)
+    assert inventory.counts.typecode == "I" and inventory.GetItemCount(lootbox) == 70_000
+    assert len(inventory.ToBytes()) == 4 * 4 # two (id, count) pairs
+    restored = CompactInventory.FromBytes(inventory.ToBytes())
+    assert restored.items == inventory.items and restored.GetTotalItems() == 70_003 and restored.held == 2
+    assert CompactInventory.FromDict({str(honey.id) : 1}).counts.typecode == "H"
+
+def test_random_items_are_units_picked_without_replacement(items):
+    from GameLogic.Items import CompactInventory
+    random.seed(4)
+    honey, lootbox = items.GetItem("honey"), items.GetItem("lootbox")
+    inventory = CompactInventory().AddItem(honey, 1).AddItem(lootbox, 3)
+    drawn = Counter()
+    for _ in range(20_000):
+        picked = inventory.GetRandomItems(count=2)
+        assert sum(picked.values()) == 2 and picked.get(honey, 0) <= 1
+        drawn.update(picked)
+    assert abs(drawn[honey] / sum(drawn.values()) - 0.25) < 0.01 # 1 of the 4 units
+    assert inventory.GetRandomItems(count=5) == {honey : 1, lootbox : 3}
+    inventory.RemoveItem(lootbox, 3)
+    assert inventory.GetRandomItems(count=1) == {honey : 1} # the prefix sums are rebuilt after a change
+
+def test_players_can_use_compact_inventories(players, mongo, monkeypatch):
+    from GameLogic.Items import CompactInventory, Item
+    from GameLogic.Player import Player
+    monkeypatch.setattr(Player, "INVENTORY", CompactInventory)
+    honey = Item.GetItem("honey")
+    async def main():
+        user = await Player.LoadPlayer("1")
+        user.inventory.AddItem(honey, 4)
+        await Player.Save()
+        user.inventory.RemoveItem(honey, 1)
+        await Player.Save()
+    asyncio.run(main())
+    document = mongo["Players"].find_one({"id" : "1"})
+    assert document["inventory"][str(honey.id)] == 3
+    loaded = Player.FromDict(document)
+    assert isinstance(loaded.inventory, CompactInventory) and loaded.inventory.items == Player.GetPlayer("1").inventory.items
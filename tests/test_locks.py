@@ -0,0 +1,65 @@
+from __future__ import annotations
+import asyncio
+import pytest
+from Utils.Locks import PlayerLocks
+
+def test_same_player_is_serialized_other_players_are_not():
+    locks = PlayerLocks()
+    events = []
+    async def Command(name : str, *ids : str):
+        async with locks.Hold(*ids):
+            events.append(f"{name} in")
+            await asyncio.sleep(0.01)
+            events.append(f"{name} out")
+    async def main():
+        await asyncio.gather(Command("a", "1"), Command("b", "1", "2"), Command("c", "3"))
+    asyncio.run(main())
+    assert events.index("a out") < events.index("b in") # both need "1"
+    assert events.index("c in") < events.index("a out") # "3" never waited on anyone
+    assert locks.locks == {} and locks.owners == {}
+    assert locks.acquired == 4 and locks.contended == 1
+
+def test_opposite_orders_do_not_deadlock():
+    locks = PlayerLocks()
+    async def Transfer(*ids : str):
+        async with locks.Hold(*ids):
+            await asyncio.sleep(0)
+    async def main():
+        await asyncio.wait_for(asyncio.gather(*[Transfer("1", "2") if i % 2 else Transfer("2", "1") for i in range(50)]), timeout=5)
+    asyncio.run(main())
+    assert locks.locks == {}
+
+def test_reentrant_for_held_ids_only():
+    locks = PlayerLocks()
+    async def main():
+        async with locks.Hold("1", "2"):
+            async with locks.Hold("2"): # already held by this task
+                pass
+            with pytest.raises(RuntimeError): # would break the sorted order
+                async with locks.Hold("0"):
+                    pass
+            assert locks.owners.keys() == {"1", "2"}
+    asyncio.run(main())
+    assert locks.locks == {}
+
+def test_cancelled_waiter_leaves_nothing_behind():
+    locks = PlayerLocks()
+    async def main():
+        holder_in = asyncio.Event()
+        async def Holder():
+            async with locks.Hold("1"):
+                holder_in.set()
+                await asyncio.sleep(0.05)
+        async def Waiter():
+            async with locks.Hold("1"):
+                pass
+        holder = asyncio.ensure_future(Holder())
+        await holder_in.wait()
+        waiter = asyncio.ensure_future(Waiter())
+        await asyncio.sleep(0)
+        assert locks.locks["1"][1] == 2
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError): await waiter
+        await holder
+    asyncio.run(main())
+    assert locks.locks == {} and locks.owners == {}
\ No newline at end of file
@@ -0,0 +1,46 @@
+from __future__ import annotations
+import random
+from collections import Counter
+import pytest
+
+def test_alias_table_draws_every_outcome_at_its_weight(items):
+    from GameLogic.LootTables import AliasTable
+    random.seed(5)
+    weights = {"a" : 50, "b" : 30, "c" : 15, "d" : 5, "never" : 0}
+    table = AliasTable(list(weights), list(weights.values()))
+    draws = Counter(table.Draw() for _ in range(100_000))
+    assert draws["never"] == 0
+    for outcome in "abcd":
+        assert abs(draws[outcome] / 100_000 - weights[outcome] / 100) < 0.01
+
+def test_alias_table_needs_a_positive_weight(items):
+    from GameLogic.LootTables import AliasTable
+    with pytest.raises(ValueError): AliasTable([], [])
+    with pytest.raises(ValueError): AliasTable(["a"], [0])
+
+def test_weights_are_split_over_categories_and_rarities(items):
+    from GameLogic.LootTables import LootTable
+    table = LootTable("test", [("item", "honey", 50), ("category", "wooden", 50)])
+    wooden = items.CATEGORIES["wooden"]
+    assert abs(sum(table.chances.values()) - 1) < 1e-9
+    assert abs(table.chances[items.GetItem("honey")] - 0.5) < 1e-9
+    assert all(abs(table.chances[item] - 0.5 / len(wooden)) < 1e-9 for item in wooden)
+
+def test_small_and_big_batches_follow_the_same_chances(items):
+    from GameLogic.LootTables import BATCH_DRAWS_FROM, LootTable
+    random.seed(8)
+    table = LootTable.Get("lootbox")
+    for count, batches in [(BATCH_DRAWS_FROM - 1, 20_000), (50_000, 4)]:
+        draws = Counter(item for _ in range(batches) for item in table.DrawMany(count))
+        total = count * batches
+        assert set(draws) <= set(table.chances)
+        for rarity, chance in [("common", 0.85), ("rare", 0.12), ("legendary", 0.03)]:
+            drawn = sum(draws[item] for item in items.RARITY[rarity])
+            assert abs(drawn / total - chance) < 0.01
+
+def test_unknown_entries_are_refused(items):
+    from GameLogic.LootTables import LootTable
+    from Utils.ErrorHandling import InventoryError
+    with pytest.raises(InventoryError): LootTable("test", [("rarity", "mythic", 1)])
+    with pytest.raises(TypeError): LootTable("test", [("colour", "red", 1)])
+    with pytest.raises(InventoryError): LootTable.Get("nothing")
@@ -0,0 +1,48 @@
+from __future__ import annotations
+import random
+from Utils.Pages import ClampPage, PageCount, PagedIndex
+
+def Pages(reference : list, size : int) -> list[list]:
+    return [reference[start : start + size] for start in range(0, max(1, len(reference)), size)]
+
+def test_page_count_and_clamp():
+    assert [PageCount(entries, 10) for entries in (0, 1, 10, 11)] == [1, 1, 1, 2]
+    assert [ClampPage(page, 3) for page in (-5, 1, 3, 99)] == [0, 0, 2, 2]
+
+def test_pages_match_a_reference_list_through_random_changes():
+    rng = random.Random(24)
+    for size in (1, 3, 10):
+        index, reference = PagedIndex(size), [] # reference: (key, value) in insertion order
+        for step in range(3000):
+            roll = rng.random()
+            if roll < 0.55 or len(reference) == 0:
+                key = f"k{step}"
+                index[key] = step
+                reference.append((key, step))
+            elif roll < 0.9:
+                key, value = reference.pop(rng.randrange(len(reference)))
+                assert index.pop(key) == value
+            else: # overwriting keeps the slot
+                position = rng.randrange(len(reference))
+                key = reference[position][0]
+                index[key] = -step
+                reference[position] = (key, -step)
+            if step % 50 == 0 or roll >= 0.9:
+                values = [value for _, value in reference]
+                expected = Pages(values, size)
+                assert index.pages == len(expected)
+                for page, content in enumerate(expected):
+                    assert index.Page(page) == content
+                assert index.Page(len(expected)) == []
+        assert list(index) == [key for key, _ in reference]
+        assert list(index.values()) == [value for _, value in reference]
+        assert len(index) == len(reference)
+
+def test_holes_are_compacted():
+    index = PagedIndex(5)
+    for key in range(200): index[key] = key
+    for key in range(0, 200, 2): index.pop(key)
+    for key in range(1, 150, 2): index.pop(key)
+    assert index.holes <= len(index) + 32 and len(index.keys) < 200
+    assert index.Page(0) == list(range(151, 161, 2)) and index.pages == 5
+    assert index.get(151) == 151 and index.get(0, "gone") == "gone" and 0 not in index
\ No newline at end of file
@@ -0,0 +1,134 @@
+from __future__ import annotations
+import asyncio
+from types import SimpleNamespace
+import pytest
+from Utils.Handle import LazyEntity
+
+class Tally(LazyEntity):
+    """smallest entity a Repository can hold"""
+    __slots__ = ("value", "saved")
+    REPOSITORY = None
+
+    def GetChanges(self) -> dict:
+        return {"$set" : {"id" : self.id, "value" : self.value}} if self.value != self.saved else None
+    def MarkSaved(self) -> Tally:
+        self.saved = self.value
+        return self
+    def HasChanges(self) -> bool:
+        return self.value != self.saved
+
+    @staticmethod
+    def Create(id : str, document : dict) -> Tally:
+        result = Tally.Handle(id)
+        result.value = 0 if document == None else document["value"]
+        result.saved = None if document == None else document["value"]
+        result.is_loaded = True
+        return result
+
+class SlowDatabase:
+    """stored documents, reads only return once release is set, every read is recorded"""
+    def __init__(self, documents : dict[str, dict]) -> None:
+        self.documents = documents
+        self.reads : list[list[str]] = []
+        self.release : asyncio.Event = None
+        self.collection = SimpleNamespace(name="Counters")
+    def Get(self, key : str) -> dict:
+        self.reads.append([key])
+        return self.documents.get(key)
+    async def __Wait__(self, ids : list[str]) -> None:
+        self.reads.append(list(ids))
+        if self.release != None: await self.release.wait()
+    async def GetMany(self, ids : list[str]) -> list[dict]:
+        await self.__Wait__(ids)
+        return [self.documents[id] for id in ids if id in self.documents]
+    async def BulkUpsert(self, chunk : dict[str, dict]):
+        for key, update in chunk.items():
+            self.documents[key] = dict(self.documents.get(key, {}), **update["$set"])
+        return SimpleNamespace(upserted_count=len(chunk), modified_count=0)
+    async def Delete(self, key : str) -> None:
+        await self.__Wait__([key])
+        self.documents.pop(key, None)
+
+@pytest.fixture
+def repository():
+    from Utils.Repository import Repository
+    database = SlowDatabase({"1" : {"id" : "1", "value" : 10}, "2" : {"id" : "2", "value" : 20}})
+    async def Get(key : str) -> dict:
+        return (await database.GetMany([key]) or [None])[0]
+    result = Repository(database=database, async_database=SimpleNamespace(Get=Get, GetMany=database.GetMany, BulkUpsert=database.BulkUpsert,
+                                                                          Delete=database.Delete, collection=database.collection),
+                        entity=Tally, create=Tally.Create, max_entries=100, idle_ttl=60)
+    Tally.REPOSITORY = result
+    result.fake = database
+    return result
+
+def test_handles_are_shared_and_lazy(repository):
+    handle = repository.Get("1")
+    assert repository.Get(1) is handle and not handle.is_loaded
+    assert handle.value == 10 # loaded on first use
+    assert handle.is_loaded and repository.fake.reads == [["1"]]
+
+def test_save_only_writes_changes(repository):
+    async def main():
+        entity = await repository.Load("1")
+        await repository.Save()
+        entity.value = 11
+        fresh = await repository.Load("5")
+        report = await repository.Save()
+        return report, fresh
+    report, fresh = asyncio.run(main())
+    assert report.documents == 2 # "1" changed, "5" is new
+    assert repository.fake.documents["1"]["value"] == 11 and repository.fake.documents["5"]["value"] == 0
+
+def test_delete_refuses_loads_and_is_not_saved_again(repository):
+    async def main():
+        entity = await repository.Load("1")
+        entity.value = 99
+        repository.fake.release = asyncio.Event()
+        delete = asyncio.ensure_future(repository.Delete("1"))
+        await asyncio.sleep(0) # waiting on the database
+        with pytest.raises(LookupError): await repository.Load("1")
+        with pytest.raises(LookupError): repository.Get("1").value # LoadBlocking
+        await repository.Save()
+        repository.fake.release.set()
+        await delete
+        await repository.Save()
+    asyncio.run(main())
+    assert "1" not in repository.fake.documents
+    assert repository.deleting == set()
+
+def test_concurrent_load_and_prefetch_read_each_id_once(repository):
+    async def main():
+        repository.fake.release = asyncio.Event()
+        load = asyncio.ensure_future(repository.Load("1"))
+        await asyncio.sleep(0)
+        prefetch = asyncio.ensure_future(repository.Prefetch(["1", "2", "3"]))
+        second_load = asyncio.ensure_future(repository.Load("2"))
+        await asyncio.sleep(0)
+        repository.fake.release.set()
+        return await load, await prefetch, await second_load
+    one, (prefetched_one, two, three), second_two = asyncio.run(main())
+    assert one is prefetched_one and two is second_two
+    assert (one.value, two.value, three.value) == (10, 20, 0)
+    # "1" was in flight when the prefetch started, "2" when the second load did: nothing is read twice
+    assert sorted(id for read in repository.fake.reads for id in read) == ["1", "2", "3"]
+    assert repository.coalesced == 2
+
+def test_failed_fetch_is_retried_by_the_waiters(repository):
+    async def main():
+        repository.fake.release = asyncio.Event()
+        real = repository.fake.GetMany
+        async def FailOnce(ids):
+            await repository.fake.__Wait__(ids)
+            raise RuntimeError("timeout")
+        repository.async_database.GetMany = FailOnce
+        first = asyncio.ensure_future(repository.Prefetch(["1"]))
+        await asyncio.sleep(0)
+        repository.async_database.GetMany = real
+        waiter = asyncio.ensure_future(repository.Prefetch(["1"]))
+        await asyncio.sleep(0)
+        repository.fake.release.set()
+        with pytest.raises(RuntimeError): await first
+        return await waiter
+    [entity] = asyncio.run(main())
+    assert entity.value == 10
\ No newline at end of file
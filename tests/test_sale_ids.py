@@ -0,0 +1,55 @@
+from __future__ import annotations
+import asyncio
+import pytest
+
+@pytest.fixture
+def ids(items):
+    from GameLogic.shop import SaleIds
+    return SaleIds
+
+def test_encode_is_a_bijection_for_each_length(ids):
+    three = [ids.Encode(counter) for counter in range(36 ** 3)]
+    assert len(set(three)) == 36 ** 3 and {len(id) for id in three} == {3}
+    assert set("".join(three)) <= set(ids.DIGITS)
+    assert three[0][:2] != three[1][:2] # consecutive ids do not look alike
+
+def test_ids_get_one_character_longer_once_a_length_is_used_up(ids):
+    last, first = 36 ** 3 - 1, 36 ** 3
+    assert (len(ids.Encode(last)), len(ids.Encode(first))) == (3, 4)
+    four = {ids.Encode(counter) for counter in range(first, first + 36 ** 4, 997)}
+    assert len(four) == len(range(first, first + 36 ** 4, 997)) and {len(id) for id in four} == {4}
+    assert len(ids.Encode(first + 36 ** 4)) == 5
+
+def test_next_reserves_blocks_from_the_stored_counter(mongo, ids, monkeypatch):
+    import GameLogic.shop
+    monkeypatch.setattr(GameLogic.shop, "SALE_ID_BLOCK", 4)
+    async def main():
+        first, second = ids(), ids() # two processes sharing the collection
+        return [await first.Next() for _ in range(5)] + [await second.Next() for _ in range(2)]
+    handed = asyncio.run(main())
+    assert handed == [ids.Encode(counter) for counter in (0, 1, 2, 3, 4, 8, 9)]
+    assert mongo["Shop"].find_one({"id" : ids.KEY})["next"] == 12
+
+def test_load_all_skips_sales_already_listed(shop, honey, mongo):
+    """on_ready used to start the bot's own sales before the shop was loaded: its first sale was listed twice"""
+    from GameLogic.Player import Player
+    from GameLogic.shop import Sale
+    async def main():
+        [seller] = await Player.LoadPlayers(["1"])
+        stored = await shop.AddSale(Sale(item=honey, amount=1, price=5, seller=seller))
+        early = await shop.AddSale(Sale(item=honey, amount=1, price=7, seller=seller)) # listed by this process before LoadAll
+        await shop.LoadAll()
+        return stored, early
+    stored, early = asyncio.run(main())
+    assert sorted(shop.auction) == sorted([stored.id, early.id]) and shop.GetSale(early.id) is early
+    assert mongo["Shop"].count_documents({"type" : "sale"}) == 2
+
+def test_load_all_gives_old_sales_an_id(shop, honey, mongo):
+    from GameLogic.shop import Shop
+    mongo["Shop"].insert_many([{"id" : "1", "seller" : "1", "type" : "sale", "item" : honey.id, "amount" : 1, "price" : 5} for _ in range(2)])
+    asyncio.run(shop.LoadAll())
+    stored = {document["sale_id"] for document in mongo["Shop"].find({"type" : "sale"})}
+    assert stored == set(shop.auction) and len(stored) == 2
+    reloaded = Shop()
+    asyncio.run(reloaded.LoadAll())
+    assert set(reloaded.auction) == stored
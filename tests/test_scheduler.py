@@ -0,0 +1,31 @@
+from __future__ import annotations
+import asyncio, time
+from GameLogic.Scheduler import GrowthScheduler
+
+def test_rebuild_backfills_and_splits_due_from_pending(mongo):
+    from Utils.Database import AsyncPlantDatabase
+    now = int(time.time())
+    mongo["Plants"].insert_many([
+        {"id" : "1", "storage" : {"0" : {"finishing_time" : now - 60, "name" : "X Plant", "type" : "x"}}}, # saved before finishing_times existed
+        {"id" : "2", "storage" : {"0" : {"finishing_time" : now + 600, "name" : "Wooden Plant", "type" : "wooden"}}, "finishing_times" : [now + 600]},
+    ])
+    scheduler = GrowthScheduler()
+    assert asyncio.run(scheduler.Rebuild({"plants" : AsyncPlantDatabase})) == 1
+    assert mongo["Plants"].find_one({"id" : "1"})["finishing_times"] == [now - 60]
+    assert [timer[2] for timer in scheduler.heap] == ["2"]
+    assert scheduler.Drain("1", "plants") == ["X Plant"] and scheduler.Drain("1", "plants") == []
+
+def test_runner_keeps_due_timers_until_drained():
+    scheduler = GrowthScheduler()
+    notified = []
+    async def OnDue(owner_id, kind, name): notified.append((owner_id, kind, name))
+    async def main():
+        scheduler.Start(on_due=OnDue)
+        scheduler.Schedule(time.time() + 0.02, owner_id=1, kind="bees", name="Bee")
+        scheduler.Schedule(time.time() + 60, owner_id=2, kind="bees", name="Bee")
+        await asyncio.sleep(0.1)
+        scheduler.runner.cancel()
+    asyncio.run(main())
+    assert notified == [("1", "bees", "Bee")]
+    assert scheduler.Drain("2", "bees") == [] and scheduler.Drain("1", "bees") == ["Bee"]
+    assert scheduler.Cancel(2) == 1 and len(scheduler.heap) == 0
\ No newline at end of file
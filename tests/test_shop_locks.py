@@ -0,0 +1,140 @@
+from __future__ import annotations
+import asyncio
+import pytest
+from types import SimpleNamespace
+
+@pytest.fixture
+def held(shop, monkeypatch):
+    """every set of players the shop locked together"""
+    import GameLogic.shop
+    from Utils.Locks import PlayerLocks
+    calls = []
+    class Recording(PlayerLocks):
+        def Hold(self, *ids):
+            calls.append({str(id) for id in ids})
+            return super().Hold(*ids)
+    monkeypatch.setattr(GameLogic.shop, "PLAYER_LOCKS", Recording())
+    return calls
+
+async def Players(*ids : str) -> list:
+    from GameLogic.Player import Player
+    return await Player.LoadPlayers(list(ids))
+
+def test_sweep_locks_the_buyer_and_its_sellers_together(shop, honey, sell, held):
+    async def main():
+        buyer, one, two, three = await Players("1", "2", "3", "4")
+        buyer.balance = 100
+        await sell(honey, 3, 30, one)
+        await sell(honey, 4, 8, two)
+        await sell(honey, 1, 90, three) # not reached
+        held.clear()
+        return await shop.SweepBuy(buyer, honey, 5)
+    fills = asyncio.run(main())
+    assert len(fills) == 2 and held == [{"1", "2", "3"}]
+
+def test_cancel_racing_a_sweep_never_gives_the_items_twice(shop, honey, sell, mongo):
+    async def main():
+        buyer, seller = await Players("1", "2")
+        buyer.balance = 100
+        sale = await sell(honey, 2, 10, seller)
+        cancel = asyncio.ensure_future(sale.Cancel()) # suspends on the seller's load
+        await asyncio.sleep(0)
+        fills = await shop.SweepBuy(buyer, honey, 2)
+        return buyer, seller, fills, await cancel
+    buyer, seller, fills, cancelled = asyncio.run(main())
+    assert cancelled and fills == []
+    assert seller.inventory.GetItemCount(honey) == 2 and buyer.inventory.GetItemCount(honey) == 0
+    assert (buyer.balance, seller.balance) == (100, 20)
+    assert not shop.HasSale("anything") and len(shop.auction) == 0
+    assert mongo["Shop"].count_documents({"type" : "sale"}) == 0
+
+def test_cancel_after_a_sweep_bought_it_gives_nothing_back(shop, honey, sell):
+    async def main():
+        buyer, seller = await Players("1", "2")
+        sale = await sell(honey, 2, 10, seller)
+        sweep = asyncio.ensure_future(shop.SweepBuy(buyer, honey, 2))
+        await asyncio.sleep(0.05)
+        cancelled = await sale.Cancel()
+        return buyer, seller, await sweep, cancelled
+    buyer, seller, fills, cancelled = asyncio.run(main())
+    assert not cancelled and len(fills) == 1
+    assert seller.inventory.GetItemCount(honey) == 0 and buyer.inventory.GetItemCount(honey) == 2
+
+def test_new_sale_fills_the_best_bids_and_locks_the_bidders(shop, honey, sell, held):
+    from GameLogic.shop import BuyOrder
+    async def main():
+        seller, low, high = await Players("1", "2", "3")
+        low.balance = high.balance = 100
+        await shop.PlaceBid(BuyOrder(honey, 3, 5, low))
+        await shop.PlaceBid(BuyOrder(honey, 2, 8, high))
+        held.clear()
+        sale = await sell(honey, 4, 12, seller) # 3 each, both bids pay more
+        return seller, low, high, sale
+    seller, low, high, sale = asyncio.run(main())
+    assert held[0] == {"1", "2", "3"}
+    assert sale.amount == 0
+    assert (high.inventory.GetItemCount(honey), low.inventory.GetItemCount(honey)) == (2, 2)
+    assert seller.balance == 20 + 2 * 8 + 2 * 5
+    assert [order.amount for order in shop.GetOrdersFor(low)] == [1]
+
+def test_bid_cancelled_while_a_sale_matches_is_either_filled_or_refunded(shop, honey, sell):
+    from GameLogic.shop import BuyOrder
+    async def main():
+        seller, bidder = await Players("1", "2")
+        bidder.balance = 50
+        order = BuyOrder(honey, 5, 10, bidder)
+        await shop.PlaceBid(order)
+        results = await asyncio.gather(sell(honey, 5, 10, seller), shop.CancelBid(order), return_exceptions=True)
+        return seller, bidder, results
+    seller, bidder, (sale, cancel) = asyncio.run(main())
+    bought = bidder.inventory.GetItemCount(honey)
+    if isinstance(cancel, Exception): # the sale filled it first
+        assert bought == 5 and bidder.balance == 0 and sale.amount == 0
+    else:
+        assert bought == 0 and bidder.balance == 50 and sale.amount == 5
+    assert seller.balance + bidder.balance == 20 + 50 # no money appeared or vanished
+
+def test_bid_buys_listed_sales_and_locks_their_sellers(shop, honey, sell, held):
+    from GameLogic.shop import BuyOrder
+    async def main():
+        buyer, seller = await Players("1", "2")
+        buyer.balance = 100
+        await sell(honey, 2, 6, seller)
+        held.clear()
+        bought = await shop.PlaceBid(BuyOrder(honey, 3, 4, buyer))
+        return buyer, seller, bought
+    buyer, seller, bought = asyncio.run(main())
+    assert held == [{"1", "2"}]
+    assert len(bought) == 1 and buyer.inventory.GetItemCount(honey) == 2
+    assert buyer.balance == 100 - 6 - 4 and seller.balance == 26 # 1 unit still held at the bid price
+
+def test_bids_are_walked_lazily_best_first(shop, honey, sell, monkeypatch):
+    """a new sale only looks at the bids it can fill, the rest of the book is never sorted"""
+    from GameLogic.Player import Player
+    from GameLogic.shop import BuyOrder, OrderBook, Shop
+    walked = []
+    def InOrder(heap, walk=Shop.__InOrder__):
+        for entry in walk(heap):
+            walked.append(entry)
+            yield entry
+    async def main():
+        seller, rich, *others = await Player.LoadPlayers([str(id) for id in range(1, 503)])
+        for price, bidder in enumerate(others, start=1):
+            bidder.balance = price
+            await shop.PlaceBid(BuyOrder(honey, 1, price, bidder, placed_at=price))
+        rich.balance = seller.balance = 500
+        await shop.PlaceBid(BuyOrder(honey, 1, 500, rich, placed_at=0)) # ties with the best one, but older
+        await shop.PlaceBid(BuyOrder(honey, 1, 500, seller, placed_at=-1)) # the seller's own, skipped
+        monkeypatch.setattr(Shop, "__InOrder__", staticmethod(InOrder))
+        assert shop.__Bidders__(SimpleNamespace(item=honey, amount=2, price=2, seller=seller)) == {"2", str(others[-1].id)}
+        assert 0 < len(walked) <= 4
+        walked.clear()
+        book : OrderBook = shop.books[honey.id]
+        assert book.Best(accept=lambda bid: bid.buyer.id not in ("1", "2")) is shop.GetOrdersFor(others[-1])[0]
+        return book
+    book = asyncio.run(main())
+    assert 0 < len(walked) <= 4
+    for order in list(book.orders.values())[:400]:
+        book.Remove(order.id)
+    assert len(book.heap) <= 2 * len(book.orders) + 16 # removed bids do not pile up in the heap
+    assert [order.buyer.id for order in book.InOrder()][:3] == ["1", "2", "502"] and len(book) == 102
\ No newline at end of file
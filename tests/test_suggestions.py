@@ -0,0 +1,42 @@
+from __future__ import annotations
+import pytest
+
+@pytest.fixture
+def bot(monkeypatch):
+    discord = pytest.importorskip("discord")
+    from discord.ext import commands
+    from Utils.ErrorHandling import CommandSuggestions
+    monkeypatch.setattr(CommandSuggestions, "INDEX", None)
+    rebuilds = []
+    def Rebuild(bot, rebuild=CommandSuggestions.Rebuild):
+        rebuilds.append(len(bot.all_commands))
+        rebuild(bot)
+    monkeypatch.setattr(CommandSuggestions, "Rebuild", staticmethod(Rebuild))
+    result = commands.Bot(command_prefix="$", case_insensitive=True, intents=discord.Intents.default(), help_command=None)
+    CommandSuggestions.Watch(result)
+    for name, aliases in [("inventory", ["inv"]), ("sell", []), ("selling", []), ("shop", ["market"])]:
+        async def callback(ctx): pass
+        result.add_command(commands.Command(callback, name=name, aliases=aliases))
+    result.rebuilds = rebuilds
+    return result
+
+def test_suggestions_come_from_names_and_aliases_once_per_command(bot):
+    from Utils.ErrorHandling import CommandSuggestions
+    assert CommandSuggestions.Suggest(bot, "Inventroy") == ["inventory"]
+    assert CommandSuggestions.Suggest(bot, "markt") == ["shop"]
+    assert CommandSuggestions.Suggest(bot, "sel") == ["sell", "selling"]
+    assert CommandSuggestions.Suggest(bot, "zzzzzzzz") == []
+    assert bot.rebuilds == [6] # built by the first lookup only
+
+def test_adding_or_removing_a_command_rebuilds_the_index(bot):
+    from discord.ext import commands
+    from Utils.ErrorHandling import CommandSuggestions
+    CommandSuggestions.Suggest(bot, "shop")
+    async def callback(ctx): pass
+    bot.add_command(commands.Command(callback, name="sweep", aliases=["sweepbuy"]))
+    assert CommandSuggestions.INDEX == None
+    assert CommandSuggestions.Suggest(bot, "swepbuy") == ["sweep"]
+    bot.remove_command("shop")
+    assert CommandSuggestions.Suggest(bot, "markt") == []
+    CommandSuggestions.Suggest(bot, "sel")
+    assert bot.rebuilds == [6, 8, 6]
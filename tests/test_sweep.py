@@ -0,0 +1,36 @@
+from __future__ import annotations
+import asyncio
+
+def test_sweep_buys_the_cheapest_per_unit_first_and_splits_the_last_lot(shop, honey, sell, mongo):
+    from GameLogic.Player import Player
+    async def main():
+        buyer, one, two = await Player.LoadPlayers(["1", "2", "3"])
+        buyer.balance = 100
+        await sell(honey, 3, 30, one) # 10 each
+        await sell(honey, 4, 8, two)  # 2 each
+        fills = await shop.SweepBuy(buyer, honey, 5)
+        return buyer, one, two, fills
+    buyer, one, two, fills = asyncio.run(main())
+    assert [(sale.seller.id, amount, price) for sale, amount, price in fills] == [("3", 4, 8), ("2", 1, 10)]
+    assert buyer.inventory.GetItemCount(honey) == 5 and buyer.balance == 82
+    assert (one.balance, two.balance) == (30, 28)
+    [rest] = shop.GetSalesOf(honey)
+    assert (rest.amount, rest.price) == (2, 20)
+    assert [(document["amount"], document["price"]) for document in mongo["Shop"].find({"type" : "sale"})] == [(2, 20)]
+    assert mongo["Shop"].count_documents({"type" : "fill"}) == 2
+
+def test_sweep_stops_at_the_max_price_and_the_buyers_money(shop, honey, sell):
+    from GameLogic.Player import Player
+    async def main():
+        buyer, seller = await Player.LoadPlayers(["1", "2"])
+        buyer.balance = 9
+        for price in (2, 3, 5, 6):
+            await sell(honey, 1, price, seller)
+        await sell(honey, 1, 1, buyer) # their own sale is skipped
+        capped = await shop.SweepBuy(buyer, honey, 10, max_price=4)
+        broke = await shop.SweepBuy(buyer, honey, 10)
+        return buyer, capped, broke
+    buyer, capped, broke = asyncio.run(main())
+    assert [price for _, _, price in capped] == [2, 3]
+    assert [price for _, _, price in broke] == [] and buyer.balance == 4 # 5 is more than what is left
+    assert sorted(sale.price for sale in shop.GetSalesOf(honey)) == [1, 5, 6]
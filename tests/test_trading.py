@@ -0,0 +1,32 @@
+from __future__ import annotations
+import pytest
+
+@pytest.fixture
+def trades(players):
+    from GameLogic.Trading import PendingTrade, Trade
+    yield
+    PendingTrade.PENDING_TRADES.clear()
+    Trade.TRADES.clear()
+
+def Replaced(players, id : str):
+    """what a delete (or the handle being garbage collected) leaves behind: a new handle for the same id"""
+    from GameLogic.Player import Player
+    players.references.pop(id)
+    handle = Player.GetPlayer(id)
+    handle.Adopt(Player(id=id))
+    return handle
+
+def test_trades_are_found_through_a_new_handle_of_the_same_player(players, trades):
+    from GameLogic.Player import Player
+    from GameLogic.Trading import IsTrading, PendingTrade, Trade
+    one, two, three = [Player.GetPlayer(id) for id in ("1", "2", "3")]
+    for handle in (one, two, three): handle.Adopt(Player(id=handle.id))
+    pending = PendingTrade(Items_on_trade={}, seller=one, possible_traders=[three], id=1)
+    trade = Trade(UserOne=two, UserTwo=three, UserOneItems={}, UserTwoItems={}, id=2)
+    old = three
+    one, three = Replaced(players, "1"), Replaced(players, "3")
+    assert IsTrading(one) and PendingTrade.GetTradeBy(one) is pending
+    assert IsTrading(three) and Trade.GetTradeBy(three) is trade
+    assert pending.CanTrade(three) and Trade.GetTradesWith(three) == [trade]
+    assert old != three # players still compare by identity, only the trade lookups go by id
+    assert not IsTrading(Player.GetPlayer("4"))